@@ -15,10 +15,20 @@ import json
 from chalice import Chalice, AuthResponse, Response
 
 # aws clients imports
+from chalicelib.aws_clients import dynamodb_client as dc
 from chalicelib.aws_clients import secrets_manager_client as sm_client
 
 # custom services imports
+from chalicelib import archive_service as archive
+from chalicelib import availability_service as availability
+from chalicelib import health
+from chalicelib import idempotency_service as idempotency
+from chalicelib import jwt_auth
+from chalicelib import request_validation as validation
+from chalicelib import reservation_views_service as views
 from chalicelib import reservations_service as rs
+from chalicelib import storage
+from chalicelib import warm_up
 
 # init logging client
 logger = logging.getLogger(__name__)
@@ -29,12 +39,90 @@ ENV = os.environ["RUN_ENV"] if "RUN_ENV" in list(os.environ) else "sandbox"
 with open(f"chalicelib/configs/{ENV}.json") as f:
     CONFIG = json.load(f)
 
+
+class CabinCalendarChalice(Chalice):
+    """
+    Chalice app that answers warm-up pings (see chalicelib/warm_up.py) before API Gateway event handling.
+    """
+
+    def __call__(self, event, context):
+        health.record_invocation()
+        if warm_up.is_warm_up_event(event):
+            return warm_up.warm_up(**WARM_UP_TARGETS)
+        return super().__call__(event, context)
+
+
 # init chalice app
-app = Chalice(app_name='gularte-cabin-calendar-backend')
+app = CabinCalendarChalice(app_name='gularte-cabin-calendar-backend')
 
 # set reservation table link based off env.
 RES_TABLE = CONFIG["reservations_table"]
 
+# optional table that reservation writes are mirrored into while the table is migrated to a new key layout
+DUAL_WRITE_TABLE = CONFIG.get("dual_write_table") or None
+DUAL_WRITE_LAYOUT = CONFIG.get("dual_write_layout")
+
+# shared_secret compares the token to the secrets manager api token, cognito_jwt verifies cognito user pool tokens
+AUTH_MODE = CONFIG.get("auth_mode", "shared_secret")
+# secrets manager location of the api token; local runs use a static token from the local config and no secret
+AUTH_SECRET = None if ENV == "local" else {
+    "secret_id": CONFIG["secret_id"],
+    "secret_key": CONFIG["secret_key"],
+    "secret_region": CONFIG["secret_region"]
+}
+
+# Idempotency-Key records of the POST/PUT routes
+IDEMPOTENCY_TABLE = CONFIG["idempotency_table"]
+IDEMPOTENCY_TTL_SECONDS = CONFIG.get("idempotency_ttl_seconds", 86400)
+
+# derived views maintained from the reservations table stream; the stream handler is only invoked once the stream arn
+# is set, terraform/<env>/stream_handler.tf reads it from the same config
+VIEWS_TABLE = CONFIG["views_table"]
+RES_STREAM_ARN = CONFIG.get("reservations_stream_arn") or None
+# range reads and /availability use the month and recurring views only while the stream handler maintains them and
+# once "read_views" is switched on, which is done after scripts/rebuild_views.py built the views of older reservations
+READ_VIEWS_TABLE = VIEWS_TABLE if RES_STREAM_ARN and CONFIG.get("read_views", False) else None
+
+# past stays expire from the reservations table via its TTL into the archive table. The stream handler captures the
+# ttl deletes, so writes only set the TTL when it is deployed; otherwise expired stays would be lost.
+ARCHIVE_TABLE = CONFIG.get("archive_table") or None
+RETENTION_SECONDS = archive.retention_seconds(CONFIG.get("archive_retention_days")) \
+    if ARCHIVE_TABLE and RES_STREAM_ARN else None
+
+# select the storage backend (dynamodb, or the in-memory engine for local runs) and register the table key schemas
+STORAGE = storage.configure(CONFIG.get("storage_backend", "dynamodb"))
+rs.register_tables(
+    backend=STORAGE,
+    table_name=RES_TABLE,
+    dual_write_table=DUAL_WRITE_TABLE,
+    dual_write_layout=DUAL_WRITE_LAYOUT
+)
+idempotency.register_tables(backend=STORAGE, table_name=IDEMPOTENCY_TABLE)
+views.register_tables(backend=STORAGE, table_name=VIEWS_TABLE)
+if ARCHIVE_TABLE:
+    archive.register_tables(backend=STORAGE, table_name=ARCHIVE_TABLE)
+
+# client side rate limiting of the provisioned tables, capacities mirror terraform/<env>/dynamodb.tf
+for capacity_table, capacity in CONFIG.get("table_capacity", {}).items():
+    dc.configure_capacity(capacity_table, capacity)
+
+# what warm-up pings and the container init prime, see chalicelib/warm_up.py
+WARM_UP_TARGETS = {
+    "dynamodb_tables": [RES_TABLE] if CONFIG.get("storage_backend", "dynamodb") == "dynamodb" else [],
+    "secret": AUTH_SECRET,
+    "jwks": {
+        "region": CONFIG["cognito_region"],
+        "user_pool_id": CONFIG["cognito_user_pool_id"]
+    } if AUTH_MODE == "cognito_jwt" else None
+}
+# prime every new container during its init, so the first request after a scale-out already finds open connections
+# and filled caches; only inside lambda, the chalice cli imports this module to package it
+if "AWS_LAMBDA_FUNCTION_NAME" in os.environ:
+    warm_up.warm_up(**WARM_UP_TARGETS)
+
+# the rest of the module only declares routes; the container is initialized
+health.record_init()
+
 """
 AUTHORIZERS
 """
@@ -42,7 +130,9 @@ AUTHORIZERS
 
 @app.authorizer()
 def token_auth(auth_request):
-    if auth_request.auth_type == "TOKEN" and auth_request.token == sm_client.get_secret(CONFIG["secret_id"], CONFIG["secret_key"], CONFIG["secret_region"]):
+    if AUTH_MODE == "cognito_jwt":
+        return cognito_jwt_auth(auth_request)
+    if auth_request.auth_type == "TOKEN" and auth_request.token == get_api_token():
         logger.info({"AuthType": auth_request.auth_type, "Success": True})
         return AuthResponse(routes=["/*"], principal_id="user")
     else:
@@ -50,6 +140,32 @@ def token_auth(auth_request):
         return AuthResponse(routes=[], principal_id="user")
 
 
+def cognito_jwt_auth(auth_request) -> AuthResponse:
+    """
+    Verify a Cognito user pool token locally (see chalicelib/jwt_auth.py) and pass the user's identity to the routes;
+    the token's 'sub' is the user_guid.
+
+    :param auth_request: Chalice auth request.
+    :return: Chalice auth response.
+    """
+    token = auth_request.token or ""
+    if token.startswith("Bearer "):
+        token = token[len("Bearer "):]
+    try:
+        claims = jwt_auth.verify_token(
+            token=token,
+            region=CONFIG["cognito_region"],
+            user_pool_id=CONFIG["cognito_user_pool_id"],
+            app_client_id=CONFIG["cognito_app_client_id"]
+        )
+    except jwt_auth.InvalidToken as it:
+        logger.info({"AuthType": auth_request.auth_type, "Success": False, "Reason": str(it)})
+        return AuthResponse(routes=[], principal_id="user")
+
+    logger.info({"AuthType": auth_request.auth_type, "Success": True, "UserGUID": claims["sub"]})
+    return AuthResponse(routes=["/*"], principal_id=claims["sub"], context={"user_guid": claims["sub"]})
+
+
 """
 HEALTHCHECK
 """
@@ -62,13 +178,31 @@ HEALTHCHECK
 )
 def healthcheck() -> Response:
     """
-    A simple endpoint to perform system healthcheck
+    A simple endpoint to perform system healthcheck. With ?deep=true the DynamoDB and Secrets Manager dependencies are
+    timed and the container's stats are reported (see chalicelib/health.py); 503 when a dependency check fails.
 
     :return: Chalice response object.
     """
+    validation_error = validation.validate_healthcheck_request(app.current_request.query_params)
+    if validation_error is not None:
+        return validation_error
+
     # log request and return
     log(app.current_request.to_dict(), app.current_request.json_body)
-    return Response(status_code=200, body={"message": "I am healthy."})
+    if (app.current_request.query_params or {}).get("deep") != "true":
+        return Response(status_code=200, body={"message": "I am healthy."})
+
+    report = health.deep_check(
+        dynamodb_table=RES_TABLE if CONFIG.get("storage_backend", "dynamodb") == "dynamodb" else None,
+        secret=AUTH_SECRET
+    )
+    return Response(
+        status_code=200 if report["healthy"] else 503,
+        body={
+            "message": "I am healthy." if report["healthy"] else "A dependency check failed.",
+            "data": report
+        }
+    )
 
 
 """
@@ -87,16 +221,44 @@ def reservation() -> Response:
 
     :return: Chalice response object.
     """
+    # validation stage; reject malformed requests before any aws call is made
+    validation_error = validation.validate_request(
+        method=app.current_request.method,
+        query_params=app.current_request.query_params,
+        body=app.current_request.raw_body,
+        user_guid=current_user_guid()
+    )
+    if validation_error is not None:
+        logger.info({"Path": app.current_request.path, "Method": app.current_request.method,
+                     "Rejected": validation_error.body["error"]})
+        return validation_error
+
     # log incoming request
     log(app.current_request.to_dict(), app.current_request.json_body)
 
     # perform routing based off request
     if app.current_request.method == "GET":
         # GET reservation; if 'id' query param is available, use to get a single res. if no params then list all res.
+        # with 'from' and 'to' dates list the reservations (and occurrences of recurring ones) in that range, with
+        # 'guids' read several reservations at once.
         if not app.current_request.query_params:
             return rs.list_reservations(
                 table_name=RES_TABLE
             )
+        elif app.current_request.query_params.get("guids"):
+            return rs.get_reservations(
+                table_name=RES_TABLE,
+                reservation_guids=app.current_request.query_params["guids"].split(",")
+            )
+        elif app.current_request.query_params.get("from"):
+            return rs.list_reservations_in_range(
+                table_name=RES_TABLE,
+                views_table=READ_VIEWS_TABLE,
+                range_start=availability.parse_date(app.current_request.query_params["from"]),
+                range_end=availability.parse_date(app.current_request.query_params["to"]),
+                archive_table=ARCHIVE_TABLE,
+                retention_seconds=RETENTION_SECONDS
+            )
         elif app.current_request.query_params.get("guid"):
             return rs.get_reservation(
                 table_name=RES_TABLE,
@@ -113,9 +275,14 @@ def reservation() -> Response:
     elif app.current_request.method == "POST":
         # POST reservation; the reservation to create needs to be in the requests body
         if app.current_request.json_body:
-            return rs.create_reservation(
-                table_name=RES_TABLE,
-                reservation=app.current_request.json_body
+            return idempotent(
+                lambda: rs.create_reservation(
+                    table_name=RES_TABLE,
+                    reservation=with_user_guid(app.current_request.json_body),
+                    dual_write_table=DUAL_WRITE_TABLE,
+                    dual_write_layout=DUAL_WRITE_LAYOUT,
+                    retention_seconds=RETENTION_SECONDS
+                )
             )
         else:
             return Response(
@@ -129,9 +296,15 @@ def reservation() -> Response:
         # PUT reservation; the reservation to update needs to be in the requests body
         # POST reservation; the reservation to create needs to be in the requests body
         if app.current_request.json_body:
-            return rs.update_reservation(
-                table_name=RES_TABLE,
-                reservation=app.current_request.json_body
+            return idempotent(
+                lambda: rs.update_reservation(
+                    table_name=RES_TABLE,
+                    reservation=with_user_guid(app.current_request.json_body),
+                    dual_write_table=DUAL_WRITE_TABLE,
+                    dual_write_layout=DUAL_WRITE_LAYOUT,
+                    retention_seconds=RETENTION_SECONDS,
+                    owner_guid=current_user_guid()
+                )
             )
         else:
             return Response(
@@ -146,7 +319,10 @@ def reservation() -> Response:
         if app.current_request.query_params.get("guid"):
             return rs.delete_reservation(
                 table_name=RES_TABLE,
-                reservation_guid=app.current_request.query_params["guid"]
+                reservation_guid=app.current_request.query_params["guid"],
+                dual_write_table=DUAL_WRITE_TABLE,
+                dual_write_layout=DUAL_WRITE_LAYOUT,
+                owner_guid=current_user_guid()
             )
         else:
             return Response(
@@ -158,11 +334,123 @@ def reservation() -> Response:
             )
 
 
+"""
+AVAILABILITY CONTROLLER
+"""
+
+
+@app.route(
+    "/availability",
+    methods=["GET"],
+    authorizer=token_auth
+)
+def get_availability() -> Response:
+    """
+    endpoint to find the free windows of at least 'nights' nights between the 'from' and 'to' dates.
+
+    :return: Chalice response object.
+    """
+    validation_error = validation.validate_availability_request(app.current_request.query_params)
+    if validation_error is not None:
+        logger.info({"Path": app.current_request.path, "Method": app.current_request.method,
+                     "Rejected": validation_error.body["error"]})
+        return validation_error
+
+    log(app.current_request.to_dict(), None)
+
+    query_params = app.current_request.query_params
+    return availability.get_availability(
+        table_name=RES_TABLE,
+        views_table=READ_VIEWS_TABLE,
+        date_from=query_params["from"],
+        date_to=query_params["to"],
+        nights=int(query_params.get("nights", availability.DEFAULT_NIGHTS)),
+        limit=int(query_params.get("limit", availability.DEFAULT_LIMIT)),
+        archive_table=ARCHIVE_TABLE,
+        retention_seconds=RETENTION_SECONDS
+    )
+
+
+"""
+STREAM HANDLERS
+"""
+
+
+# a plain lambda function: the event source mapping is managed in terraform/<env>/stream_handler.tf, as chalice's
+# on_dynamodb_record can not set the partial batch failure response, the retry limit or bisecting a failed batch
+@app.lambda_function(name="reservations_stream")
+def reservations_stream(event, context):
+    """
+    Archive the reservations the table's TTL removed and maintain the derived reservation views from the reservations
+    table stream.
+
+    :param event: Raw dynamodb stream event.
+    :param context: Lambda context.
+    :return: The partial batch failures of the views, {"batchItemFailures": [...]}.
+    """
+    # archiving is idempotent, a failure raises and lambda retries the batch, bisecting it to isolate the bad record
+    if ARCHIVE_TABLE:
+        archive.archive_expired(event=event, archive_table=ARCHIVE_TABLE)
+    return views.process_stream_event(event=event, views_table=VIEWS_TABLE)
+
+
 """
 HELPER FUNCTIONS
 """
 
 
+def get_api_token() -> str or bytes:
+    # local runs use a static token from the local config so they need no aws access
+    if ENV == "local":
+        return CONFIG["local_api_token"]
+    return sm_client.get_secret(CONFIG["secret_id"], CONFIG["secret_key"], CONFIG["secret_region"])
+
+
+def current_user_guid() -> str or None:
+    """
+    The user_guid of the caller, set by the authorizer when it verified a user pool token.
+
+    :return: The user_guid, None when the request was authorized with the shared api token.
+    """
+    return (app.current_request.context.get("authorizer") or {}).get("user_guid")
+
+
+def with_user_guid(reservation: dict) -> dict:
+    """
+    Stamp the caller's user_guid on a created or updated reservation so users can only write reservations as
+    themselves; updates and deletes additionally check that the caller owns the stored reservation.
+
+    :param reservation: The reservation from the request body
+    :return: The same reservation
+    """
+    if current_user_guid() is not None and isinstance(reservation, dict):
+        reservation["user_guid"] = current_user_guid()
+    return reservation
+
+
+def idempotent(handler) -> Response:
+    """
+    Run a POST/PUT handler through the idempotency records when the request carries an Idempotency-Key header.
+
+    :param handler: Runs the request
+    :return: Chalice response object.
+    """
+    idempotency_key = app.current_request.headers.get("idempotency-key")
+    if idempotency_key is None:
+        return handler()
+
+    # keys are scoped to the route and the caller so two callers can never replay each other's responses
+    principal = app.current_request.context.get("authorizer", {}).get("principalId", "")
+    return idempotency.run_idempotent(
+        table_name=IDEMPOTENCY_TABLE,
+        idempotency_key=idempotency_key,
+        scope=f"{app.current_request.method} {app.current_request.path} {principal}",
+        request_body=app.current_request.json_body,
+        handler=handler,
+        ttl_seconds=IDEMPOTENCY_TTL_SECONDS
+    )
+
+
 def log(request: dict, body: dict or None) -> None:
     logger.info(f"Path: {request['path']}; \n"
                 f"Method: {request['method']}; \n"
@@ -0,0 +1,198 @@
+"""
+filename: archive_service.py
+author: Jack Gularte
+date: Oct. 19 2026
+
+Archival of past stays. Every reservation write sets the table's TTL attribute to the end of the stay plus a retention
+window, so DynamoDB deletes past stays from the provisioned reservations table by itself. The TTL deletes show up on
+the table stream as REMOVE records made by the dynamodb service; the stream handler copies those old images into the
+cold (on-demand) archive table, which is read for historical range queries only:
+
+    archive_key         reservation_guid    holds
+    month#<YYYY-MM>     <reservation_guid>  the full reservation, once per month it has nights in
+    recurring           <reservation_guid>  a recurring reservation whose rule ran out
+
+Recurring reservations get a TTL only when their rule ends (COUNT or UNTIL), after their last occurrence.
+"""
+# standard imports
+import logging
+import time
+from typing import Dict, List
+
+# external installed imports
+from boto3.dynamodb.types import TypeDeserializer
+
+# internal imports
+from . import recurrence
+from . import reservation_views_service as views
+from . import storage
+
+# logger
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# globals
+# ttl attribute of the reservations table, mirrors terraform/<env>/dynamodb.tf
+TTL_ATTRIBUTE = "TimeToExist"
+ARCHIVE_PRIMARY = "archive_key"
+ARCHIVE_SORT = "reservation_guid"
+RECURRING_ARCHIVE = "recurring"
+# the userIdentity dynamodb puts on the stream records of its ttl deletes
+TTL_PRINCIPAL = "dynamodb.amazonaws.com"
+SECONDS_PER_DAY = 86400
+
+_deserializer = TypeDeserializer()
+
+"""
+TTL
+"""
+
+
+def with_expiry(reservation: Dict, retention_seconds: int or None) -> Dict:
+    """
+    A copy of a reservation with its TTL attribute set, ready to be written.
+
+    :param reservation: The reservation
+    :param retention_seconds: How long a past stay is kept in the reservations table, None to keep it forever
+    :return: The reservation item
+    """
+    item = dict(reservation)
+    item.pop(TTL_ATTRIBUTE, None)
+    last_end = recurrence.final_end(reservation)
+    if retention_seconds is not None and last_end is not None:
+        item[TTL_ATTRIBUTE] = last_end + retention_seconds
+    return item
+
+
+def strip_expiry(reservation: Dict) -> Dict:
+    """
+    Drop the TTL attribute of a reservation read from a table before it is returned to the user.
+
+    :param reservation: The reservation
+    :return: The same reservation
+    """
+    reservation.pop(TTL_ATTRIBUTE, None)
+    return reservation
+
+
+"""
+STREAM CAPTURE
+"""
+
+
+def archive_expired(event: Dict, archive_table: str) -> int:
+    """
+    Copy the reservations the table's TTL deleted in a batch of stream records into the archive. Writes are plain puts
+    of the old image, so a retried batch archives the same items again without harm.
+
+    :param event: The raw lambda event, {"Records": [...]}
+    :param archive_table: The archive table
+    :return: The amount of archived reservations
+    """
+    archived = 0
+    for record in event.get("Records", []):
+        if not is_ttl_delete(record):
+            continue
+        old_image = record["dynamodb"].get("OldImage")
+        if not old_image:
+            continue
+        archive_reservation(archive_table, {key: _deserializer.deserialize(value) for key, value in old_image.items()})
+        archived += 1
+    if archived:
+        logger.info({"archive_service": "archive_expired", "archived": archived})
+    return archived
+
+
+def is_ttl_delete(record: Dict) -> bool:
+    """
+    Whether a stream record is a delete made by the table's TTL rather than by the application.
+
+    :param record: A raw dynamodb stream record
+    :return: bool
+    """
+    identity = record.get("userIdentity") or {}
+    return record.get("eventName") == "REMOVE" and identity.get("type") == "Service" and \
+        identity.get("principalId") == TTL_PRINCIPAL
+
+
+def archive_reservation(archive_table: str, reservation: Dict) -> None:
+    """
+    Write a reservation into the archive, once per month bucket it belongs to.
+
+    :param archive_table: The archive table
+    :param reservation: The reservation
+    :return: None
+    """
+    backend = storage.get_backend()
+    for archive_key in archive_keys(reservation):
+        backend.put_item(
+            table_name=archive_table,
+            item=dict(reservation, **{ARCHIVE_PRIMARY: archive_key, "archived_at": int(time.time())})
+        )
+
+
+def archive_keys(reservation: Dict) -> List[str]:
+    if recurrence.is_recurring(reservation):
+        return [RECURRING_ARCHIVE]
+    # every month the stay overlaps, like the month views, so a stay without a full night is archived too
+    return [views.month_key(month) for month in views.months(int(reservation["epoch_start"]),
+                                                             int(reservation["epoch_end"]))]
+
+
+"""
+READS
+"""
+
+
+def is_historical(range_start: int, retention_seconds: int or None) -> bool:
+    """
+    Whether a range reaches back far enough that some of its reservations may have been archived.
+
+    :param range_start: Epoch of the start of the range
+    :param retention_seconds: The retention window of the reservations table
+    :return: bool
+    """
+    return retention_seconds is not None and range_start < time.time() - retention_seconds
+
+
+def range_archive_keys(range_start: int, range_end: int) -> List[str]:
+    """
+    The archive partitions a range read needs: its month buckets and the recurring one.
+
+    :param range_start: Epoch of the start of the range
+    :param range_end: Epoch of the end of the range
+    :return: list of archive keys
+    """
+    return [views.month_key(month) for month in views.months(range_start, range_end)] + [RECURRING_ARCHIVE]
+
+
+def from_archive_item(item: Dict) -> Dict:
+    """
+    The reservation of an archive item, without the archive attributes.
+
+    :param item: The archive item
+    :return: The same item
+    """
+    item.pop(ARCHIVE_PRIMARY, None)
+    item.pop("archived_at", None)
+    return strip_expiry(item)
+
+
+"""
+HELPERS
+"""
+
+
+def retention_seconds(retention_days: int or None) -> int or None:
+    return None if retention_days is None else int(retention_days) * SECONDS_PER_DAY
+
+
+def register_tables(backend: storage.StorageBackend, table_name: str) -> None:
+    """
+    Register the key schema of the archive table with the storage backend.
+
+    :param backend: The storage backend
+    :param table_name: The archive table
+    :return: None
+    """
+    backend.register_table(table_name, hash_key=ARCHIVE_PRIMARY, range_key=ARCHIVE_SORT)
@@ -0,0 +1,225 @@
+"""
+filename: availability_service.py
+author: Jack Gularte
+date: Oct. 19 2026
+
+Free windows of the cabin, e.g. "when is the next free 3-night window in July?". The reservations overlapping the
+requested range are loaded once, either from the month buckets of the views table (see reservation_views_service.py)
+or with a scan of the reservations table when the views are not read (see "read_views" in app.py); recurring
+reservations are expanded to their occurrences within the range. Every occurrence is marked on a per-night occupancy
+vector. A single linear sweep over the vector finds the free windows.
+
+Results are cached per (range, nights, limit). With the views the cache entry is keyed on the feed version, which
+every reservation change bumps, so a cached result is served until the reservations actually change. Without the
+views there is no version to compare against: entries expire after SCAN_CACHE_SECONDS, and every entry is also keyed
+on the reservation writes of this container (reservations_service.local_write_count), so a container never serves a
+result older than its own writes.
+"""
+# standard imports
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, List
+
+# chalice imports
+from chalice import Response
+
+# internal imports
+from . import reservation_views_service as views
+from . import reservations_service as rs
+from .reservations_service import handle_throttling
+
+# logger
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# globals
+DATE_FORMAT = "%Y-%m-%d"
+SECONDS_PER_NIGHT = views.SECONDS_PER_NIGHT
+DEFAULT_NIGHTS = 1
+DEFAULT_LIMIT = 10
+MAX_CACHE_ENTRIES = 256
+SCAN_CACHE_SECONDS = 60
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+cache_stats = {"hits": 0, "misses": 0}
+
+"""
+AVAILABILITY
+"""
+
+
+@handle_throttling
+def get_availability(
+        table_name: str,
+        views_table: str or None,
+        date_from: str,
+        date_to: str,
+        nights: int = DEFAULT_NIGHTS,
+        limit: int = DEFAULT_LIMIT,
+        archive_table: str = None,
+        retention_seconds: int = None) -> Response:
+    """
+    Find the free windows of at least `nights` nights between two dates.
+
+    :param table_name: The reservations table, scanned when there are no views
+    :param views_table: The views table, None when the views are not maintained
+    :param date_from: First night of the range, "YYYY-MM-DD" (UTC)
+    :param date_to: End of the range (check-out day, exclusive), "YYYY-MM-DD" (UTC)
+    :param nights: Minimum length of a window
+    :param limit: Maximum amount of windows to return, earliest first
+    :param archive_table: Optional archive, read for ranges older than the retention window
+    :param retention_seconds: How long past stays stay in the reservations table before they are archived
+    :return: Chalice response object.
+    """
+    version = views.feed_version(views_table) if views_table else None
+    local_writes = rs.local_write_count()
+    cache_key = (date_from, date_to, nights, limit)
+    windows = cached(cache_key, version, local_writes)
+    if windows is None:
+        range_start = parse_date(date_from)
+        range_end = parse_date(date_to)
+        reservations = rs.reservations_in_range(
+            table_name=table_name,
+            views_table=views_table if version else None,
+            range_start=range_start,
+            range_end=range_end,
+            archive_table=archive_table,
+            retention_seconds=retention_seconds
+        )
+        occupancy = occupancy_vector(reservations, range_start, range_end)
+        windows = free_windows(occupancy, range_start, nights, limit)
+        store(cache_key, version, local_writes, windows)
+
+    return Response(
+        status_code=200,
+        body={
+            "message": "Availability retrieved.",
+            "data": {
+                "from": date_from,
+                "to": date_to,
+                "nights": nights,
+                "windows": windows
+            }
+        }
+    )
+
+
+def occupancy_vector(reservations: List[Dict], range_start: int, range_end: int) -> bytearray:
+    """
+    Mark the occupied nights of a range. Nights follow reservation_views_service.night_span, like the month views: a
+    stay occupies every night whose closing midnight it covers.
+
+    :param reservations: The reservations overlapping the range
+    :param range_start: Epoch of the first night of the range, at midnight UTC
+    :param range_end: Epoch of the end of the range, at midnight UTC
+    :return: bytearray with one entry per night of the range, 1 for occupied
+    """
+    total = (range_end - range_start) // SECONDS_PER_NIGHT
+    occupancy = bytearray(total)
+    for reservation in reservations:
+        first_night, nights_end = views.night_span(int(reservation["epoch_start"]), int(reservation["epoch_end"]))
+        first = max(0, (first_night - range_start) // SECONDS_PER_NIGHT)
+        last = min(total, (nights_end - range_start) // SECONDS_PER_NIGHT)
+        if first < last:
+            occupancy[first:last] = b"\x01" * (last - first)
+    return occupancy
+
+
+def free_windows(occupancy: bytearray, range_start: int, nights: int, limit: int) -> List[Dict]:
+    """
+    Sweep the occupancy vector once and collect the free stretches of at least `nights` nights.
+
+    :param occupancy: Per-night occupancy of the range
+    :param range_start: Epoch of the first night of the range
+    :param nights: Minimum length of a window
+    :param limit: Maximum amount of windows
+    :return: list of {"check_in", "check_out", "nights"}, earliest first
+    """
+    windows = []
+    run_start = None
+    # a trailing occupied sentinel closes a free run that reaches the end of the range
+    for night, occupied in enumerate(occupancy + b"\x01"):
+        if not occupied:
+            if run_start is None:
+                run_start = night
+            continue
+        if run_start is not None and night - run_start >= nights:
+            windows.append({
+                "check_in": format_date(range_start + run_start * SECONDS_PER_NIGHT),
+                "check_out": format_date(range_start + night * SECONDS_PER_NIGHT),
+                "nights": night - run_start
+            })
+            if len(windows) == limit:
+                break
+        run_start = None
+    return windows
+
+
+"""
+CACHE
+"""
+
+
+def cached(cache_key: tuple, version: str or None, local_writes: int) -> List[Dict] or None:
+    """
+    A cached result, if it is still valid for the current feed version and the writes of this container.
+
+    :param cache_key: (from, to, nights, limit)
+    :param version: The current feed version, None when there are no views
+    :param local_writes: The current reservations_service.local_write_count
+    :return: The cached windows, None on a miss.
+    """
+    with _cache_lock:
+        entry = _cache.get(cache_key)
+        valid = entry is not None and entry["version"] == version and entry["local_writes"] == local_writes and (
+            version is not None or time.monotonic() - entry["stored_at"] < SCAN_CACHE_SECONDS
+        )
+        if not valid:
+            cache_stats["misses"] += 1
+            return None
+        _cache.move_to_end(cache_key)
+        cache_stats["hits"] += 1
+        return entry["windows"]
+
+
+def store(cache_key: tuple, version: str or None, local_writes: int, windows: List[Dict]) -> None:
+    """
+    Cache a result, evicting the least recently used entry when full.
+
+    :param cache_key: (from, to, nights, limit)
+    :param version: The feed version the result was computed at
+    :param local_writes: The reservations_service.local_write_count the result was computed at
+    :param windows: The free windows
+    :return: None
+    """
+    with _cache_lock:
+        _cache[cache_key] = {
+            "version": version,
+            "local_writes": local_writes,
+            "stored_at": time.monotonic(),
+            "windows": windows
+        }
+        _cache.move_to_end(cache_key)
+        while len(_cache) > MAX_CACHE_ENTRIES:
+            _cache.popitem(last=False)
+
+
+"""
+HELPERS
+"""
+
+
+def parse_date(value: str) -> int:
+    """
+    :param value: "YYYY-MM-DD"
+    :return: Epoch of midnight UTC of the day
+    """
+    return int(datetime.strptime(value, DATE_FORMAT).replace(tzinfo=timezone.utc).timestamp())
+
+
+def format_date(epoch: int) -> str:
+    return datetime.fromtimestamp(epoch, tz=timezone.utc).strftime(DATE_FORMAT)
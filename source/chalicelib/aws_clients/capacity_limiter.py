@@ -0,0 +1,231 @@
+"""
+filename: capacity_limiter.py
+author: Jack Gularte
+date: Oct. 19 2026
+
+Client side rate limiting for provisioned DynamoDB tables. Every table and index gets a read and a write token bucket
+refilled at its provisioned capacity units per second. Calls take an estimated amount of units before they are sent and
+the ConsumedCapacity that DynamoDB returns is used to settle the difference, so large queries and scans slow the
+following calls down instead of pushing the table into throttling. The estimate of a call is what the last call of its
+kind on the same table or index consumed, so a scan takes about one page worth of units before each page.
+"""
+# standard imports
+import logging
+import threading
+import time
+from typing import Dict, List
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# seconds of unused capacity a bucket can bank, dynamodb itself retains up to 300 seconds of burst capacity
+BURST_SECONDS = 5
+# longest a call waits on a bucket before it is rejected with a retry after
+MAX_WAIT_SECONDS = 1.0
+
+
+class ThroughputExceeded(ValueError):
+    """
+    Raised when a table or index has no capacity left for a call, either client side or after DynamoDB kept
+    throttling the retries. retry_after is the amount of seconds after which capacity is expected to be available.
+    """
+
+    def __init__(self, table_name: str, index_name: str = None, retry_after: float = 1.0):
+        self.table_name = table_name
+        self.index_name = index_name
+        self.retry_after = retry_after
+        super().__init__(
+            {
+                "capacity_limiter": "throughput_exceeded",
+                "table_name": table_name,
+                "index_name": index_name,
+                "retry_after": round(retry_after, 3)
+            }
+        )
+
+
+class TokenBucket:
+    """
+    Thread safe token bucket. The balance may go negative when a call consumed more than was estimated; the debt is
+    paid back by the refill before the next call is let through.
+    """
+
+    def __init__(self, rate: float, burst_seconds: float = BURST_SECONDS):
+        self.rate = float(rate)
+        self.capacity = self.rate * burst_seconds
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, amount: float, max_wait: float = MAX_WAIT_SECONDS) -> float:
+        """
+        Take tokens from the bucket, sleeping up to max_wait seconds for the refill.
+
+        :param amount: tokens to take
+        :param max_wait: max seconds to wait
+        :return: the seconds waited; a negative value is the wait that would have been needed when it exceeds max_wait
+        """
+        with self._lock:
+            self._refill()
+            # a single call bigger than the whole bucket only needs the bucket to be full
+            amount = min(amount, self.capacity)
+            wait = (amount - self.tokens) / self.rate if self.tokens < amount else 0.0
+            if wait > max_wait:
+                return -wait
+            self.tokens -= amount
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def settle(self, amount: float) -> None:
+        """
+        Adjust the balance by the difference between the consumed and the estimated amount. Positive amounts take
+        tokens, negative amounts give them back.
+
+        :param amount: consumed minus estimated units
+        :return: None
+        """
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens - amount)
+
+    def drain(self) -> None:
+        """
+        Empty the bucket; used when dynamodb throttled a call so the other callers back off as well.
+        """
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.tokens, 0.0)
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+
+class CapacityLimiter:
+    """
+    Registry of token buckets per (table, index, read/write). Tables without configured capacity (on demand tables,
+    tables of other services) are not limited.
+    """
+
+    def __init__(self):
+        self.buckets = {}
+        # (table, index, kind) -> units consumed by the last single call, the estimate of the next one
+        self.estimates = {}
+        self._lock = threading.Lock()
+
+    def configure(self, table_name: str, capacity: Dict) -> None:
+        """
+        Configure the buckets of a table from its provisioned capacity.
+
+        :param table_name: name of the table
+        :param capacity: {"read": <rcu>, "write": <wcu>, "indexes": {<index_name>: {"read": <rcu>, "write": <wcu>}}}
+        :return: None
+        """
+        with self._lock:
+            for kind in ["read", "write"]:
+                if capacity.get(kind):
+                    self.buckets[(table_name, None, kind)] = TokenBucket(capacity[kind])
+            for index_name, index_capacity in capacity.get("indexes", {}).items():
+                for kind in ["read", "write"]:
+                    if index_capacity.get(kind):
+                        self.buckets[(table_name, index_name, kind)] = TokenBucket(index_capacity[kind])
+
+    def acquire(
+            self,
+            table_name: str,
+            kind: str,
+            units: float = 1.0,
+            index_name: str = None,
+            max_wait: float = MAX_WAIT_SECONDS) -> None:
+        """
+        Take capacity for a call before it is sent. A read on an index only takes from the index bucket, a write takes
+        from the table bucket and from the write bucket of every index of the table (gsi writes consume index wcu).
+
+        :param table_name: name of the table
+        :param kind: read or write
+        :param units: estimated capacity units of the call
+        :param index_name: index the call reads from, if any
+        :param max_wait: max seconds to wait per bucket before ThroughputExceeded is raised
+        :return: None
+        """
+        taken = []
+        for key in self._keys(table_name, kind, index_name):
+            waited = self.buckets[key].acquire(units, max_wait)
+            if waited < 0:
+                # hand back what the other buckets already gave for this call
+                for taken_key in taken:
+                    self.buckets[taken_key].settle(-units)
+                logger.warning({"capacity_limiter": "acquire", "table_name": table_name, "index_name": key[1],
+                                "kind": kind, "retry_after": round(-waited, 3)})
+                raise ThroughputExceeded(table_name, key[1], retry_after=-waited)
+            taken.append(key)
+
+    def estimate(self, table_name: str, kind: str, index_name: str = None, default: float = 1.0) -> float:
+        """
+        Estimated capacity units of the next call, the units the last call of the same kind consumed.
+
+        :param table_name: name of the table
+        :param kind: read or write
+        :param index_name: index the call reads from, if any
+        :param default: the estimate before any call was recorded
+        :return: float
+        """
+        return self.estimates.get((table_name, index_name, kind), default)
+
+    def record(
+            self,
+            table_name: str,
+            kind: str,
+            estimated: float,
+            consumed: List[Dict] or Dict or None,
+            index_name: str = None) -> None:
+        """
+        Settle the estimated units with the ConsumedCapacity dynamodb returned. A single call's consumption also becomes
+        the estimate of the next call on its table or index.
+
+        :param table_name: name of the table
+        :param kind: read or write
+        :param estimated: the units taken by acquire
+        :param consumed: ConsumedCapacity of the response (ReturnConsumedCapacity="INDEXES"), a list for batch calls
+        :param index_name: index the call read from, if any
+        :return: None
+        """
+        if not consumed:
+            return
+        for entry in consumed if isinstance(consumed, list) else [consumed]:
+            if entry.get("TableName", table_name) != table_name:
+                continue
+            for key in self._keys(table_name, kind, index_name):
+                if key[1] is None:
+                    units = entry.get("Table", {}).get("CapacityUnits")
+                else:
+                    units = entry.get("GlobalSecondaryIndexes", {}).get(key[1], {}).get("CapacityUnits")
+                if units is None:
+                    continue
+                self.buckets[key].settle(float(units) - estimated)
+                # batch calls consume units for many items, they say nothing about the next single call
+                if not isinstance(consumed, list) and key[1] == index_name:
+                    self.estimates[key] = max(float(units), 0.5)
+
+    def throttled(self, table_name: str, kind: str, index_name: str = None) -> float:
+        """
+        Drain the buckets of a throttled call.
+
+        :return: seconds until the table bucket has capacity again
+        """
+        retry_after = 1.0
+        for key in self._keys(table_name, kind, index_name):
+            self.buckets[key].drain()
+            retry_after = max(retry_after, 1.0 / self.buckets[key].rate)
+        return retry_after
+
+    def _keys(self, table_name: str, kind: str, index_name: str = None) -> List:
+        if index_name:
+            keys = [(table_name, index_name, kind)]
+        elif kind == "write":
+            keys = [key for key in self.buckets if key[0] == table_name and key[2] == "write"]
+        else:
+            keys = [(table_name, None, kind)]
+        return [key for key in keys if key in self.buckets]
@@ -11,17 +11,49 @@ full response object from Dynamo.
 
 import logging
 import json
+import random
+import threading
+import time
 from boto3.dynamodb import conditions
 from typing import Any, Dict, List
 
 # external installed imports
 import boto3
+from botocore.config import Config
 from botocore.exceptions import ClientError
 
+# internal imports
+from .capacity_limiter import CapacityLimiter, ThroughputExceeded
+
 # init logger and resource
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
-dynamodb = boto3.resource("dynamodb", region_name="us-west-2")
+# every thread shares the connection pool of one client; keep it above the worker threads that call in parallel (the
+# storage fan-out executor, parallel scans and batch writers) so none of them waits for or opens a spare connection
+MAX_POOL_CONNECTIONS = 16
+# throttled calls are retried by _call against the capacity limiter; keep botocore's own retries for transient errors
+# short so a throttle storm surfaces here instead of being retried up to 10 times inside botocore
+BOTO_CONFIG = Config(retries={"mode": "standard", "total_max_attempts": 2}, max_pool_connections=MAX_POOL_CONNECTIONS)
+dynamodb = boto3.resource("dynamodb", region_name="us-west-2", config=BOTO_CONFIG)
+
+# boto3 resources are not thread safe but their clients are; worker threads get their own resource over the shared
+# client, so they reuse the connections the warm-up opened and show up in the healthcheck's pool stats
+_thread_local = threading.local()
+_MAIN_THREAD = threading.main_thread()
+
+# error codes that mean the request was throttled and can be retried after backing off
+THROTTLE_ERROR_CODES = [
+    "ProvisionedThroughputExceededException",
+    "ThrottlingException",
+    "RequestLimitExceeded"
+]
+
+# client side token buckets per table and index, see configure_capacity
+limiter = CapacityLimiter()
+# retries of a throttled call before ThroughputExceeded is raised to the caller
+MAX_THROTTLE_RETRIES = 3
+# max seconds a batch write waits on the capacity limiter
+BULK_MAX_WAIT_SECONDS = 60
 
 
 def write(table_name: str, item: Dict = None, return_values="NONE") -> Dict:
@@ -35,9 +67,10 @@ def write(table_name: str, item: Dict = None, return_values="NONE") -> Dict:
     :param return_values: put_item only accepts one of: "NONE", "ALL_OLD"
     :return: None or item, depending on return_values value
     """
-    table = dynamodb.Table(table_name)
+    table = _table(table_name)
     try:
-        response = table.put_item(
+        response = _call(
+            table_name, "write", table.put_item,
             TableName=table_name,
             Item=item,
             ReturnValues=return_values,
@@ -81,7 +114,7 @@ def batch_write(table_name: str, list_of_items: List[Dict]) -> None:
     :param list_of_items: list of items to insert
     """
 
-    table = dynamodb.Table(table_name)
+    table = _table(table_name)
     with table.batch_writer() as batch:
         for item in list_of_items:
             batch.put_item(Item=item)
@@ -99,9 +132,10 @@ def write_conditional(table_name: str, item: Dict, condition_expr: str, return_v
     :param return_values: whether to return None, or the old values replaced. NONE or ALL_OLD
     :return: dict
     """
-    table = dynamodb.Table(table_name)
+    table = _table(table_name)
     try:
-        response = table.put_item(
+        response = _call(
+            table_name, "write", table.put_item,
             TableName=table_name,
             Item=item,
             ReturnValues=return_values,
@@ -117,17 +151,18 @@ def write_conditional(table_name: str, item: Dict, condition_expr: str, return_v
         )
         return response
     except ClientError as e:
-        logger.error(
-            {
-                "dynamodb_client": "write_conditional",
-                "success": False,
-                "table_name": table_name,
-                "msg": str(e.args[0])
-            }
-        )
+        log_message = {
+            "dynamodb_client": "write_conditional",
+            "success": False,
+            "table_name": table_name,
+            "msg": str(e.args[0])
+        }
         if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+            # an expected outcome the caller handles (a taken idempotency key, a concurrent update), not an error
+            logger.debug(log_message)
             raise ValueError("ConditionalCheckFailed")
         else:
+            logger.error(log_message)
             raise ValueError(
                 {
                     "dynamodb_client": "write",
@@ -146,10 +181,11 @@ def update_item(table_name: str, key: dict, updates: Dict, return_values="NONE")
     :param return_values: put_item only accepts one of: "NONE", "ALL_OLD"
     :return: None or item, depending on return_values value
     """
-    table = dynamodb.Table(table_name)
+    table = _table(table_name)
     try:
 
-        response = table.update_item(
+        response = _call(
+            table_name, "write", table.update_item,
             Key=key,
             AttributeUpdates=updates,
             ReturnValues=return_values,
@@ -191,7 +227,7 @@ def scan_table(table_name: str) -> Dict:
     :return: dict
     """
     try:
-        table = dynamodb.Table(table_name)
+        table = _table(table_name)
 
         # set operation flags and init results
         done = False
@@ -203,9 +239,9 @@ def scan_table(table_name: str) -> Dict:
         while not done:
             if start_key:
                 scan_kwargs["ExclusiveStartKey"] = start_key
-            response = table.scan(**scan_kwargs)
+            response = _call(table_name, "read", table.scan, **scan_kwargs)
             start_key = response.get("LastEvaluatedKey", None)
-            result = response.get("Items", [])
+            result.extend(response.get("Items", []))
             done = start_key is None
 
         # append the full items list to the last response object
@@ -226,7 +262,7 @@ def get_item(table_name: str, key: Dict) -> Dict:
     :return: dict
     """
     try:
-        table = dynamodb.Table(table_name)
+        table = _table(table_name)
         logger.debug(
             {
                 "dynamodb_client": "get_item",
@@ -234,7 +270,7 @@ def get_item(table_name: str, key: Dict) -> Dict:
                 "table_name": table_name
             }
         )
-        return table.get_item(Key=key)
+        return _call(table_name, "read", table.get_item, Key=key)
     except ClientError as e:
         err_message = {
             'dynamodb_client': 'get_item',
@@ -257,15 +293,17 @@ def get_item_count(table_name: str, primary_key: str, primary_key_val: str, quer
     :return: dict
     """
 
-    table = dynamodb.Table(table_name)
+    table = _table(table_name)
     if not query_index:
-        response = table.query(
+        response = _call(
+            table_name, "read", table.query,
             TableName=table_name,
             KeyConditionExpression=conditions.Key(primary_key).eq(primary_key_val),
             Select="COUNT"
         )["Count"]
     else:
-        response = table.query(
+        response = _call(
+            table_name, "read", table.query, index_name=table_name,
             IndexName=table_name,
             KeyConditionExpression=conditions.Key(primary_key).eq(primary_key_val),
             Select="COUNT"
@@ -291,8 +329,9 @@ def delete_item(table_name: str, item: Dict, return_values="NONE") -> Dict:
     :return: dict
     """
     try:
-        table = dynamodb.Table(table_name)
-        return table.delete_item(
+        table = _table(table_name)
+        return _call(
+            table_name, "write", table.delete_item,
             Key=item,
             ReturnValues=return_values
         )
@@ -311,14 +350,16 @@ def match_primary(table_name: str, primary_key: str, primary_key_val: str or int
     :return: dict
     """
 
-    table = dynamodb.Table(table_name)
+    table = _table(table_name)
     if not query_index:
-        response = table.query(
+        response = _call(
+            table_name, "read", table.query,
             TableName=table_name,
             KeyConditionExpression=conditions.Key(primary_key).eq(primary_key_val)
         )
     else:
-        response = table.query(
+        response = _call(
+            table_name, "read", table.query, index_name=index_name,
             IndexName=index_name,
             KeyConditionExpression=conditions.Key(primary_key).eq(primary_key_val)
         )
@@ -344,15 +385,17 @@ def query_keyCondition_filterExp(table_name: str, key_conditions, filter_express
     :return: dict
     """
 
-    table = dynamodb.Table(table_name)
+    table = _table(table_name)
     if index_name is None:
-        return table.query(
+        return _call(
+            table_name, "read", table.query,
             TableName=table_name,
             KeyConditionExpression=key_conditions,
             FilterExpression=filter_expressions
         )
     else:
-        return table.query(
+        return _call(
+            table_name, "read", table.query, index_name=index_name,
             IndexName=index_name,
             KeyConditionExpression=key_conditions,
             FilterExpression=filter_expressions
@@ -379,8 +422,9 @@ def match_primary_between_sort(
     :return: dict
     """
     try:
-        table = dynamodb.Table(table_name)
-        response = table.query(
+        table = _table(table_name)
+        response = _call(
+            table_name, "read", table.query,
             TableName=table_name,
             KeyConditionExpression=conditions.Key(primary_key).eq(primary_key_val)
                                    & conditions.Key(sort_key).between(sort_key_val_low, sort_key_val_high),
@@ -415,8 +459,8 @@ def query(table_name: str, query_params: Dict) -> Dict:
     try:
         # table.query(**kwargs) does not handle None types
         # the client is required to make a parameters dict according to the docs
-        table = dynamodb.Table(table_name)
-        response = table.query(**query_params)
+        table = _table(table_name)
+        response = _call(table_name, "read", table.query, index_name=query_params.get("IndexName"), **query_params)
         logger.debug(
             {
                 "dynamodb_client": "query",
@@ -433,6 +477,8 @@ def query(table_name: str, query_params: Dict) -> Dict:
         }
         logger.error(err_message)
         raise Exception(err_message)
+    except ThroughputExceeded:
+        raise
     except Exception as e:
         err_message = {
             "dynamodb_client": "query",
@@ -504,3 +550,223 @@ def _add_condition(item: Any or conditions.Key or conditions.Attr, operator: str
         return item.not_exists()
     # TODO: implement rest of operators
     return item
+
+
+def scan_segment(
+        table_name: str,
+        segment: int,
+        total_segments: int,
+        start_key: Dict = None,
+        limit: int = None,
+        select: str = None,
+        projection: str = None) -> Dict:
+    """
+    Description: Scan a single page of one segment of a parallel scan. The caller drives the paging with the
+    returned LastEvaluatedKey so that progress can be checkpointed between pages.
+    Link: https://boto3.amazonaws.com/v1/documentation/api/latest/reference/services/dynamodb.html#DynamoDB.Table.scan
+
+    :param table_name: table to scan
+    :param segment: the segment this worker is scanning (0 based)
+    :param total_segments: total amount of segments the table is split into
+    :param start_key: LastEvaluatedKey of the previous page, None to start at the beginning of the segment
+    :param limit: max amount of items to evaluate for the page
+    :param select: optional Select value, e.g. "COUNT"
+    :param projection: optional ProjectionExpression, e.g. only the key attributes
+    :return: dict
+    """
+    table = _table(table_name)
+    scan_kwargs = {
+        "Segment": segment,
+        "TotalSegments": total_segments
+    }
+    if start_key:
+        scan_kwargs["ExclusiveStartKey"] = start_key
+    if limit:
+        scan_kwargs["Limit"] = limit
+    if select:
+        scan_kwargs["Select"] = select
+    if projection:
+        scan_kwargs["ProjectionExpression"] = projection
+
+    try:
+        response = _call(table_name, "read", table.scan, **scan_kwargs)
+        logger.debug(
+            {
+                "dynamodb_client": "scan_segment",
+                "success": True,
+                "table_name": table_name,
+                "segment": segment
+            }
+        )
+        return response
+    except ClientError as e:
+        err_message = {
+            "dynamodb_client": "scan_segment",
+            "success": False,
+            "table_name": table_name,
+            "segment": segment,
+            "msg": str(e.args[0])
+        }
+        logger.error(err_message)
+        raise ValueError(err_message)
+
+
+def batch_write_items(table_name: str, list_of_items: List[Dict], max_retries: int = 8) -> Dict:
+    """
+    Description: Throttling aware batch put. Items are sent in chunks of 25 (the BatchWriteItem max) and any
+    UnprocessedItems or throttled requests are retried with jittered exponential backoff.
+    Link: https://boto3.amazonaws.com/v1/documentation/api/latest/reference/services/dynamodb.html#DynamoDB.ServiceResource.batch_write_item
+
+    :param table_name: table to insert into
+    :param list_of_items: list of items to insert
+    :param max_retries: how many times a chunk is retried before giving up
+    :return: dict -> {"written": <count>, "retries": <count>}
+    """
+    resource = _resource()
+    written = 0
+    retries = 0
+    for i in range(0, len(list_of_items), 25):
+        pending = [{"PutRequest": {"Item": item}} for item in list_of_items[i:i + 25]]
+        attempt = 0
+        while pending:
+            # bulk callers would rather wait for capacity than fail
+            limiter.acquire(table_name, "write", units=len(pending), max_wait=BULK_MAX_WAIT_SECONDS)
+            try:
+                response = resource.batch_write_item(
+                    RequestItems={table_name: pending},
+                    ReturnConsumedCapacity="INDEXES"
+                )
+                limiter.record(table_name, "write", len(pending), response.get("ConsumedCapacity"))
+                unprocessed = response.get("UnprocessedItems", {}).get(table_name, [])
+                if unprocessed:
+                    limiter.throttled(table_name, "write")
+            except ClientError as e:
+                # only a throttle means the table is out of capacity; other errors must not slow the other callers
+                if e.response["Error"]["Code"] not in THROTTLE_ERROR_CODES:
+                    err_message = {
+                        "dynamodb_client": "batch_write_items",
+                        "success": False,
+                        "table_name": table_name,
+                        "msg": str(e.args[0])
+                    }
+                    logger.error(err_message)
+                    raise ValueError(err_message)
+                limiter.throttled(table_name, "write")
+                unprocessed = pending
+
+            written += len(pending) - len(unprocessed)
+            pending = unprocessed
+            if pending:
+                attempt += 1
+                retries += 1
+                if attempt > max_retries:
+                    err_message = {
+                        "dynamodb_client": "batch_write_items",
+                        "success": False,
+                        "table_name": table_name,
+                        "msg": f"{len(pending)} items still unprocessed after {max_retries} retries"
+                    }
+                    logger.error(err_message)
+                    raise ValueError(err_message)
+                time.sleep(backoff_delay(attempt))
+
+    logger.debug(
+        {
+            "dynamodb_client": "batch_write_items",
+            "success": True,
+            "table_name": table_name,
+            "written": written,
+            "retries": retries
+        }
+    )
+    return {"written": written, "retries": retries}
+
+
+def describe_table(table_name: str) -> Dict:
+    """
+    Description: Describe a table. A cheap control plane call that does not consume table capacity, used to open the
+    pooled connection on warm-up and by the deep healthcheck.
+    Link: https://boto3.amazonaws.com/v1/documentation/api/latest/reference/services/dynamodb.html#DynamoDB.Client.describe_table
+
+    :param table_name: table to describe
+    :return: dict
+    """
+    try:
+        return dynamodb.meta.client.describe_table(TableName=table_name)
+    except ClientError as e:
+        err_message = {
+            "dynamodb_client": "describe_table",
+            "success": False,
+            "table_name": table_name,
+            "msg": str(e.args[0])
+        }
+        logger.error(err_message)
+        raise ValueError(err_message)
+
+
+def configure_capacity(table_name: str, capacity: Dict) -> None:
+    """
+    Description: Enable client side rate limiting of a provisioned table, see capacity_limiter.py
+
+    :param table_name: the table
+    :param capacity: {"read": <rcu>, "write": <wcu>, "indexes": {<index_name>: {"read": <rcu>, "write": <wcu>}}}
+    """
+    limiter.configure(table_name, capacity)
+
+
+def backoff_delay(attempt: int, base: float = 0.05, cap: float = 5.0) -> float:
+    """
+    Full jitter exponential backoff: a random delay between 0 and min(cap, base * 2 ** attempt).
+
+    :param attempt: the retry attempt, starting at 1
+    :param base: the delay in seconds of the first attempt
+    :param cap: the max delay in seconds
+    :return: seconds to sleep
+    """
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def _call(table_name: str, kind: str, request, index_name: str = None, units: float = None, **kwargs) -> Dict:
+    # send a table request through the capacity limiter; throttled requests are retried with jittered exponential
+    # backoff after draining the buckets so concurrent callers back off too, and every attempt takes capacity again so
+    # a retry waits for the drained buckets to refill. Without units the call is estimated from the last one of its
+    # kind (a query or scan page can consume far more than one unit) and settled against its ConsumedCapacity.
+    if units is None:
+        units = limiter.estimate(table_name, kind, index_name)
+    attempt = 0
+    while True:
+        limiter.acquire(table_name, kind, units, index_name)
+        try:
+            response = request(ReturnConsumedCapacity="INDEXES", **kwargs)
+            limiter.record(table_name, kind, units, response.get("ConsumedCapacity"), index_name)
+            return response
+        except ClientError as e:
+            if e.response["Error"]["Code"] not in THROTTLE_ERROR_CODES:
+                raise
+            retry_after = limiter.throttled(table_name, kind, index_name)
+            attempt += 1
+            if attempt > MAX_THROTTLE_RETRIES:
+                logger.warning(
+                    {
+                        "dynamodb_client": "throttled",
+                        "success": False,
+                        "table_name": table_name,
+                        "index_name": index_name,
+                        "attempts": attempt
+                    }
+                )
+                raise ThroughputExceeded(table_name, index_name, retry_after=retry_after)
+            time.sleep(backoff_delay(attempt))
+
+
+def _resource():
+    # the main thread keeps using the module level resource, worker threads lazily create their own on its client
+    if threading.current_thread() is _MAIN_THREAD:
+        return dynamodb
+    if not hasattr(_thread_local, "dynamodb"):
+        _thread_local.dynamodb = dynamodb.__class__(client=dynamodb.meta.client)
+    return _thread_local.dynamodb
+
+
+def _table(table_name: str):
+    return _resource().Table(table_name)
@@ -9,26 +9,65 @@ import boto3
 import json
 import base64
 import logging
+import threading
+import time
 from botocore.exceptions import ClientError
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+# clients are reused across invocations of a warm container so the TLS connection is kept alive
+_clients = {}
+# (secret_id, secret_key, region) -> (value, fetched_at); secrets are rotated rarely, re-fetch every CACHE_SECONDS
+_cache = {}
+_lock = threading.Lock()
+CACHE_SECONDS = 300
+cache_stats = {"hits": 0, "misses": 0}
 
-def get_secret(secret_id: str, secret_key: str, region_name="us-west-2") -> str or bytes:
+
+def get_secret(secret_id: str, secret_key: str, region_name="us-west-2", use_cache=True) -> str or bytes:
     """
-    get a secret key from the secret id
+    get a secret key from the secret id, cached for CACHE_SECONDS
     :param secret_id: the secret id to look in
     :param secret_key: the specific secret key to extract
     :param region_name: the aws region to operate in
+    :param use_cache: False to always fetch the secret from secrets manager
     :return: either the secret itself or the binary representation
     """
-    # Create a Secrets Manager client
-    session = boto3.Session()
-    client = session.client(
-        service_name="secretsmanager",
-        region_name=region_name
-    )
+    cache_key = (secret_id, secret_key, region_name)
+    if use_cache:
+        with _lock:
+            cached = _cache.get(cache_key)
+            if cached is not None and time.monotonic() - cached[1] < CACHE_SECONDS:
+                cache_stats["hits"] += 1
+                return cached[0]
+            cache_stats["misses"] += 1
+
+    secret = _fetch_secret(secret_id, secret_key, region_name)
+    # failed lookups return None and are not cached so the next call tries again
+    if secret is not None:
+        with _lock:
+            _cache[cache_key] = (secret, time.monotonic())
+    return secret
+
+
+def get_client(region_name="us-west-2"):
+    """
+    The Secrets Manager client of a region, created once per container.
+    :param region_name: the aws region to operate in
+    :return: boto3 secretsmanager client
+    """
+    with _lock:
+        if region_name not in _clients:
+            _clients[region_name] = boto3.Session().client(
+                service_name="secretsmanager",
+                region_name=region_name
+            )
+        return _clients[region_name]
+
+
+def _fetch_secret(secret_id: str, secret_key: str, region_name: str) -> str or bytes:
+    client = get_client(region_name)
 
     try:
         get_secret_value_response = client.get_secret_value(
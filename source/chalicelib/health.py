@@ -0,0 +1,220 @@
+"""
+filename: health.py
+author: Jack Gularte
+date: Oct. 19 2026
+
+Deep healthcheck (GET /healthcheck?deep=true). Times a DescribeTable of the reservations table and an uncached Secrets
+Manager fetch side by side, both bounded by one CHECK_TIMEOUT_SECONDS deadline, and reports the state of this container
+next to them: cold or warm, init duration, cache hit ratios, the boto connection pools and RSS memory. Slow checks with
+a warm, well hit container point at AWS; a cold container, misses or an exhausted pool point at our side.
+
+The checks use probe clients of their own, kept for the life of the container, whose botocore connect/read timeouts
+equal the check timeout and which do not retry: a hung dependency then frees its worker soon after the check is
+reported as timed out, instead of piling up in the pool, and the probes do not wait behind the API's own requests.
+"""
+# standard imports
+import json
+import logging
+import os
+import resource
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Callable, Dict
+
+# external installed imports
+import boto3
+from botocore.config import Config
+
+# internal imports
+from . import availability_service as availability
+from . import jwt_auth
+from .aws_clients import dynamodb_client as dc
+from .aws_clients import secrets_manager_client as sm_client
+
+# logger
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# globals
+CHECK_TIMEOUT_SECONDS = 2.0
+# a check that times out keeps its worker until its probe client's connect/read timeout ends the call, at most about
+# one timeout later, so keep spare workers for the checks of the next healthcheck
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="healthcheck")
+# (service, region, timeout) -> boto3 client used by the checks only
+_probe_clients = {}
+_probe_lock = threading.Lock()
+
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+
+# container state, set by app.py
+_container = {"init_ms": None, "invocations": 0, "started": time.time()}
+
+"""
+CONTAINER STATE
+"""
+
+
+def record_init() -> None:
+    """
+    Record how long the init of this container took: the age of the process at the end of the app's module level
+    init, so the runtime start and every import are included.
+
+    :return: None
+    """
+    try:
+        with open("/proc/uptime") as uptime, open("/proc/self/stat") as stat:
+            # the fields after the process name (which may contain spaces); starttime is the 22nd field
+            started_ticks = int(stat.read().rsplit(")", 1)[1].split()[19])
+            _container["init_ms"] = round((float(uptime.read().split()[0]) - started_ticks / CLOCK_TICKS) * 1000, 2)
+    except (OSError, ValueError, IndexError):
+        _container["init_ms"] = None
+
+
+def record_invocation() -> None:
+    _container["invocations"] += 1
+
+
+def container_state() -> Dict:
+    """
+    :return: {"cold": True for the first invocation of this container, "init_ms", "invocations", "uptime_seconds",
+              "initialization_type"}
+    """
+    return {
+        "cold": _container["invocations"] <= 1,
+        "init_ms": _container["init_ms"],
+        "invocations": _container["invocations"],
+        "uptime_seconds": round(time.time() - _container["started"], 1),
+        "initialization_type": os.environ.get("AWS_LAMBDA_INITIALIZATION_TYPE")
+    }
+
+
+"""
+DEEP CHECK
+"""
+
+
+def deep_check(dynamodb_table: str or None, secret: Dict or None, timeout: float = CHECK_TIMEOUT_SECONDS) -> Dict:
+    """
+    Run the dependency checks in parallel and collect the container's stats.
+
+    :param dynamodb_table: Table to DescribeTable, None when not running on DynamoDB
+    :param secret: {"secret_id", "secret_key", "secret_region"} of the auth token, None when there is none
+    :param timeout: Seconds all checks together may take before the unfinished ones are reported as timed out
+    :return: {"healthy", "checks", "container", "caches", "connection_pools", "memory"}
+    """
+    checks = {}
+    if dynamodb_table:
+        region = dc.dynamodb.meta.client.meta.region_name
+        checks["dynamodb"] = lambda: _probe_client("dynamodb", region, timeout).describe_table(TableName=dynamodb_table)
+    if secret:
+        checks["secrets_manager"] = lambda: _fetch_secret(secret, timeout)
+
+    # one deadline for all checks: every result only waits for what is left of it
+    deadline = time.monotonic() + timeout
+    futures = {name: _executor.submit(_timed, check) for name, check in checks.items()}
+    results = {}
+    for name, future in futures.items():
+        try:
+            results[name] = future.result(timeout=max(0.0, deadline - time.monotonic()))
+        except FutureTimeout:
+            results[name] = {"ok": False, "error": f"timed out after {timeout}s"}
+
+    report = {
+        "healthy": all(result["ok"] for result in results.values()),
+        "checks": results,
+        "container": container_state(),
+        "caches": {
+            "secrets_manager": _ratio(sm_client.cache_stats),
+            "jwt": _ratio(jwt_auth.cache_stats),
+            "availability": _ratio(availability.cache_stats)
+        },
+        "connection_pools": {
+            "dynamodb": pool_stats(dc.dynamodb.meta.client),
+            "secrets_manager": pool_stats(sm_client.get_client(secret["secret_region"])) if secret else None
+        },
+        "memory": memory_stats()
+    }
+    logger.info({"health": "deep_check", "healthy": report["healthy"], "checks": results})
+    return report
+
+
+def _fetch_secret(secret: Dict, timeout: float) -> None:
+    client = _probe_client("secretsmanager", secret["secret_region"], timeout)
+    response = client.get_secret_value(SecretId=secret["secret_id"])
+    if "SecretString" in response and secret["secret_key"] not in json.loads(response["SecretString"]):
+        raise ValueError(f"The secret has no key {secret['secret_key']}.")
+
+
+def _probe_client(service: str, region: str, timeout: float):
+    key = (service, region, timeout)
+    with _probe_lock:
+        if key not in _probe_clients:
+            _probe_clients[key] = boto3.session.Session().client(
+                service,
+                region_name=region,
+                config=Config(connect_timeout=timeout, read_timeout=timeout, retries={"total_max_attempts": 1})
+            )
+        return _probe_clients[key]
+
+
+"""
+STATS
+"""
+
+
+def pool_stats(client) -> Dict or str:
+    """
+    Connection pool usage of a boto3 client; reads botocore/urllib3 internals, so unknown layouts are reported as such.
+
+    :param client: boto3 client
+    :return: {"max_connections", "pools": [{"host", "connections_created", "requests", "idle"}]}
+    """
+    try:
+        session = client._endpoint.http_session
+        manager = session._manager
+        pools = []
+        for key in list(manager.pools.keys()):
+            pool = manager.pools.get(key)
+            if pool is None:
+                continue
+            pools.append({
+                "host": pool.host,
+                "connections_created": pool.num_connections,
+                "requests": pool.num_requests,
+                "idle": pool.pool.qsize() if pool.pool is not None else 0
+            })
+        return {"max_connections": session._max_pool_connections, "pools": pools}
+    except AttributeError:
+        return "unavailable"
+
+
+def memory_stats() -> Dict:
+    """
+    :return: {"rss_mb": current resident set size, "max_rss_mb": peak resident set size}
+    """
+    stats = {"max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)}
+    try:
+        with open("/proc/self/statm") as statm:
+            stats["rss_mb"] = round(int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024, 1)
+    except (OSError, ValueError, IndexError):
+        stats["rss_mb"] = None
+    return stats
+
+
+def _ratio(stats: Dict) -> Dict:
+    lookups = stats["hits"] + stats["misses"]
+    return dict(stats, hit_ratio=round(stats["hits"] / lookups, 3) if lookups else None)
+
+
+def _timed(check: Callable) -> Dict:
+    started = time.perf_counter()
+    try:
+        check()
+    except Exception as e:
+        return {"ok": False, "ms": _ms(started), "error": str(e)}
+    return {"ok": True, "ms": _ms(started)}
+
+
+def _ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 2)
@@ -0,0 +1,205 @@
+"""
+filename: idempotency_service.py
+author: Jack Gularte
+date: Oct. 19 2026
+
+Idempotency-Key support for the POST/PUT routes. The first request with a key claims an idempotency record with a
+conditional put, runs the handler and stores its response on the record. Retries with the same key are validated like
+any request (app.py validates the body before it calls run_idempotent) and then replay the stored response without
+running any reservation writes again. An expired or abandoned record is taken over
+with a write conditional on the record that was read, so only one of several concurrent retries runs the handler.
+Records expire via the table TTL.
+"""
+# standard imports
+import hashlib
+import json
+import logging
+import time
+from typing import Callable
+
+# chalice imports
+from chalice import Response
+
+# internal imports
+from . import storage
+from .reservations_service import handle_throttling
+
+# logger
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# globals
+IDEMPOTENCY_PRIMARY = "idempotency_key"
+# ttl attribute of the idempotency table, mirrors terraform/<env>/dynamodb_idempotency.tf
+IDEMPOTENCY_TTL = "expires_at"
+MAX_KEY_LENGTH = 255
+# a record still IN_PROGRESS after this many seconds belongs to an invocation that died (lambda timeout is 60s)
+LOCK_SECONDS = 60
+
+STATUS_IN_PROGRESS = "IN_PROGRESS"
+STATUS_COMPLETED = "COMPLETED"
+
+"""
+IDEMPOTENT EXECUTION
+"""
+
+
+@handle_throttling
+def run_idempotent(
+        table_name: str,
+        idempotency_key: str,
+        scope: str,
+        request_body: dict or None,
+        handler: Callable[[], Response],
+        ttl_seconds: int = 86400) -> Response:
+    """
+    Run the handler at most once per idempotency key and replay its response for retries.
+
+    :param table_name: Idempotency table name
+    :param idempotency_key: The Idempotency-Key header value
+    :param scope: Route and caller the key is scoped to, e.g. "POST /reservations user"
+    :param request_body: The request body; a retry with a different body is rejected
+    :param handler: Runs the request, called at most once per key
+    :param ttl_seconds: How long a stored response is replayed
+    :return: Chalice response object.
+    """
+    if not idempotency_key or len(idempotency_key) > MAX_KEY_LENGTH or not idempotency_key.isprintable():
+        return Response(
+            status_code=400,
+            body={
+                "error": f"The Idempotency-Key header must be 1 to {MAX_KEY_LENGTH} printable characters."
+            }
+        )
+
+    now = int(time.time())
+    record = {
+        IDEMPOTENCY_PRIMARY: f"{scope}#{idempotency_key}",
+        "status": STATUS_IN_PROGRESS,
+        "fingerprint": fingerprint(request_body),
+        "locked_until": now + LOCK_SECONDS,
+        IDEMPOTENCY_TTL: now + ttl_seconds
+    }
+
+    # claim the key; if it is taken either replay, reject or take over an expired/abandoned record
+    backend = storage.get_backend()
+    try:
+        backend.put_item_if_absent(table_name=table_name, item=record)
+    except storage.ConditionalCheckFailed:
+        existing = backend.get_item(table_name=table_name, key={IDEMPOTENCY_PRIMARY: record[IDEMPOTENCY_PRIMARY]})
+        conflict = _existing_response(existing, record, now)
+        if conflict is not None:
+            return conflict
+        if not _take_over(backend, table_name, existing, record):
+            return in_progress_response()
+
+    try:
+        response = handler()
+    except Exception:
+        # release the key so the client's retry runs the request again
+        _release(backend, table_name, record)
+        raise
+
+    # server errors and throttles are not final, release the key instead of storing them
+    if response.status_code >= 500 or response.status_code == 429:
+        _release(backend, table_name, record)
+        return response
+
+    record["status"] = STATUS_COMPLETED
+    record["response_status"] = response.status_code
+    record["response_body"] = json.dumps(response.body)
+    try:
+        backend.put_item(table_name=table_name, item=record)
+    except ValueError as ve:
+        # the request itself succeeded, never turn that into an error; retries get a 409 until the lock expires
+        logger.error({"idempotency_service": "store_response", "success": False,
+                      "idempotency_key": record[IDEMPOTENCY_PRIMARY], "msg": str(ve)})
+    return response
+
+
+def _existing_response(existing: dict or None, record: dict, now: int) -> Response or None:
+    # None means the existing record can be taken over
+    if existing is None or int(existing[IDEMPOTENCY_TTL]) <= now:
+        return None
+    if existing["fingerprint"] != record["fingerprint"]:
+        return Response(
+            status_code=422,
+            body={
+                "error": "This Idempotency-Key was already used with a different request body."
+            }
+        )
+    if existing["status"] == STATUS_IN_PROGRESS:
+        if int(existing["locked_until"]) <= now:
+            logger.warning({"idempotency_service": "take_over", "idempotency_key": record[IDEMPOTENCY_PRIMARY]})
+            return None
+        return in_progress_response()
+
+    logger.info({"idempotency_service": "replay", "idempotency_key": record[IDEMPOTENCY_PRIMARY]})
+    return Response(
+        status_code=int(existing["response_status"]),
+        headers={"Idempotent-Replayed": "true"},
+        body=json.loads(existing["response_body"])
+    )
+
+
+def _take_over(backend: storage.StorageBackend, table_name: str, existing: dict or None, record: dict) -> bool:
+    # only one of several concurrent retries may take over a stale record: the write is conditional on the record
+    # still being the one that was read, the losers get ConditionalCheckFailed and report the request in progress
+    try:
+        if existing is None:
+            backend.put_item_if_absent(table_name=table_name, item=record)
+        else:
+            backend.put_item_if_unchanged(
+                table_name=table_name,
+                item=record,
+                expected={attribute: existing[attribute] for attribute in ["locked_until", "fingerprint", "status"]}
+            )
+    except storage.ConditionalCheckFailed:
+        logger.info({"idempotency_service": "take_over_lost", "idempotency_key": record[IDEMPOTENCY_PRIMARY]})
+        return False
+    return True
+
+
+def _release(backend: storage.StorageBackend, table_name: str, record: dict) -> None:
+    # a failed release must not replace the handler's exception or response; the record stays IN_PROGRESS and is
+    # taken over once its lock expires
+    try:
+        backend.delete_item(table_name=table_name, key={IDEMPOTENCY_PRIMARY: record[IDEMPOTENCY_PRIMARY]})
+    except Exception as e:
+        logger.error({"idempotency_service": "release", "success": False,
+                      "idempotency_key": record[IDEMPOTENCY_PRIMARY], "msg": str(e)})
+
+
+def in_progress_response() -> Response:
+    return Response(
+        status_code=409,
+        headers={"Retry-After": "1"},
+        body={
+            "error": "A request with this Idempotency-Key is still in progress."
+        }
+    )
+
+
+"""
+HELPERS
+"""
+
+
+def fingerprint(request_body: dict or None) -> str:
+    """
+    Stable hash of a request body.
+
+    :param request_body: The request body
+    :return: hex sha256 digest
+    """
+    return hashlib.sha256(json.dumps(request_body, sort_keys=True).encode()).hexdigest()
+
+
+def register_tables(backend: storage.StorageBackend, table_name: str) -> None:
+    """
+    Register the key schema of the idempotency table with the storage backend.
+
+    :param backend: The storage backend
+    :param table_name: The idempotency table
+    :return: None
+    """
+    backend.register_table(table_name, hash_key=IDEMPOTENCY_PRIMARY)
@@ -0,0 +1,229 @@
+"""
+filename: jwt_auth.py
+author: Jack Gularte
+date: Oct. 19 2026
+
+Local verification of Cognito user pool JWTs for the authorizer. The pool's JWKS is fetched once and kept for the
+life of the container; it is only fetched again when a token names a key id that is not in the cache (Cognito key
+rotation). Verified claims are cached per token until the token expires, so a request costs no network round trip.
+
+RS256 signatures are verified with the standard library (RSASSA-PKCS1-v1_5 with SHA-256, RFC 8017 8.2.2) by comparing
+the full expected encoding, which keeps the authorizer free of compiled crypto dependencies.
+"""
+# standard imports
+import base64
+import collections
+import hashlib
+import hmac
+import json
+import logging
+import threading
+import time
+import urllib.request
+from typing import Dict
+
+# logger
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# globals
+JWKS_URL = "https://cognito-idp.{region}.amazonaws.com/{user_pool_id}/.well-known/jwks.json"
+ISSUER = "https://cognito-idp.{region}.amazonaws.com/{user_pool_id}"
+JWKS_TIMEOUT_SECONDS = 3
+# an unknown kid triggers at most one JWKS fetch per this many seconds, so forged kids can not hammer Cognito
+MIN_REFRESH_SECONDS = 60
+LEEWAY_SECONDS = 30
+MAX_CACHED_TOKENS = 1024
+# DER encoded DigestInfo prefix of a SHA-256 digest, RFC 8017 9.2 note 1
+SHA256_DIGEST_INFO = bytes.fromhex("3031300d060960864801650304020105000420")
+
+_lock = threading.Lock()
+# kid -> (n, e)
+_jwks = {}
+_jwks_fetched_at = None
+# token -> claims, oldest first
+_claims_cache = collections.OrderedDict()
+cache_stats = {"hits": 0, "misses": 0, "jwks_fetches": 0}
+
+
+class InvalidToken(ValueError):
+    """
+    Raised when a token can not be verified.
+    """
+
+
+"""
+VERIFICATION
+"""
+
+
+def verify_token(token: str, region: str, user_pool_id: str, app_client_id: str) -> Dict:
+    """
+    Verify a Cognito id or access token and return its claims.
+
+    :param token: The raw JWT
+    :param region: Region of the user pool
+    :param user_pool_id: The user pool id
+    :param app_client_id: The app client the token must be issued to
+    :return: The token's claims
+    """
+    now = time.time()
+    with _lock:
+        claims = _claims_cache.get(token)
+        if claims is not None and claims["exp"] > now:
+            _claims_cache.move_to_end(token)
+            cache_stats["hits"] += 1
+            return claims
+        cache_stats["misses"] += 1
+
+    claims = _verify(token, region, user_pool_id, app_client_id, now)
+    with _lock:
+        _claims_cache[token] = claims
+        _claims_cache.move_to_end(token)
+        while len(_claims_cache) > MAX_CACHED_TOKENS:
+            _claims_cache.popitem(last=False)
+    return claims
+
+
+def _verify(token: str, region: str, user_pool_id: str, app_client_id: str, now: float) -> Dict:
+    try:
+        encoded_header, encoded_claims, encoded_signature = token.split(".")
+        header = json.loads(_b64url_decode(encoded_header))
+        claims = json.loads(_b64url_decode(encoded_claims))
+        signature = _b64url_decode(encoded_signature)
+        if not isinstance(header, dict) or not isinstance(claims, dict):
+            raise ValueError("header and claims must be json objects")
+    except ValueError:
+        raise InvalidToken("The token is not a well formed JWT.")
+
+    if header.get("alg") != "RS256":
+        raise InvalidToken(f"Unsupported token algorithm '{header.get('alg')}'.")
+    n, e = get_signing_key(header.get("kid"), region, user_pool_id)
+    if not _verify_rs256(f"{encoded_header}.{encoded_claims}".encode(), signature, n, e):
+        raise InvalidToken("The token signature is invalid.")
+
+    if claims.get("iss") != ISSUER.format(region=region, user_pool_id=user_pool_id):
+        raise InvalidToken("The token was not issued by the user pool.")
+    if not isinstance(claims.get("exp"), int) or claims["exp"] + LEEWAY_SECONDS <= now:
+        raise InvalidToken("The token is expired.")
+    if claims.get("token_use") == "id":
+        audience = claims.get("aud")
+    elif claims.get("token_use") == "access":
+        audience = claims.get("client_id")
+    else:
+        raise InvalidToken(f"Unsupported token_use '{claims.get('token_use')}'.")
+    if audience != app_client_id:
+        raise InvalidToken("The token was not issued to this app client.")
+    if not claims.get("sub"):
+        raise InvalidToken("The token has no subject.")
+    return claims
+
+
+def _verify_rs256(signing_input: bytes, signature: bytes, n: int, e: int) -> bool:
+    # RSASSA-PKCS1-v1_5 verify: build the expected EMSA encoding and compare the whole block in constant time
+    k = (n.bit_length() + 7) // 8
+    if len(signature) != k:
+        return False
+    s = int.from_bytes(signature, "big")
+    if s >= n:
+        return False
+    encoded = pow(s, e, n).to_bytes(k, "big")
+    digest_info = SHA256_DIGEST_INFO + hashlib.sha256(signing_input).digest()
+    padding_length = k - len(digest_info) - 3
+    if padding_length < 8:
+        return False
+    expected = b"\x00\x01" + b"\xff" * padding_length + b"\x00" + digest_info
+    return hmac.compare_digest(encoded, expected)
+
+
+"""
+JWKS
+"""
+
+
+def get_signing_key(kid: str, region: str, user_pool_id: str) -> tuple:
+    """
+    Public key of a key id, the JWKS is only fetched when the kid is not cached.
+
+    :param kid: The key id from the token header
+    :param region: Region of the user pool
+    :param user_pool_id: The user pool id
+    :return: (modulus, exponent)
+    """
+    global _jwks_fetched_at
+    with _lock:
+        if kid in _jwks:
+            return _jwks[kid]
+        if _jwks_fetched_at is not None and time.monotonic() - _jwks_fetched_at < MIN_REFRESH_SECONDS:
+            raise InvalidToken(f"Unknown signing key '{kid}'.")
+
+    # only a successful fetch starts the MIN_REFRESH_SECONDS window, so after a failed fetch the next token retries
+    keys = fetch_jwks(region, user_pool_id)
+    with _lock:
+        _jwks.clear()
+        _jwks.update(keys)
+        _jwks_fetched_at = time.monotonic()
+        cache_stats["jwks_fetches"] += 1
+        if kid not in _jwks:
+            raise InvalidToken(f"Unknown signing key '{kid}'.")
+        return _jwks[kid]
+
+
+def prime_jwks(region: str, user_pool_id: str) -> int:
+    """
+    Fetch the JWKS ahead of the first token, on warm-up and container init. A no-op while keys are cached; a failed
+    fetch raises InvalidToken and does not count against MIN_REFRESH_SECONDS, so the first token can still fetch.
+
+    :param region: Region of the user pool
+    :param user_pool_id: The user pool id
+    :return: The amount of cached keys
+    """
+    global _jwks_fetched_at
+    with _lock:
+        if _jwks:
+            return len(_jwks)
+
+    keys = fetch_jwks(region, user_pool_id)
+    with _lock:
+        _jwks.clear()
+        _jwks.update(keys)
+        _jwks_fetched_at = time.monotonic()
+        cache_stats["jwks_fetches"] += 1
+        return len(_jwks)
+
+
+def fetch_jwks(region: str, user_pool_id: str) -> Dict:
+    """
+    Download the RSA signing keys of the user pool.
+
+    :param region: Region of the user pool
+    :param user_pool_id: The user pool id
+    :return: {kid: (modulus, exponent)}
+    """
+    url = JWKS_URL.format(region=region, user_pool_id=user_pool_id)
+    try:
+        with urllib.request.urlopen(url, timeout=JWKS_TIMEOUT_SECONDS) as response:
+            jwks = json.loads(response.read())
+    except (OSError, ValueError) as e:
+        logger.error({"jwt_auth": "fetch_jwks", "success": False, "msg": str(e)})
+        raise InvalidToken("The user pool signing keys could not be fetched.")
+
+    logger.info({"jwt_auth": "fetch_jwks", "success": True, "keys": len(jwks.get("keys", []))})
+    return {
+        key["kid"]: (_b64url_int(key["n"]), _b64url_int(key["e"]))
+        for key in jwks.get("keys", [])
+        if key.get("kty") == "RSA" and key.get("kid")
+    }
+
+
+"""
+HELPERS
+"""
+
+
+def _b64url_decode(value: str) -> bytes:
+    return base64.urlsafe_b64decode(value + "=" * (-len(value) % 4))
+
+
+def _b64url_int(value: str) -> int:
+    return int.from_bytes(_b64url_decode(value), "big")
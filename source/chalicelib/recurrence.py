@@ -0,0 +1,335 @@
+"""
+filename: recurrence.py
+author: Jack Gularte
+date: Oct. 19 2026
+
+Recurring reservations. A recurring reservation is a single item with a 'recurrence' rule, a subset of the iCalendar
+RRULE (RFC 5545); its epoch_start/epoch_end are the first occurrence and give the length of every occurrence. As
+DTSTART in RFC 5545 the first occurrence is always part of the series, counts towards COUNT and need not match the rule:
+
+    FREQ        DAILY, WEEKLY, MONTHLY or YEARLY (required)
+    INTERVAL    every n-th period, default 1
+    COUNT       amount of occurrences, or
+    UNTIL       last possible start, YYYYMMDD or YYYYMMDDTHHMMSSZ (UTC)
+    BYDAY       WEEKLY: MO,TU,...; MONTHLY: weekdays with an optional ordinal, 1SA = first saturday, -1SU = last sunday
+    BYMONTHDAY  MONTHLY: days of the month, -1 = last day
+
+e.g. "FREQ=MONTHLY;BYDAY=1SA" with a 2 night first occurrence is every first weekend of the month. Occurrences are
+only ever expanded lazily within a window, so a rule costs one item no matter how far ahead it runs. A rule with COUNT
+or UNTIL must end within MAX_RULE_YEARS of its first occurrence, and occurrences may not overlap each other (a stay
+longer than the gap to the next occurrence). All dates are UTC.
+"""
+# standard imports
+import calendar
+import itertools
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Tuple
+
+# globals
+FREQUENCIES = ["DAILY", "WEEKLY", "MONTHLY", "YEARLY"]
+WEEKDAYS = ["MO", "TU", "WE", "TH", "FR", "SA", "SU"]
+MAX_COUNT = 1000
+# the last occurrence of a rule with COUNT or UNTIL must start within this many years of the first one
+MAX_RULE_YEARS = 10
+# occurrences checked for overlaps by validate_rule, more than a year of any weekly or monthly rule
+OVERLAP_CHECK_OCCURRENCES = 400
+SECONDS_PER_DAY = 86400
+BYDAY_PATTERN = re.compile(r"^([+-]?[1-5])?(MO|TU|WE|TH|FR|SA|SU)$")
+UNTIL_FORMATS = ["%Y%m%dT%H%M%SZ", "%Y%m%d"]
+
+"""
+RULES
+"""
+
+
+def parse_rule(rule: str) -> Dict:
+    """
+    Parse and validate a recurrence rule.
+
+    :param rule: e.g. "FREQ=WEEKLY;INTERVAL=2;BYDAY=SA,SU;COUNT=10"
+    :return: {"freq", "interval", "count", "until", "byday": [(ordinal or None, weekday)], "bymonthday": [int]}
+    """
+    if not isinstance(rule, str) or not rule:
+        raise ValueError("The recurrence rule must be a non empty string.")
+    parts = {}
+    for part in rule.upper().split(";"):
+        name, _, value = part.partition("=")
+        if name not in ["FREQ", "INTERVAL", "COUNT", "UNTIL", "BYDAY", "BYMONTHDAY"]:
+            raise ValueError(f"The recurrence rule part '{name}' is not supported.")
+        if not value or name in parts:
+            raise ValueError(f"The recurrence rule part '{name}' is empty or repeated.")
+        parts[name] = value
+
+    parsed = {
+        "freq": parts.get("FREQ"),
+        "interval": _positive_int(parts.get("INTERVAL", "1"), "INTERVAL"),
+        "count": _positive_int(parts["COUNT"], "COUNT") if "COUNT" in parts else None,
+        "until": _until(parts["UNTIL"]) if "UNTIL" in parts else None,
+        "byday": [_byday(value) for value in parts["BYDAY"].split(",")] if "BYDAY" in parts else [],
+        "bymonthday": [_monthday(value) for value in parts["BYMONTHDAY"].split(",")] if "BYMONTHDAY" in parts else []
+    }
+    if parsed["freq"] not in FREQUENCIES:
+        raise ValueError(f"FREQ must be one of {FREQUENCIES}.")
+    if parsed["count"] is not None and parsed["until"] is not None:
+        raise ValueError("A recurrence rule can have COUNT or UNTIL, not both.")
+    if parsed["count"] is not None and parsed["count"] > MAX_COUNT:
+        raise ValueError(f"COUNT can be at most {MAX_COUNT}.")
+    if parsed["byday"] and parsed["freq"] not in ["WEEKLY", "MONTHLY"]:
+        raise ValueError("BYDAY is only supported with FREQ=WEEKLY or FREQ=MONTHLY.")
+    if parsed["freq"] == "WEEKLY" and any(ordinal is not None for ordinal, _ in parsed["byday"]):
+        raise ValueError("BYDAY ordinals such as 1SA are only supported with FREQ=MONTHLY.")
+    if parsed["bymonthday"] and parsed["freq"] != "MONTHLY":
+        raise ValueError("BYMONTHDAY is only supported with FREQ=MONTHLY.")
+    return parsed
+
+
+def validate_rule(reservation: Dict) -> str or None:
+    """
+    Check the recurrence rule of a reservation, if it has one: its syntax, that a rule with COUNT or UNTIL ends within
+    MAX_RULE_YEARS and that its occurrences do not overlap.
+
+    :param reservation: The reservation, with valid epoch_start and epoch_end
+    :return: Error message, None if there is no rule or it is valid.
+    """
+    if "recurrence" not in reservation:
+        return None
+    try:
+        rule = parse_rule(reservation["recurrence"])
+        epoch_start = int(reservation["epoch_start"])
+        duration = int(reservation["epoch_end"]) - epoch_start
+        horizon = _horizon(epoch_start)
+        if rule["until"] is not None and _epoch(rule["until"]) > horizon:
+            return f"Invalid recurrence rule: UNTIL can be at most {MAX_RULE_YEARS} years after epoch_start."
+        # bounded by COUNT, UNTIL or OVERLAP_CHECK_OCCURRENCES, and by the horizon
+        limit = rule["count"] or OVERLAP_CHECK_OCCURRENCES
+        starts = [start for start, _ in itertools.islice(occurrences(reservation, epoch_start, horizon), limit)]
+    except ValueError as ve:
+        return f"Invalid recurrence rule: {ve}"
+    except (OverflowError, OSError):
+        return "Invalid recurrence rule: the occurrences are outside of the supported dates."
+
+    if rule["count"] is not None and len(starts) < rule["count"]:
+        return f"Invalid recurrence rule: the last of the COUNT occurrences must start within {MAX_RULE_YEARS} years " \
+               f"after epoch_start."
+    if any(following - start < duration for start, following in zip(starts, starts[1:])):
+        return "Invalid recurrence rule: the reservation is longer than the gap between two of its occurrences."
+    return None
+
+
+def is_recurring(reservation: Dict) -> bool:
+    return bool(reservation.get("recurrence"))
+
+
+"""
+EXPANSION
+"""
+
+
+def occurrences(reservation: Dict, window_start: int, window_end: int) -> Iterator[Tuple[int, int]]:
+    """
+    Lazily expand the occurrences of a reservation that overlap a window. A reservation without a rule has its one
+    occurrence.
+
+    :param reservation: The reservation
+    :param window_start: Epoch of the start of the window
+    :param window_end: Epoch of the end of the window
+    :return: iterator of (epoch_start, epoch_end), earliest first
+    """
+    epoch_start = int(reservation["epoch_start"])
+    duration = int(reservation["epoch_end"]) - epoch_start
+    if not is_recurring(reservation):
+        if epoch_start < window_end and epoch_start + duration > window_start:
+            yield epoch_start, epoch_start + duration
+        return
+
+    rule = parse_rule(reservation["recurrence"])
+    dtstart = datetime.fromtimestamp(epoch_start, tz=timezone.utc)
+    # the first occurrence is always part of the series, whether or not it matches the rule
+    if epoch_start >= window_end:
+        return
+    if epoch_start + duration > window_start:
+        yield epoch_start, epoch_start + duration
+    # without a COUNT nothing before the window matters, skip straight to the periods around its start
+    first_period = 0 if rule["count"] else max(0, _period_index(rule, dtstart, window_start - duration) - 1)
+
+    produced = 1
+    period = first_period
+    while True:
+        period_start = _period_anchor(rule, dtstart, period)
+        if _epoch(period_start) >= window_end:
+            return
+        for start in _period_starts(rule, dtstart, period):
+            if start <= dtstart:
+                continue
+            if rule["until"] is not None and start > rule["until"]:
+                return
+            if rule["count"] is not None and produced == rule["count"]:
+                return
+            produced += 1
+            occurrence_start = _epoch(start)
+            if occurrence_start >= window_end:
+                return
+            if occurrence_start + duration > window_start:
+                yield occurrence_start, occurrence_start + duration
+        period += 1
+
+
+def expand(reservation: Dict, window_start: int, window_end: int) -> List[Dict]:
+    """
+    The occurrences of a reservation within a window as reservation dicts, with epoch_start/epoch_end of the occurrence.
+
+    :param reservation: The reservation
+    :param window_start: Epoch of the start of the window
+    :param window_end: Epoch of the end of the window
+    :return: list of reservations
+    """
+    return [
+        dict(reservation, epoch_start=start, epoch_end=end)
+        for start, end in occurrences(reservation, window_start, window_end)
+    ]
+
+
+def final_end(reservation: Dict) -> int or None:
+    """
+    End of the last occurrence of a reservation.
+
+    :param reservation: The reservation
+    :return: Epoch, None for a rule without COUNT or UNTIL, which never ends.
+    """
+    if not is_recurring(reservation):
+        return int(reservation["epoch_end"])
+    rule = parse_rule(reservation["recurrence"])
+    epoch_start = int(reservation["epoch_start"])
+    duration = int(reservation["epoch_end"]) - epoch_start
+    if rule["until"] is not None:
+        last = _epoch(_last_start(rule, datetime.fromtimestamp(epoch_start, tz=timezone.utc), rule["until"]))
+    elif rule["count"] is not None:
+        # at most MAX_COUNT occurrences, and validate_rule keeps the last one within the horizon
+        last = epoch_start
+        for last, _ in occurrences(reservation, epoch_start, _horizon(epoch_start)):
+            pass
+    else:
+        return None
+    return last + duration
+
+
+"""
+HELPERS
+"""
+
+
+def _last_start(rule: Dict, dtstart: datetime, until: datetime) -> datetime:
+    # the last occurrence starting at or before UNTIL: jump to the period holding UNTIL and step back over periods
+    # without a match (e.g. BYMONTHDAY=31 in a 30 day month); the first occurrence when nothing else matches
+    period = _period_index(rule, dtstart, _epoch(until))
+    while period >= 0:
+        starts = [start for start in _period_starts(rule, dtstart, period) if dtstart < start <= until]
+        if starts:
+            return starts[-1]
+        period -= 1
+    return dtstart
+
+
+def _horizon(epoch_start: int) -> int:
+    return epoch_start + MAX_RULE_YEARS * 366 * SECONDS_PER_DAY
+
+
+def _period_index(rule: Dict, dtstart: datetime, epoch: int) -> int:
+    # index of the period an epoch falls in, counted in INTERVALs from the period of dtstart
+    moment = datetime.fromtimestamp(max(epoch, 0), tz=timezone.utc)
+    if rule["freq"] == "DAILY":
+        elapsed = (moment.date() - dtstart.date()).days
+    elif rule["freq"] == "WEEKLY":
+        # weeks start on the monday of the week of dtstart
+        elapsed = ((moment.date() - dtstart.date()).days + dtstart.weekday()) // 7
+    elif rule["freq"] == "MONTHLY":
+        elapsed = (moment.year - dtstart.year) * 12 + moment.month - dtstart.month
+    else:
+        elapsed = moment.year - dtstart.year
+    return elapsed // rule["interval"]
+
+
+def _period_anchor(rule: Dict, dtstart: datetime, period: int) -> datetime:
+    # earliest moment of a period, at midnight
+    day = dtstart.replace(hour=0, minute=0, second=0, microsecond=0)
+    steps = period * rule["interval"]
+    if rule["freq"] == "DAILY":
+        return day + timedelta(days=steps)
+    if rule["freq"] == "WEEKLY":
+        return day - timedelta(days=dtstart.weekday()) + timedelta(weeks=steps)
+    if rule["freq"] == "MONTHLY":
+        year, month = divmod(dtstart.month - 1 + steps, 12)
+        return day.replace(year=dtstart.year + year, month=month + 1, day=1)
+    return day.replace(year=dtstart.year + steps, month=1, day=1)
+
+
+def _period_starts(rule: Dict, dtstart: datetime, period: int) -> List[datetime]:
+    # occurrence starts within one period, sorted, at the time of day of dtstart
+    anchor = _period_anchor(rule, dtstart, period)
+    if rule["freq"] == "DAILY":
+        days = [anchor]
+    elif rule["freq"] == "WEEKLY":
+        weekdays = sorted({WEEKDAYS.index(day) for _, day in rule["byday"]}) or [dtstart.weekday()]
+        days = [anchor + timedelta(days=weekday) for weekday in weekdays]
+    elif rule["freq"] == "MONTHLY":
+        days = [anchor.replace(day=day) for day in _month_days(rule, dtstart, anchor.year, anchor.month)]
+    else:
+        days = [anchor.replace(month=dtstart.month, day=dtstart.day)] \
+            if dtstart.day <= calendar.monthrange(anchor.year, dtstart.month)[1] else []
+    return [day.replace(hour=dtstart.hour, minute=dtstart.minute, second=dtstart.second) for day in days]
+
+
+def _month_days(rule: Dict, dtstart: datetime, year: int, month: int) -> List[int]:
+    # days of a month matching BYMONTHDAY and BYDAY (both must match when both are given)
+    days_in_month = calendar.monthrange(year, month)[1]
+    candidates = set(range(1, days_in_month + 1))
+    if rule["bymonthday"]:
+        candidates &= {day if day > 0 else days_in_month + day + 1 for day in rule["bymonthday"]}
+    if rule["byday"]:
+        matching = set()
+        for ordinal, weekday in rule["byday"]:
+            days = [day for day in range(1, days_in_month + 1)
+                    if calendar.weekday(year, month, day) == WEEKDAYS.index(weekday)]
+            if ordinal is None:
+                matching.update(days)
+            elif -len(days) <= ordinal <= len(days):
+                matching.add(days[ordinal - 1 if ordinal > 0 else ordinal])
+        candidates &= matching
+    if not rule["bymonthday"] and not rule["byday"]:
+        candidates &= {dtstart.day}
+    return sorted(candidates)
+
+
+def _positive_int(value: str, name: str) -> int:
+    if not value.isdigit() or int(value) < 1:
+        raise ValueError(f"{name} must be a positive whole number.")
+    return int(value)
+
+
+def _until(value: str) -> datetime:
+    for until_format in UNTIL_FORMATS:
+        try:
+            until = datetime.strptime(value, until_format).replace(tzinfo=timezone.utc)
+        except ValueError:
+            continue
+        # a date only UNTIL includes starts on that day
+        return until if "T" in value else until + timedelta(days=1, seconds=-1)
+    raise ValueError("UNTIL must be formatted as YYYYMMDD or YYYYMMDDTHHMMSSZ.")
+
+
+def _byday(value: str) -> Tuple[int or None, str]:
+    match = BYDAY_PATTERN.match(value)
+    if not match:
+        raise ValueError(f"BYDAY value '{value}' is not a weekday (MO..SU) with an optional ordinal (-5..5).")
+    return int(match.group(1)) if match.group(1) else None, match.group(2)
+
+
+def _monthday(value: str) -> int:
+    if not re.match(r"^[+-]?\d{1,2}$", value) or not 1 <= abs(int(value)) <= 31:
+        raise ValueError(f"BYMONTHDAY value '{value}' must be between -31 and 31, not 0.")
+    return int(value)
+
+
+def _epoch(moment: datetime) -> int:
+    return int(moment.timestamp())
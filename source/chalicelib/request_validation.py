@@ -0,0 +1,287 @@
+"""
+filename: request_validation.py
+author: Jack Gularte
+date: Oct. 19 2026
+
+Validation stage that runs in front of every reservation handler. Size, query parameter, schema and semantic checks
+all run in memory so a malformed request is rejected before it costs a single AWS call.
+"""
+# standard imports
+import json
+import re
+from datetime import datetime
+from typing import Dict, List
+
+import fastjsonschema
+from fastjsonschema.exceptions import JsonSchemaException
+
+# chalice imports
+from chalice import Response
+
+# internal imports
+from . import recurrence
+
+# load in schema file and compile it for quicker evaluations; remember that working dir starts at chalicelib.
+with open("chalicelib/schemas/reservation.json", "r") as schema_file:
+    RES_SCHEMA = json.load(schema_file)
+    COMPILED_SCHEMA = fastjsonschema.compile(RES_SCHEMA)
+
+# globals
+MAX_BODY_BYTES = 16 * 1024
+GUID_PATTERN = re.compile(r"^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$")
+# max reservations of one multi guid read (GET /reservations?guids=<guid>,<guid>)
+MAX_GUIDS = 25
+# the create route assigns the guid itself, validate the rest of the reservation with a stand in
+PLACEHOLDER_GUID = "00000000-0000-0000-0000-000000000000"
+
+# query params each method accepts and whether they are required
+QUERY_PARAMS = {
+    "GET": {"guid": False, "guids": False, "from": False, "to": False},
+    "POST": {},
+    "PUT": {},
+    "DELETE": {"guid": True}
+}
+
+# query params of GET /healthcheck
+HEALTHCHECK_QUERY_PARAMS = {"deep": False}
+
+# query params of GET /availability and the bounds of a date range query
+AVAILABILITY_QUERY_PARAMS = {"from": True, "to": True, "nights": False, "limit": False}
+DATE_FORMAT = "%Y-%m-%d"
+MAX_RANGE_NIGHTS = 366
+MAX_AVAILABILITY_LIMIT = 100
+
+"""
+REQUEST VALIDATION
+"""
+
+
+def validate_request(
+        method: str,
+        query_params: Dict or None,
+        body: bytes or None,
+        user_guid: str = None) -> Response or None:
+    """
+    Validate a reservations request before it is handed to the service.
+
+    :param method: The HTTP method
+    :param query_params: The query params of the request
+    :param body: The raw request body
+    :param user_guid: The authenticated caller, stamped on created and updated reservations before they are validated
+    :return: A 400/413 Chalice response object if the request is invalid, None if it is valid.
+    """
+    if body and len(body) > MAX_BODY_BYTES:
+        return Response(
+            status_code=413,
+            body={
+                "error": f"The request's body is larger than {MAX_BODY_BYTES} bytes."
+            }
+        )
+
+    error = validate_query_params(method, query_params or {})
+    if error is None and method in ["POST", "PUT"]:
+        error = validate_body(method, body, user_guid)
+    if error is not None:
+        return Response(
+            status_code=400,
+            body={
+                "error": error
+            }
+        )
+    return None
+
+
+def validate_query_params(method: str, query_params: Dict) -> str or None:
+    """
+    Check the query params of a request against QUERY_PARAMS.
+
+    :param method: The HTTP method
+    :param query_params: The query params of the request
+    :return: Error message, None if the params are valid.
+    """
+    error = check_query_params(QUERY_PARAMS.get(method, {}), query_params, method)
+    if error is None and "guid" in query_params and not GUID_PATTERN.match(query_params["guid"]):
+        return f"The guid '{query_params['guid']}' is not a valid guid."
+    if error is None and "guids" in query_params:
+        if len(query_params) > 1:
+            return "The 'guids' query param can not be combined with other query params."
+        guids = query_params["guids"].split(",")
+        if len(guids) > MAX_GUIDS:
+            return f"At most {MAX_GUIDS} guids can be read at once."
+        for guid in guids:
+            if not GUID_PATTERN.match(guid):
+                return f"The guid '{guid}' is not a valid guid."
+    if error is None and ("from" in query_params or "to" in query_params):
+        if "guid" in query_params:
+            return "The 'guid' query param can not be combined with 'from' and 'to'."
+        if "from" not in query_params or "to" not in query_params:
+            return "The 'from' and 'to' query params have to be given together."
+        error = validate_date_range(query_params)
+    return error
+
+
+def check_query_params(allowed: Dict, query_params: Dict, method: str) -> str or None:
+    """
+    Reject unknown and missing query params.
+
+    :param allowed: {<param>: <required>}
+    :param query_params: The query params of the request
+    :param method: The HTTP method, for the error message
+    :return: Error message, None if the params are valid.
+    """
+    unknown = sorted(set(query_params) - set(allowed))
+    if unknown:
+        return f"Unsupported query params {unknown} for {method}. Please read the OpenAPI document on how to use " \
+               f"this endpoint."
+    for param, required in allowed.items():
+        if required and not query_params.get(param):
+            return f"Query params did not have a '{param}' attribute. Please read the OpenAPI document on how to use " \
+                   f"this endpoint."
+    return None
+
+
+def validate_body(method: str, body: bytes or None, user_guid: str = None) -> str or None:
+    """
+    Parse and validate the reservation in the body of a POST/PUT request.
+
+    :param method: The HTTP method
+    :param body: The raw request body
+    :param user_guid: The authenticated caller, stamped on created and updated reservations before they are validated
+    :return: Error message, None if the body is valid.
+    """
+    if not body:
+        return "The request's body was empty. Please read the OpenAPI document on how to use this endpoint"
+    try:
+        reservation = json.loads(body)
+    except ValueError:
+        return "The request's body is not valid JSON."
+    if method in ["POST", "PUT"] and user_guid is not None and isinstance(reservation, dict):
+        reservation["user_guid"] = user_guid
+    return validate_reservation(reservation, creating=method == "POST")
+
+
+def validate_healthcheck_request(query_params: Dict or None) -> Response or None:
+    """
+    Validate a GET /healthcheck request: 'deep' is optional and either true or false.
+
+    :param query_params: The query params of the request
+    :return: A 400 Chalice response object if the request is invalid, None if it is valid.
+    """
+    query_params = query_params or {}
+    error = check_query_params(HEALTHCHECK_QUERY_PARAMS, query_params, "GET")
+    if error is None and query_params.get("deep", "false") not in ["true", "false"]:
+        error = "The 'deep' query param must be true or false."
+    if error is not None:
+        return Response(
+            status_code=400,
+            body={
+                "error": error
+            }
+        )
+    return None
+
+
+def validate_availability_request(query_params: Dict or None) -> Response or None:
+    """
+    Validate a GET /availability request: 'from' and 'to' are dates (YYYY-MM-DD) at most MAX_RANGE_NIGHTS apart,
+    'nights' and 'limit' are optional positive ints.
+
+    :param query_params: The query params of the request
+    :return: A 400 Chalice response object if the request is invalid, None if it is valid.
+    """
+    error = validate_availability_params(query_params or {})
+    if error is not None:
+        return Response(
+            status_code=400,
+            body={
+                "error": error
+            }
+        )
+    return None
+
+
+def validate_availability_params(query_params: Dict) -> str or None:
+    """
+    Check the query params of a GET /availability request.
+
+    :param query_params: The query params of the request
+    :return: Error message, None if the params are valid.
+    """
+    error = check_query_params(AVAILABILITY_QUERY_PARAMS, query_params, "GET") or validate_date_range(query_params)
+    if error is not None:
+        return error
+
+    range_nights = (datetime.strptime(query_params["to"], DATE_FORMAT) -
+                    datetime.strptime(query_params["from"], DATE_FORMAT)).days
+    for param, maximum in [("nights", range_nights), ("limit", MAX_AVAILABILITY_LIMIT)]:
+        value = query_params.get(param)
+        if value is not None and (not value.isdigit() or not 1 <= int(value) <= maximum):
+            return f"The '{param}' query param must be a whole number between 1 and {maximum}."
+    return None
+
+
+def validate_date_range(query_params: Dict) -> str or None:
+    """
+    Check the 'from' and 'to' dates (YYYY-MM-DD) of a range query; at most MAX_RANGE_NIGHTS apart.
+
+    :param query_params: The query params of the request
+    :return: Error message, None if the range is valid.
+    """
+    dates = {}
+    for param in ["from", "to"]:
+        try:
+            dates[param] = datetime.strptime(query_params[param], DATE_FORMAT)
+        except ValueError:
+            return f"The '{param}' query param must be a date formatted as YYYY-MM-DD."
+    range_nights = (dates["to"] - dates["from"]).days
+    if range_nights <= 0:
+        return "'to' must be after 'from'."
+    if range_nights > MAX_RANGE_NIGHTS:
+        return f"The range between 'from' and 'to' can be at most {MAX_RANGE_NIGHTS} nights."
+    return None
+
+
+"""
+RESERVATION VALIDATION
+"""
+
+
+def validate_reservation(reservation: Dict, creating: bool = False) -> str or None:
+    """
+    Schema and semantic checks of a single reservation.
+
+    :param reservation: The reservation
+    :param creating: True when the reservation is about to be created and has no guid yet
+    :return: Error message, None if the reservation is valid.
+    """
+    if not isinstance(reservation, dict):
+        return "A reservation must be a JSON object."
+    if creating:
+        reservation = dict(reservation, reservation_guid=PLACEHOLDER_GUID)
+
+    try:
+        COMPILED_SCHEMA(reservation)
+    except JsonSchemaException as jse:
+        return jse.message
+
+    if not GUID_PATTERN.match(reservation["reservation_guid"]):
+        return f"The reservation_guid '{reservation['reservation_guid']}' is not a valid guid."
+    if reservation["epoch_end"] <= reservation["epoch_start"]:
+        return "epoch_end must be after epoch_start."
+    return recurrence.validate_rule(reservation)
+
+
+def validate_reservations(reservations: List[Dict], creating: bool = False) -> List[Dict]:
+    """
+    Validate a batch of reservations in one pass.
+
+    :param reservations: The reservations
+    :param creating: True when the reservations are about to be created and have no guid yet
+    :return: A list of {"index": <position in the batch>, "error": <message>} for every invalid reservation.
+    """
+    errors = []
+    for index, reservation in enumerate(reservations):
+        error = validate_reservation(reservation, creating=creating)
+        if error is not None:
+            errors.append({"index": index, "error": error})
+    return errors
@@ -0,0 +1,92 @@
+"""
+filename: reservation_layouts.py
+author: Jack Gularte
+date: Oct. 19 2026
+
+Key layouts the reservations table can be reshaped into. The live table is keyed on reservation_guid (hash) and
+epoch_start (range) which forces a query for every guid lookup. A layout describes the key schema of a target table
+and how an item from the live table is transformed to fit it. Used by the backfill tool in scripts/ and by the
+dual-write mode of the reservations service during the cut-over window.
+"""
+# standard imports
+from typing import Dict, List
+
+# the layout of the live table
+CURRENT_LAYOUT = "guid_epoch_start"
+
+LAYOUTS = {
+    # live table; hash on the guid, range on the start epoch
+    "guid_epoch_start": {
+        "hash_key": "reservation_guid",
+        "range_key": "epoch_start"
+    },
+    # hash only on the guid, allows a get_item point read
+    "guid": {
+        "hash_key": "reservation_guid",
+        "range_key": None
+    }
+}
+
+
+def to_layout_item(item: Dict, layout: str) -> Dict:
+    """
+    Transform an item of the live table into an item of the given layout. All current layouts use existing attributes
+    as keys so the item is copied as is; layouts that need derived key attributes add them here.
+
+    :param item: item from the live table
+    :param layout: name of the target layout
+    :return: the item to write into the target table
+    """
+    if layout not in LAYOUTS:
+        raise ValueError(f"Unknown reservation layout '{layout}'.")
+    return dict(item)
+
+
+def layout_key(item: Dict, layout: str) -> Dict:
+    """
+    Build the primary key of an item for the given layout.
+
+    :param item: item (or partial item holding the key attributes)
+    :param layout: name of the target layout
+    :return: dict of key attribute -> value
+    """
+    if layout not in LAYOUTS:
+        raise ValueError(f"Unknown reservation layout '{layout}'.")
+    key = {LAYOUTS[layout]["hash_key"]: item[LAYOUTS[layout]["hash_key"]]}
+    if LAYOUTS[layout]["range_key"]:
+        key[LAYOUTS[layout]["range_key"]] = item[LAYOUTS[layout]["range_key"]]
+    return key
+
+
+def key_projection(layout: str) -> str:
+    """
+    ProjectionExpression that only reads the key attributes of the layout.
+
+    :param layout: name of the layout
+    :return: projection expression string
+    """
+    return ", ".join(key for key in (LAYOUTS[layout]["hash_key"], LAYOUTS[layout]["range_key"]) if key)
+
+
+def collapses(layout: str) -> bool:
+    """
+    Whether the layout keys on fewer attributes than the live table, so several live items can map to one target key.
+    The baseline update wrote a new item whenever epoch_start changed, which left guids with more than one item.
+
+    :param layout: name of the layout
+    :return: bool
+    """
+    return LAYOUTS[layout]["range_key"] != LAYOUTS[CURRENT_LAYOUT]["range_key"]
+
+
+def pick_item(items: List[Dict]) -> Dict:
+    """
+    Pick the live item that goes into a collapsing layout for a group of live items sharing a target key. The items
+    carry no write timestamp, so the pick is the item the API serves for the guid today (the lowest epoch_start, the
+    first item reservations_service.find_reservation reads), which keeps every response the same over the cut-over.
+    Items written by the dual write after the migration started are newer still and are never overwritten by it.
+
+    :param items: live items sharing a target key
+    :return: the item to copy
+    """
+    return min(items, key=lambda item: item[LAYOUTS[CURRENT_LAYOUT]["range_key"]])
@@ -0,0 +1,339 @@
+"""
+filename: reservation_views_service.py
+author: Jack Gularte
+date: Oct. 19 2026
+
+Derived views of the reservations table, maintained from its DynamoDB stream so the request path stays a single
+write. Every view is a set of member items in the views table:
+
+    view_key                 member_key          holds
+    user#<user_guid>         <reservation_guid>  one item per reservation of the user (per user listing and count)
+    month#<YYYY-MM>          <reservation_guid>  one item per reservation overlapping the month, with its nights in it
+                                                 (see night_span, the same nights /availability counts)
+    recurring                <reservation_guid>  one item per recurring reservation, with its rule (no month items)
+    feed                     version             the latest stream sequence number, bumped by every change
+
+Applying a change only puts and deletes member items derived from the old and new image, so replaying a record (lambda
+retries a failed batch) leaves the views unchanged. The feed version is a fresh token per applied batch: stream
+sequence numbers are only ordered within a shard, so they can not tell which of two shards' batches is newer, and
+readers only compare the version for equality to notice that the views changed.
+
+The stream only holds the last 24 hours, so views of reservations written before the stream handler was deployed, or
+lost to a failed batch, are built with scripts/rebuild_views.py.
+"""
+# standard imports
+import logging
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Tuple
+
+# external installed imports
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+
+# internal imports
+from . import recurrence
+from . import storage
+
+# logger
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# globals
+VIEW_PRIMARY = "view_key"
+VIEW_SORT = "member_key"
+FEED_VIEW = "feed"
+FEED_MEMBER = "version"
+RECURRING_VIEW = "recurring"
+SECONDS_PER_NIGHT = 86400
+
+_deserializer = TypeDeserializer()
+_serializer = TypeSerializer()
+
+"""
+STREAM PROCESSING
+"""
+
+
+def process_stream_event(event: Dict, views_table: str) -> Dict:
+    """
+    Apply a batch of reservation stream records to the views, in order.
+
+    Processing stops at the first failing record and its sequence number is returned as the partial batch failure. The
+    event source mapping (terraform/<env>/stream_handler.tf, ReportBatchItemFailures) retries the batch from that record,
+    which is safe as every record is idempotent, and skips the record after its maximum retries so it does not block
+    its shard; scripts/rebuild_views.py repairs the views a skipped record missed.
+
+    :param event: The raw lambda event, {"Records": [...]}
+    :param views_table: The views table
+    :return: {"batchItemFailures": [{"itemIdentifier": <sequence number>}]}, empty when every record was applied.
+    """
+    latest_sequence = None
+    failure = None
+    for record in event.get("Records", []):
+        try:
+            apply_record(record, views_table)
+            latest_sequence = record["dynamodb"]["SequenceNumber"]
+        except Exception as e:
+            logger.error({"reservation_views_service": "apply_record", "success": False,
+                          "event_id": record.get("eventID"), "msg": str(e)})
+            failure = record
+            break
+
+    if latest_sequence is not None:
+        bump_feed_version(views_table, latest_sequence)
+
+    failures = [{"itemIdentifier": failure["dynamodb"]["SequenceNumber"]}] if failure else []
+    return {"batchItemFailures": failures}
+
+
+def apply_record(record: Dict, views_table: str) -> None:
+    """
+    Apply one stream record: delete the memberships only the old image had and put the ones of the new image.
+
+    :param record: A raw dynamodb stream record
+    :param views_table: The views table
+    :return: None
+    """
+    old_members = view_members(_image(record, "OldImage"))
+    new_members = view_members(_image(record, "NewImage"))
+
+    backend = storage.get_backend()
+    for key in set(old_members) - set(new_members):
+        backend.delete_item(table_name=views_table, key={VIEW_PRIMARY: key[0], VIEW_SORT: key[1]})
+    for (view_key, member_key), attributes in new_members.items():
+        backend.put_item(
+            table_name=views_table,
+            item=dict(attributes, **{VIEW_PRIMARY: view_key, VIEW_SORT: member_key})
+        )
+
+
+def bump_feed_version(views_table: str, sequence_number: str) -> None:
+    """
+    Give the feed a new version after a batch was applied. The version is unique per call (the sequence number is
+    kept in it for debugging only), so a replayed or concurrent batch can never restore a version a reader cached.
+
+    :param views_table: The views table
+    :param sequence_number: The stream sequence number of the last applied record, or the name of the writer
+    :return: None
+    """
+    storage.get_backend().put_item(
+        table_name=views_table,
+        item={
+            VIEW_PRIMARY: FEED_VIEW,
+            VIEW_SORT: FEED_MEMBER,
+            "version": f"{sequence_number}:{uuid.uuid4().hex}"
+        }
+    )
+
+
+"""
+DERIVED VIEWS
+"""
+
+
+def view_members(reservation: Dict or None) -> Dict:
+    """
+    The member items a reservation contributes to the views.
+
+    :param reservation: The reservation image, None for no image
+    :return: {(view_key, member_key): attributes}
+    """
+    if not reservation:
+        return {}
+    guid = reservation["reservation_guid"]
+    epoch_start = int(reservation["epoch_start"])
+    epoch_end = int(reservation["epoch_end"])
+    span = {"reservation_guid": guid, "epoch_start": epoch_start, "epoch_end": epoch_end}
+
+    members = {
+        (f"user#{reservation['user_guid']}", guid): span
+    }
+    # the occurrences of a rule are endless, it is kept as one member and expanded per read window instead
+    if recurrence.is_recurring(reservation):
+        members[(RECURRING_VIEW, guid)] = dict(
+            span,
+            user_guid=reservation["user_guid"],
+            reservation_type=reservation["reservation_type"],
+            recurrence=reservation["recurrence"]
+        )
+        return members
+    # every month the stay overlaps, also one it only has its check-out morning in, so range reads find it
+    nights = month_nights(epoch_start, epoch_end)
+    for month in months(epoch_start, epoch_end):
+        members[(month_key(month), guid)] = dict(
+            span,
+            user_guid=reservation["user_guid"],
+            reservation_type=reservation["reservation_type"],
+            nights=nights.get(month, 0)
+        )
+    return members
+
+
+def month_nights(epoch_start: int, epoch_end: int) -> Dict:
+    """
+    Nights of a stay per calendar month (UTC), counted with night_span. A night belongs to the month of the day it
+    starts on.
+
+    :param epoch_start: Start of the stay
+    :param epoch_end: End of the stay
+    :return: {"YYYY-MM": nights}, only months with nights
+    """
+    nights = {}
+    night, nights_end = night_span(epoch_start, epoch_end)
+    while night < nights_end:
+        month = datetime.fromtimestamp(night, tz=timezone.utc).strftime("%Y-%m")
+        nights[month] = nights.get(month, 0) + 1
+        night += SECONDS_PER_NIGHT
+    return nights
+
+
+def night_span(epoch_start: int, epoch_end: int) -> Tuple[int, int]:
+    """
+    The nights a stay occupies, as the midnights (UTC) of the first night and of the end of the last night. A night is
+    occupied when the stay covers the midnight that ends it, so a stay from 15:00 to 10:00 the next day is one night
+    and its check-out day stays free.
+
+    :param epoch_start: Start of the stay
+    :param epoch_end: End of the stay
+    :return: (first_night, nights_end), epochs at midnight UTC; equal for a stay without a night
+    """
+    first_night = epoch_start - epoch_start % SECONDS_PER_NIGHT
+    nights_end = epoch_end - epoch_end % SECONDS_PER_NIGHT
+    return first_night, max(first_night, nights_end)
+
+
+def months(range_start: int, range_end: int) -> List[str]:
+    """
+    The calendar months (UTC) the nights of a range fall in, i.e. the month views covering it.
+
+    :param range_start: Epoch of the start of the range
+    :param range_end: Epoch of the end of the range
+    :return: list of "YYYY-MM"
+    """
+    day = datetime.fromtimestamp(range_start, tz=timezone.utc).replace(day=1, hour=0, minute=0, second=0)
+    last = datetime.fromtimestamp(range_end - 1, tz=timezone.utc)
+    result = []
+    while day <= last:
+        result.append(day.strftime("%Y-%m"))
+        day = (day + timedelta(days=32)).replace(day=1)
+    return result
+
+
+def month_key(month: str) -> str:
+    return f"month#{month}"
+
+
+def range_view_keys(range_start: int, range_end: int) -> List[str]:
+    """
+    The views a range read needs: the month views covering it and the recurring view.
+
+    :param range_start: Epoch of the start of the range
+    :param range_end: Epoch of the end of the range
+    :return: list of view keys
+    """
+    return [month_key(month) for month in months(range_start, range_end)] + [RECURRING_VIEW]
+
+
+"""
+READS
+"""
+
+
+def user_reservation_count(views_table: str, user_guid: str) -> int:
+    """
+    Amount of reservations of a user.
+
+    :param views_table: The views table
+    :param user_guid: The user
+    :return: int
+    """
+    members = storage.get_backend().query(table_name=views_table, key_name=VIEW_PRIMARY, key_value=f"user#{user_guid}")
+    return len(members)
+
+
+def month_occupancy(views_table: str, month: str) -> Dict:
+    """
+    Occupancy of a calendar month by one-off reservations; recurring reservations are in the recurring view.
+
+    :param views_table: The views table
+    :param month: "YYYY-MM"
+    :return: {"month", "nights", "reservations": [member items]}
+    """
+    members = storage.get_backend().query(table_name=views_table, key_name=VIEW_PRIMARY, key_value=month_key(month))
+    return {
+        "month": month,
+        "nights": sum(int(member["nights"]) for member in members),
+        "reservations": members
+    }
+
+
+def recurring_reservations(views_table: str) -> List[Dict]:
+    """
+    All recurring reservations, with their rules.
+
+    :param views_table: The views table
+    :return: list of member items
+    """
+    return storage.get_backend().query(table_name=views_table, key_name=VIEW_PRIMARY, key_value=RECURRING_VIEW)
+
+
+def feed_version(views_table: str) -> str or None:
+    """
+    The current feed version; changes whenever a reservation changes. None before the first change.
+
+    :param views_table: The views table
+    :return: str
+    """
+    item = storage.get_backend().get_item(table_name=views_table, key={VIEW_PRIMARY: FEED_VIEW, VIEW_SORT: FEED_MEMBER})
+    return item["version"] if item else None
+
+
+"""
+HELPERS
+"""
+
+
+def make_stream_record(
+        event_name: str,
+        sequence_number: str,
+        old_image: Dict = None,
+        new_image: Dict = None) -> Dict:
+    """
+    Build a synthetic dynamodb stream record, to exercise the processor locally:
+    process_stream_event({"Records": [make_stream_record("INSERT", "1", new_image=reservation)]}, views_table)
+
+    :param event_name: INSERT, MODIFY or REMOVE
+    :param sequence_number: The stream sequence number
+    :param old_image: The item before the change
+    :param new_image: The item after the change
+    :return: dict in the lambda stream record format
+    """
+    dynamodb = {"SequenceNumber": sequence_number, "StreamViewType": "NEW_AND_OLD_IMAGES"}
+    if old_image is not None:
+        dynamodb["OldImage"] = {key: _serializer.serialize(value) for key, value in old_image.items()}
+    if new_image is not None:
+        dynamodb["NewImage"] = {key: _serializer.serialize(value) for key, value in new_image.items()}
+    return {
+        "eventID": f"synthetic-{sequence_number}",
+        "eventName": event_name,
+        "eventSource": "aws:dynamodb",
+        "dynamodb": dynamodb
+    }
+
+
+def register_tables(backend: storage.StorageBackend, table_name: str) -> None:
+    """
+    Register the key schema of the views table with the storage backend.
+
+    :param backend: The storage backend
+    :param table_name: The views table
+    :return: None
+    """
+    backend.register_table(table_name, hash_key=VIEW_PRIMARY, range_key=VIEW_SORT)
+
+
+def _image(record: Dict, image_name: str) -> Dict or None:
+    image = record.get("dynamodb", {}).get(image_name)
+    if not image:
+        return None
+    return {key: _deserializer.deserialize(value) for key, value in image.items()}
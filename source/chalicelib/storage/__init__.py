@@ -0,0 +1,55 @@
+"""
+filename: __init__.py
+author: Jack Gularte
+date: Oct. 19 2026
+
+Storage backends the services read and write through. The backend is selected once per process by the
+"storage_backend" value of the env config; every service shares the same instance via get_backend().
+"""
+from .async_backend import MAX_CONCURRENCY, AsyncStorage, run_coroutine
+from .base import ConditionalCheckFailed, StorageBackend
+from .memory_backend import MemoryBackend
+
+BACKENDS = ["dynamodb", "memory"]
+
+_backend = None
+
+
+def configure(backend_name: str) -> StorageBackend:
+    """
+    Select the storage backend of this process.
+
+    :param backend_name: one of BACKENDS
+    :return: the backend instance
+    """
+    global _backend
+    if backend_name == "dynamodb":
+        # imported lazily so the memory engine runs without boto3 configured
+        from .dynamodb_backend import DynamoDBBackend
+        _backend = DynamoDBBackend()
+    elif backend_name == "memory":
+        _backend = MemoryBackend()
+    else:
+        raise ValueError(f"Unknown storage backend '{backend_name}', expected one of {BACKENDS}.")
+    return _backend
+
+
+def get_backend() -> StorageBackend:
+    """
+    The configured storage backend, DynamoDB when configure was never called.
+
+    :return: the backend instance
+    """
+    if _backend is None:
+        return configure("dynamodb")
+    return _backend
+
+
+def get_async_backend(max_concurrency: int = MAX_CONCURRENCY) -> AsyncStorage:
+    """
+    An asyncio facade over the configured storage backend; call inside the running event loop.
+
+    :param max_concurrency: Max calls in flight
+    :return: the async facade
+    """
+    return AsyncStorage(get_backend(), max_concurrency=max_concurrency)
@@ -0,0 +1,90 @@
+"""
+filename: async_backend.py
+author: Jack Gularte
+date: Oct. 19 2026
+
+asyncio facade over the storage backend for fan-out reads (many guids, many month buckets) within one request. Every
+call runs the blocking backend method on a shared thread pool, so the dynamodb_client keeps its per-thread boto3
+resources over one shared client and connection pool and the capacity limiter, and a semaphore bounds how many calls of
+one request are in flight. The latency of a fan-out then tracks its slowest call instead of the sum of all calls.
+
+Chalice handlers are synchronous; services run their coroutines with run_coroutine:
+
+    async def load(keys):
+        store = get_async_backend()
+        return await asyncio.gather(*[store.query(table_name, "view_key", key) for key in keys])
+
+    items = run_coroutine(load(keys))
+"""
+# standard imports
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+# internal imports
+from .base import StorageBackend
+
+# globals
+# the worker threads share the dynamodb_client connection pool (MAX_POOL_CONNECTIONS), stay below it so a fan-out
+# never waits for a connection and leaves room for the request's own thread
+MAX_CONCURRENCY = 8
+# worker threads live as long as the container so their boto3 resources are reused
+_executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENCY, thread_name_prefix="storage")
+
+
+class AsyncStorage:
+    """
+    Awaitable versions of the StorageBackend methods. Create it inside the running event loop.
+    """
+
+    def __init__(self, backend: StorageBackend, max_concurrency: int = MAX_CONCURRENCY):
+        self.backend = backend
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def get_item(self, table_name: str, key: Dict) -> Optional[Dict]:
+        return await self._run(self.backend.get_item, table_name=table_name, key=key)
+
+    async def query(
+            self,
+            table_name: str,
+            key_name: str,
+            key_value: Any,
+            index_name: str = None,
+            sort_low: Any = None,
+            sort_high: Any = None,
+            limit: int = None) -> List[Dict]:
+        return await self._run(
+            self.backend.query,
+            table_name=table_name,
+            key_name=key_name,
+            key_value=key_value,
+            index_name=index_name,
+            sort_low=sort_low,
+            sort_high=sort_high,
+            limit=limit
+        )
+
+    async def scan(self, table_name: str, segment: int = None, total_segments: int = None) -> List[Dict]:
+        return await self._run(self.backend.scan, table_name=table_name, segment=segment, total_segments=total_segments)
+
+    async def put_item(self, table_name: str, item: Dict) -> None:
+        return await self._run(self.backend.put_item, table_name=table_name, item=item)
+
+    async def delete_item(self, table_name: str, key: Dict) -> Optional[Dict]:
+        return await self._run(self.backend.delete_item, table_name=table_name, key=key)
+
+    async def _run(self, method: Callable, **kwargs) -> Any:
+        async with self._semaphore:
+            loop = asyncio.get_event_loop()
+            return await loop.run_in_executor(_executor, functools.partial(method, **kwargs))
+
+
+def run_coroutine(coroutine: Awaitable) -> Any:
+    """
+    Run a coroutine to completion from synchronous code, e.g. a chalice route.
+
+    :param coroutine: The coroutine
+    :return: Its result; its exception is raised.
+    """
+    return asyncio.run(coroutine)
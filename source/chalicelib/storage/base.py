@@ -0,0 +1,132 @@
+"""
+filename: base.py
+author: Jack Gularte
+date: Oct. 19 2026
+
+Storage backend interface the services read and write through. Every backend speaks in plain item dicts and follows
+DynamoDB semantics: a table has a hash key and an optional range (sort) key, items are replaced as a whole on put and
+global secondary indexes are queried on their own hash key and optional range key.
+"""
+# standard imports
+from typing import Any, Dict, List, Optional
+
+
+class ConditionalCheckFailed(ValueError):
+    """
+    Raised when a conditional write is rejected. Subclasses ValueError with the same message the dynamodb_client has
+    always raised so existing `except ValueError` handling keeps working.
+    """
+
+    def __init__(self, msg: str = "ConditionalCheckFailed"):
+        super().__init__(msg)
+
+
+class StorageBackend:
+    """
+    Base class of all storage backends. Tables have to be registered with their key schema before use.
+    """
+
+    def __init__(self):
+        self.tables = {}
+
+    def register_table(self, table_name: str, hash_key: str, range_key: str = None, indexes: Dict = None) -> None:
+        """
+        Register the key schema of a table.
+
+        :param table_name: name of the table
+        :param hash_key: the hash (partition) key attribute
+        :param range_key: the range (sort) key attribute, if any
+        :param indexes: {<index_name>: {"hash_key": <attr>, "range_key": <attr or None>}}
+        :return: None
+        """
+        self.tables[table_name] = {
+            "hash_key": hash_key,
+            "range_key": range_key,
+            "indexes": indexes or {}
+        }
+
+    def key_of(self, table_name: str, item: Dict) -> Dict:
+        """
+        Extract the primary key of an item of a registered table.
+
+        :param table_name: name of the table
+        :param item: the item
+        :return: dict of key attribute -> value
+        """
+        schema = self._schema(table_name)
+        key = {schema["hash_key"]: item[schema["hash_key"]]}
+        if schema["range_key"]:
+            key[schema["range_key"]] = item[schema["range_key"]]
+        return key
+
+    def put_item(self, table_name: str, item: Dict) -> None:
+        """
+        Write an item, replacing any item with the same key.
+        """
+        raise NotImplementedError()
+
+    def put_item_if_absent(self, table_name: str, item: Dict) -> None:
+        """
+        Write an item only if no item with the same key exists, raises ConditionalCheckFailed otherwise.
+        """
+        raise NotImplementedError()
+
+    def put_item_if_unchanged(self, table_name: str, item: Dict, expected: Dict) -> None:
+        """
+        Write an item only if an item with the same key exists and still holds the expected attribute values, raises
+        ConditionalCheckFailed otherwise. Optimistic locking for read-modify-write of a record.
+        """
+        raise NotImplementedError()
+
+    def get_item(self, table_name: str, key: Dict) -> Optional[Dict]:
+        """
+        Point read of an item by its full primary key, None when the item does not exist.
+        """
+        raise NotImplementedError()
+
+    def query(
+            self,
+            table_name: str,
+            key_name: str,
+            key_value: Any,
+            index_name: str = None,
+            sort_low: Any = None,
+            sort_high: Any = None,
+            limit: int = None) -> List[Dict]:
+        """
+        Query the table or one of its indexes for all items with the hash key equal to the value, optionally limited to
+        a range of the sort key. Items are returned in ascending sort key order.
+
+        :param table_name: name of the table
+        :param key_name: hash key attribute of the table or the index
+        :param key_value: hash key value to match
+        :param index_name: name of the index to query, None for the table itself
+        :param sort_low: inclusive low end of the sort key range, None for unbounded
+        :param sort_high: inclusive high end of the sort key range, None for unbounded
+        :param limit: max amount of items to return
+        :return: list of items
+        """
+        raise NotImplementedError()
+
+    def scan(self, table_name: str, segment: int = None, total_segments: int = None) -> List[Dict]:
+        """
+        Read every item of the table, or of one segment of it when segment and total_segments are given.
+        """
+        raise NotImplementedError()
+
+    def batch_put(self, table_name: str, items: List[Dict]) -> int:
+        """
+        Write many items, retrying anything the backend could not process. Returns the amount of items written.
+        """
+        raise NotImplementedError()
+
+    def delete_item(self, table_name: str, key: Dict) -> Optional[Dict]:
+        """
+        Delete an item by its full primary key. Returns the deleted item, None when there was no item.
+        """
+        raise NotImplementedError()
+
+    def _schema(self, table_name: str) -> Dict:
+        if table_name not in self.tables:
+            raise ValueError(f"Table '{table_name}' was not registered with the storage backend.")
+        return self.tables[table_name]
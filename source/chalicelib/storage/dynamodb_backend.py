@@ -0,0 +1,119 @@
+"""
+filename: dynamodb_backend.py
+author: Jack Gularte
+date: Oct. 19 2026
+
+Storage backend that delegates to the dynamodb_client functions.
+"""
+# standard imports
+from typing import Any, Dict, List, Optional
+from boto3.dynamodb import conditions
+
+# internal imports
+from ..aws_clients import dynamodb_client as dc
+from .base import ConditionalCheckFailed, StorageBackend
+
+
+class DynamoDBBackend(StorageBackend):
+
+    def put_item(self, table_name: str, item: Dict) -> None:
+        dc.write(
+            table_name=table_name,
+            item=item,
+            return_values="NONE"
+        )
+
+    def put_item_if_absent(self, table_name: str, item: Dict) -> None:
+        try:
+            dc.write_conditional(
+                table_name=table_name,
+                item=item,
+                condition_expr=conditions.Attr(self._schema(table_name)["hash_key"]).not_exists()
+            )
+        except ValueError as ve:
+            if str(ve) == "ConditionalCheckFailed":
+                raise ConditionalCheckFailed()
+            raise
+
+    def put_item_if_unchanged(self, table_name: str, item: Dict, expected: Dict) -> None:
+        condition = conditions.Attr(self._schema(table_name)["hash_key"]).exists()
+        for attribute, value in expected.items():
+            condition = condition & conditions.Attr(attribute).eq(value)
+        try:
+            dc.write_conditional(
+                table_name=table_name,
+                item=item,
+                condition_expr=condition
+            )
+        except ValueError as ve:
+            if str(ve) == "ConditionalCheckFailed":
+                raise ConditionalCheckFailed()
+            raise
+
+    def get_item(self, table_name: str, key: Dict) -> Optional[Dict]:
+        return dc.get_item(table_name=table_name, key=key).get("Item")
+
+    def query(
+            self,
+            table_name: str,
+            key_name: str,
+            key_value: Any,
+            index_name: str = None,
+            sort_low: Any = None,
+            sort_high: Any = None,
+            limit: int = None) -> List[Dict]:
+        key_conditions = conditions.Key(key_name).eq(key_value)
+        if sort_low is not None or sort_high is not None:
+            sort_key = self._sort_key(table_name, index_name)
+            if sort_low is not None and sort_high is not None:
+                key_conditions = key_conditions & conditions.Key(sort_key).between(sort_low, sort_high)
+            elif sort_low is not None:
+                key_conditions = key_conditions & conditions.Key(sort_key).gte(sort_low)
+            else:
+                key_conditions = key_conditions & conditions.Key(sort_key).lte(sort_high)
+
+        query_params = {"KeyConditionExpression": key_conditions}
+        if index_name:
+            query_params["IndexName"] = index_name
+        if limit:
+            query_params["Limit"] = limit
+
+        # page through the results
+        items = []
+        while True:
+            response = dc.query(table_name=table_name, query_params=query_params)
+            items.extend(response.get("Items", []))
+            if "LastEvaluatedKey" not in response or (limit and len(items) >= limit):
+                return items[:limit] if limit else items
+            query_params["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+    def scan(self, table_name: str, segment: int = None, total_segments: int = None) -> List[Dict]:
+        if segment is None:
+            return dc.scan_table(table_name=table_name).get("Items", [])
+
+        items = []
+        start_key = None
+        while True:
+            response = dc.scan_segment(
+                table_name=table_name,
+                segment=segment,
+                total_segments=total_segments,
+                start_key=start_key
+            )
+            items.extend(response.get("Items", []))
+            start_key = response.get("LastEvaluatedKey")
+            if start_key is None:
+                return items
+
+    def batch_put(self, table_name: str, items: List[Dict]) -> int:
+        return dc.batch_write_items(table_name=table_name, list_of_items=items)["written"]
+
+    def delete_item(self, table_name: str, key: Dict) -> Optional[Dict]:
+        return dc.delete_item(table_name=table_name, item=key, return_values="ALL_OLD").get("Attributes")
+
+    def _sort_key(self, table_name: str, index_name: str = None) -> str:
+        schema = self._schema(table_name)
+        sort_key = schema["indexes"][index_name]["range_key"] if index_name else schema["range_key"]
+        if not sort_key:
+            raise ValueError(f"'{index_name or table_name}' has no sort key to apply a range to.")
+        return sort_key
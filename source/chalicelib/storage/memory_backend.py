@@ -0,0 +1,167 @@
+"""
+filename: memory_backend.py
+author: Jack Gularte
+date: Oct. 19 2026
+
+In-memory storage engine for unit tests, benchmarks and `chalice local` runs. Implements the DynamoDB semantics the
+services rely on: whole item replacement on put, conditional put, hash + range primary keys, sort key range queries
+in ascending order and global secondary indexes (including items missing the index key being left out of the index).
+"""
+# standard imports
+import bisect
+import copy
+import threading
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+# internal imports
+from .base import ConditionalCheckFailed, StorageBackend
+
+
+# sorts after the string form of every primary key, used as the upper bound of inclusive range lookups
+_MAX_PK = "\U0010FFFF"
+
+
+class MemoryBackend(StorageBackend):
+
+    def __init__(self):
+        super().__init__()
+        self._lock = threading.RLock()
+        # table_name -> {pk_tuple: item}
+        self._items = {}
+        # table_name -> {index_name (None for the table): {hash_value: {"keys": [(sort, str(pk))], "pks": [pk]}}}
+        self._partitions = {}
+
+    def register_table(self, table_name: str, hash_key: str, range_key: str = None, indexes: Dict = None) -> None:
+        with self._lock:
+            super().register_table(table_name, hash_key, range_key, indexes)
+            self._items.setdefault(table_name, {})
+            self._partitions[table_name] = {index_name: {} for index_name in [None] + list(indexes or {})}
+            # rebuild the partitions in case the schema was registered again
+            for pk, item in self._items[table_name].items():
+                self._index(table_name, pk, item)
+
+    def put_item(self, table_name: str, item: Dict) -> None:
+        with self._lock:
+            self._put(table_name, item)
+
+    def put_item_if_absent(self, table_name: str, item: Dict) -> None:
+        with self._lock:
+            if self._pk(table_name, item) in self._items[table_name]:
+                raise ConditionalCheckFailed()
+            self._put(table_name, item)
+
+    def put_item_if_unchanged(self, table_name: str, item: Dict, expected: Dict) -> None:
+        with self._lock:
+            existing = self._items[table_name].get(self._pk(table_name, item))
+            if existing is None or any(existing.get(attribute) != value for attribute, value in expected.items()):
+                raise ConditionalCheckFailed()
+            self._put(table_name, item)
+
+    def get_item(self, table_name: str, key: Dict) -> Optional[Dict]:
+        with self._lock:
+            return copy.deepcopy(self._items[table_name].get(self._pk(table_name, key)))
+
+    def query(
+            self,
+            table_name: str,
+            key_name: str,
+            key_value: Any,
+            index_name: str = None,
+            sort_low: Any = None,
+            sort_high: Any = None,
+            limit: int = None) -> List[Dict]:
+        with self._lock:
+            schema = self._schema(table_name)
+            key_schema = schema["indexes"][index_name] if index_name else schema
+            if key_name != key_schema["hash_key"]:
+                raise ValueError(f"'{key_name}' is not the hash key of '{index_name or table_name}'.")
+            if (sort_low is not None or sort_high is not None) and not key_schema.get("range_key"):
+                raise ValueError(f"'{index_name or table_name}' has no sort key to apply a range to.")
+
+            partition = self._partitions[table_name][index_name].get(key_value)
+            if partition is None:
+                return []
+            low = 0 if sort_low is None else bisect.bisect_left(partition["keys"], (sort_low,))
+            high = len(partition["keys"]) if sort_high is None \
+                else bisect.bisect_right(partition["keys"], (sort_high, _MAX_PK))
+            if limit:
+                high = min(high, low + limit)
+            items = self._items[table_name]
+            return [copy.deepcopy(items[pk]) for pk in partition["pks"][low:high]]
+
+    def scan(self, table_name: str, segment: int = None, total_segments: int = None) -> List[Dict]:
+        with self._lock:
+            self._schema(table_name)
+            return [
+                copy.deepcopy(item)
+                for pk, item in self._items[table_name].items()
+                if segment is None or _segment_of(pk[0], total_segments) == segment
+            ]
+
+    def batch_put(self, table_name: str, items: List[Dict]) -> int:
+        with self._lock:
+            for item in items:
+                self._put(table_name, item)
+            return len(items)
+
+    def delete_item(self, table_name: str, key: Dict) -> Optional[Dict]:
+        with self._lock:
+            pk = self._pk(table_name, key)
+            item = self._items[table_name].pop(pk, None)
+            if item is not None:
+                self._unindex(table_name, pk, item)
+            return item
+
+    def _put(self, table_name: str, item: Dict) -> None:
+        pk = self._pk(table_name, item)
+        old = self._items[table_name].get(pk)
+        if old is not None:
+            self._unindex(table_name, pk, old)
+        item = copy.deepcopy(item)
+        self._items[table_name][pk] = item
+        self._index(table_name, pk, item)
+
+    def _pk(self, table_name: str, item: Dict) -> Tuple:
+        schema = self._schema(table_name)
+        if schema["range_key"]:
+            return item[schema["hash_key"]], item[schema["range_key"]]
+        return item[schema["hash_key"]], None
+
+    def _index(self, table_name: str, pk: Tuple, item: Dict) -> None:
+        # every partition is kept sorted on (sort value, pk) so a range query is two bisects
+        for index_name, hash_value, sort_key in self._index_entries(table_name, pk, item):
+            partition = self._partitions[table_name][index_name].setdefault(hash_value, {"keys": [], "pks": []})
+            position = bisect.bisect_left(partition["keys"], sort_key)
+            partition["keys"].insert(position, sort_key)
+            partition["pks"].insert(position, pk)
+
+    def _unindex(self, table_name: str, pk: Tuple, item: Dict) -> None:
+        for index_name, hash_value, sort_key in self._index_entries(table_name, pk, item):
+            partition = self._partitions[table_name][index_name][hash_value]
+            position = bisect.bisect_left(partition["keys"], sort_key)
+            del partition["keys"][position]
+            del partition["pks"][position]
+            if not partition["keys"]:
+                del self._partitions[table_name][index_name][hash_value]
+
+    def _index_entries(self, table_name: str, pk: Tuple, item: Dict) -> List[Tuple]:
+        schema = self._schema(table_name)
+        entries = [(None, pk[0], (_sortable(pk[1]), str(pk)))]
+        for index_name, index_schema in schema["indexes"].items():
+            range_key = index_schema.get("range_key")
+            # like a dynamodb gsi, items without the index keys are not part of the index
+            if index_schema["hash_key"] not in item or (range_key and range_key not in item):
+                continue
+            sort_value = item[range_key] if range_key else None
+            entries.append((index_name, item[index_schema["hash_key"]], (_sortable(sort_value), str(pk))))
+        return entries
+
+
+def _sortable(value: Any) -> Any:
+    # hash only tables and indexes have no sort value; order their items by primary key alone
+    return 0 if value is None else value
+
+
+def _segment_of(hash_value: Any, total_segments: int) -> int:
+    return zlib.crc32(str(hash_value).encode()) % total_segments
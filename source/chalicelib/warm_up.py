@@ -0,0 +1,88 @@
+"""
+filename: warm_up.py
+author: Jack Gularte
+date: Oct. 19 2026
+
+Warm-up of the api handler lambda. Every new container runs it during its init (app.py), so a container started by a
+scale-out has its pooled DynamoDB and Secrets Manager connections open, the auth secret and the Cognito JWKS cached and
+the schema validator exercised before its first user request. A CloudWatch Events rule (terraform/<env>/warm_up.tf)
+additionally invokes the api handler with {"source": "gcsc.warm-up"} every few minutes; the ping runs the same steps
+without touching any business logic, which keeps the connections of an idle container from being dropped.
+
+A chalice @app.schedule handler is deployed as its own lambda function and would only warm its own container, which is
+why the ping is sent to the api handler itself and recognized in app.py.
+"""
+# standard imports
+import logging
+import time
+from typing import Dict, List
+
+# internal imports
+from . import jwt_auth
+from .aws_clients import dynamodb_client as dc
+from .aws_clients import secrets_manager_client as sm_client
+from .request_validation import PLACEHOLDER_GUID, validate_reservation
+
+# logger
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+WARM_UP_SOURCE = "gcsc.warm-up"
+
+SAMPLE_RESERVATION = {
+    "reservation_guid": PLACEHOLDER_GUID,
+    "user_guid": "warm-up",
+    "epoch_start": 0,
+    "epoch_end": 86400,
+    "reservation_type": "closed"
+}
+
+
+def is_warm_up_event(event: Dict) -> bool:
+    """
+    Whether a lambda event is a warm-up ping rather than an API Gateway request.
+
+    :param event: The raw lambda event
+    :return: bool
+    """
+    return isinstance(event, dict) and event.get("source") == WARM_UP_SOURCE
+
+
+def warm_up(dynamodb_tables: List[str], secret: Dict or None, jwks: Dict or None = None) -> Dict:
+    """
+    Open the connections and prime the caches of this container. Failures are logged and reported, never raised, so
+    neither a ping nor the container init can error the function.
+
+    :param dynamodb_tables: Tables to open the DynamoDB connection with, empty when not running on DynamoDB
+    :param secret: {"secret_id", "secret_key", "secret_region"} of the auth token, None when there is none
+    :param jwks: {"region", "user_pool_id"} of the Cognito user pool in cognito_jwt auth mode, None otherwise
+    :return: dict of the time in ms each step took, or its error
+    """
+    started = time.perf_counter()
+    steps = {}
+    for table_name in dynamodb_tables:
+        steps[f"dynamodb:{table_name}"] = _timed(lambda: dc.describe_table(table_name))
+    if secret:
+        steps["secrets_manager"] = _timed(
+            lambda: sm_client.get_secret(secret["secret_id"], secret["secret_key"], secret["secret_region"])
+        )
+    if jwks:
+        steps["jwks"] = _timed(lambda: jwt_auth.prime_jwks(jwks["region"], jwks["user_pool_id"]))
+    steps["schema_validator"] = _timed(lambda: validate_reservation(SAMPLE_RESERVATION))
+
+    result = {"warm_up": True, "duration_ms": _ms(started), "steps": steps}
+    logger.info(result)
+    return result
+
+
+def _timed(step) -> float or str:
+    started = time.perf_counter()
+    try:
+        step()
+    except Exception as e:
+        return f"error: {e}"
+    return _ms(started)
+
+
+def _ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 2)
@@ -0,0 +1,64 @@
+"""
+filename: bench_service.py
+author: Jack Gularte
+date: Oct. 19 2026
+
+Benchmark of the reservations service against the in-memory storage engine, no aws access needed.
+`python -m scripts.bench_service --requests 10000`
+"""
+# standard imports
+import argparse
+import logging
+import sys
+import time
+
+# internal imports
+from chalicelib import reservations_service as rs
+from chalicelib import storage
+
+logging.basicConfig(level=logging.WARNING)
+
+TABLE_NAME = "reservations-table_bench"
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the reservations service on the in-memory engine.")
+    parser.add_argument("--requests", type=int, default=10000, help="amount of requests per operation")
+    args = parser.parse_args(argv)
+
+    rs.register_tables(backend=storage.configure("memory"), table_name=TABLE_NAME)
+
+    guids = []
+    started = time.perf_counter()
+    for i in range(args.requests):
+        response = rs.create_reservation(
+            table_name=TABLE_NAME,
+            reservation={
+                "user_guid": f"user-{i % 50}",
+                "epoch_start": 1600000000 + i * 86400,
+                "epoch_end": 1600000000 + (i + 2) * 86400,
+                "reservation_type": "closed"
+            }
+        )
+        guids.append(response.body["data"]["reservation_guid"])
+    _report("create_reservation", args.requests, started)
+
+    started = time.perf_counter()
+    for guid in guids:
+        rs.get_reservation(table_name=TABLE_NAME, reservation_guid=guid)
+    _report("get_reservation", args.requests, started)
+
+    started = time.perf_counter()
+    for guid in guids:
+        rs.delete_reservation(table_name=TABLE_NAME, reservation_guid=guid)
+    _report("delete_reservation", args.requests, started)
+    return 0
+
+
+def _report(operation: str, requests: int, started: float) -> None:
+    elapsed = time.perf_counter() - started
+    print(f"{operation}: {requests} requests in {elapsed:.2f}s -> {requests / elapsed:.0f} req/s")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
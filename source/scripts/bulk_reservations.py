@@ -0,0 +1,300 @@
+"""
+filename: bulk_reservations.py
+author: Jack Gularte
+date: Oct. 19 2026
+
+Bulk import and export of reservations, e.g. to seed the sandbox from prod:
+    python -m scripts.bulk_reservations export --env prod --out-dir ./export
+    python -m scripts.bulk_reservations import --env sandbox --file ./export/*.ndjson
+
+Import reads NDJSON or CSV files, validates every row with the reservation schema and semantic checks, and writes
+chunks of rows with a pool of parallel, throttling aware batch writers. Rows without a reservation_guid get one derived
+from their content, so re-running an import never duplicates reservations. Invalid rows, and rows repeating the key of
+an earlier row of their chunk, are written to <file>.rejects.ndjson. Export runs a parallel segmented scan and writes
+one NDJSON file per segment. Both record their progress in a checkpoint file and resume from it, and report items per
+second.
+"""
+# standard imports
+import argparse
+import csv
+import json
+import logging
+import os
+import sys
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, Iterator, List, Tuple
+
+# internal imports
+from chalicelib import archive_service as archive
+from chalicelib.aws_clients import dynamodb_client as dc
+from chalicelib.reservations_service import INT_FIELDS, RESERVATION_PRIMARY, RESERVATION_SORT
+from chalicelib.request_validation import validate_reservations
+from scripts.common import Checkpoint, Progress, from_json, load_config, to_json
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# namespace of the guids derived from row content
+IMPORT_NAMESPACE = uuid.UUID("5d7c6a8e-6b0e-4d4c-9a55-0c1f4f1c2b7e")
+
+"""
+IMPORT
+"""
+
+
+def import_file(
+        path: str,
+        table_name: str,
+        workers: int,
+        chunk_size: int,
+        checkpoint: Checkpoint,
+        progress: Progress,
+        retention_seconds: int = None) -> Dict:
+    """
+    Import one NDJSON/CSV file. Chunks are written in parallel; the checkpoint records every finished chunk so a
+    resumed run skips them.
+
+    :param path: file to import
+    :param table_name: table to import into
+    :param workers: amount of parallel batch writers
+    :param chunk_size: rows per chunk of work
+    :param checkpoint: checkpoint to resume from and record progress in
+    :param progress: throughput counter
+    :param retention_seconds: set the TTL of every row to its end plus this retention, None to write rows as they are
+    :return: dict of results
+    """
+    done_chunks = set(checkpoint.get(path, []))
+    lock = threading.Lock()
+    result = {"file": path, "written": 0, "rejected": 0, "skipped_chunks": len(done_chunks)}
+
+    def write_chunk(chunk_index: int, rows: List[Tuple[int, Dict]]) -> None:
+        items = [row for _, row in rows]
+        errors = validate_reservations(items)
+        rejected = {error["index"] for error in errors}
+        # a BatchWriteItem must not hold one key twice, later rows of a key are rejected instead of aborting the run
+        valid = []
+        first_of_key = {}
+        for index, item in enumerate(items):
+            if index in rejected:
+                continue
+            key = (item[RESERVATION_PRIMARY], item[RESERVATION_SORT])
+            if key in first_of_key:
+                errors.append({"index": index, "error": f"Duplicate of the reservation on line "
+                                                        f"{rows[first_of_key[key]][0]} (same guid and epoch_start)."})
+                continue
+            first_of_key[key] = index
+            valid.append(item)
+        if retention_seconds is not None:
+            valid = [archive.with_expiry(item, retention_seconds) for item in valid]
+        if valid:
+            dc.batch_write_items(table_name=table_name, list_of_items=valid)
+            progress.add(len(valid))
+        with lock:
+            result["written"] += len(valid)
+            result["rejected"] += len(errors)
+            if errors:
+                with open(f"{path}.rejects.ndjson", "a") as rejects:
+                    for error in errors:
+                        rejects.write(to_json({"line": rows[error["index"]][0], "error": error["error"],
+                                               "row": items[error["index"]]}) + "\n")
+            done_chunks.add(chunk_index)
+            checkpoint.update(path, sorted(done_chunks))
+
+    # keep at most two chunks per worker in flight so huge files are streamed, not loaded
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        in_flight = set()
+        for chunk_index, rows in enumerate(_chunks(read_rows(path), chunk_size)):
+            if chunk_index in done_chunks:
+                continue
+            if len(in_flight) >= workers * 2:
+                finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    future.result()
+            in_flight.add(executor.submit(write_chunk, chunk_index, rows))
+        for future in in_flight:
+            future.result()
+
+    logger.info(result)
+    return result
+
+
+def read_rows(path: str) -> Iterator[Tuple[int, Dict]]:
+    """
+    Read the rows of an NDJSON or CSV file (by extension) as reservations.
+
+    :param path: file to read
+    :return: iterator of (line number, reservation)
+    """
+    with open(path, newline="") as f:
+        if path.endswith(".csv"):
+            for index, row in enumerate(csv.DictReader(f)):
+                yield index + 2, _with_guid(_csv_row(row))
+        else:
+            for index, line in enumerate(f):
+                if line.strip():
+                    yield index + 1, _with_guid(from_json(line))
+
+
+def _csv_row(row: Dict) -> Dict:
+    # csv has no types; empty cells are dropped and the int fields converted so the schema can judge the row
+    reservation = {key: value for key, value in row.items() if value not in (None, "")}
+    for field in INT_FIELDS:
+        if field in reservation and reservation[field].lstrip("-").isdigit():
+            reservation[field] = int(reservation[field])
+    return reservation
+
+
+def _with_guid(reservation: Dict) -> Dict:
+    if isinstance(reservation, dict) and not reservation.get("reservation_guid"):
+        content = json.dumps(reservation, sort_keys=True, default=str)
+        reservation["reservation_guid"] = str(uuid.uuid5(IMPORT_NAMESPACE, content))
+    return reservation
+
+
+def _chunks(rows: Iterator, chunk_size: int) -> Iterator[List]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+"""
+EXPORT
+"""
+
+
+def export_table(table_name: str, out_dir: str, segments: int, checkpoint: Checkpoint) -> Dict:
+    """
+    Export a table to one NDJSON file per scan segment.
+
+    :param table_name: table to export
+    :param out_dir: directory to write the files to
+    :param segments: amount of parallel scan segments
+    :param checkpoint: checkpoint to resume from and record progress in
+    :return: dict of results
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    progress = Progress(f"export {table_name}")
+    with ThreadPoolExecutor(max_workers=segments) as executor:
+        futures = [
+            executor.submit(_export_segment, table_name, out_dir, segment, segments, checkpoint, progress)
+            for segment in range(segments)
+        ]
+        files = [future.result() for future in futures]
+
+    result = progress.summary()
+    result["files"] = files
+    logger.info(result)
+    return result
+
+
+def _export_segment(
+        table_name: str,
+        out_dir: str,
+        segment: int,
+        segments: int,
+        checkpoint: Checkpoint,
+        progress: Progress) -> str:
+    path = os.path.join(out_dir, f"{table_name}-segment-{segment}.ndjson")
+    state = checkpoint.get(str(segment), {"last_key": None, "done": False, "offset": 0})
+    with open(path, "a+") as f:
+        # drop anything written after the last checkpoint, it will be scanned again
+        f.truncate(state["offset"])
+        f.seek(state["offset"])
+        while not state["done"]:
+            response = dc.scan_segment(
+                table_name=table_name,
+                segment=segment,
+                total_segments=segments,
+                start_key=state["last_key"]
+            )
+            for item in response.get("Items", []):
+                f.write(to_json(item) + "\n")
+            f.flush()
+            progress.add(len(response.get("Items", [])))
+            state = {
+                "last_key": response.get("LastEvaluatedKey"),
+                "done": response.get("LastEvaluatedKey") is None,
+                "offset": f.tell()
+            }
+            checkpoint.update(str(segment), state)
+    return path
+
+
+"""
+CLI
+"""
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Bulk import/export of reservations.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = subparsers.add_parser("import", help="import NDJSON/CSV files")
+    import_parser.add_argument("--env", required=True, choices=["sandbox", "prod"])
+    import_parser.add_argument("--table", help="defaults to the env config reservations_table")
+    import_parser.add_argument("--file", required=True, nargs="+", help="NDJSON (.ndjson/.json) or CSV (.csv) files")
+    import_parser.add_argument("--workers", type=int, default=4, help="parallel batch writers")
+    import_parser.add_argument("--chunk-size", type=int, default=500, help="rows per unit of work")
+    import_parser.add_argument("--checkpoint", help="checkpoint file, defaults to .import-<table>.json")
+    import_parser.add_argument("--fresh", action="store_true", help="ignore an existing checkpoint and start over")
+    import_parser.add_argument("--set-ttl", action="store_true",
+                               help="set the archival TTL from the env config archive_retention_days, e.g. to backfill "
+                                    "it on an export of items written before it existed; like the app, only when the "
+                                    "env config has an archive_table and a reservations_stream_arn")
+
+    export_parser = subparsers.add_parser("export", help="export the table to NDJSON files")
+    export_parser.add_argument("--env", required=True, choices=["sandbox", "prod"])
+    export_parser.add_argument("--table", help="defaults to the env config reservations_table")
+    export_parser.add_argument("--out-dir", required=True, help="directory to write the NDJSON files to")
+    export_parser.add_argument("--segments", type=int, default=4, help="parallel scan segments / worker threads")
+    export_parser.add_argument("--checkpoint", help="checkpoint file, defaults to .export-<table>.json")
+    export_parser.add_argument("--fresh", action="store_true", help="ignore an existing checkpoint and start over")
+    args = parser.parse_args(argv)
+
+    config = load_config(args.env)
+    table_name = args.table or config["reservations_table"]
+    # share the provisioned capacity limits of the env so a bulk run backs off before the table throttles
+    for capacity_table, capacity in config.get("table_capacity", {}).items():
+        dc.configure_capacity(capacity_table, capacity)
+
+    if args.command == "import":
+        # only the stream handler archives ttl deletes; without it a TTL would delete past stays for good
+        if args.set_ttl and not (config.get("archive_table") and config.get("reservations_stream_arn")):
+            parser.error("--set-ttl needs archive_table and reservations_stream_arn in the env config, past "
+                         "reservations would be deleted by the TTL without being archived.")
+        checkpoint = Checkpoint(args.checkpoint or f".import-{table_name}.json", fresh=args.fresh)
+        # the checkpoint records finished chunks by index, another chunk size would skip or repeat rows
+        if checkpoint.get("chunk_size", args.chunk_size) != args.chunk_size:
+            parser.error(f"the checkpoint was written with a --chunk-size of {checkpoint.get('chunk_size')}, "
+                         f"rerun with the same --chunk-size or with --fresh.")
+        checkpoint.update("chunk_size", args.chunk_size)
+        progress = Progress(f"import {table_name}")
+        retention = archive.retention_seconds(config.get("archive_retention_days")) if args.set_ttl else None
+        results = [
+            import_file(path, table_name, args.workers, args.chunk_size, checkpoint, progress, retention)
+            for path in args.file
+        ]
+        summary = progress.summary()
+        summary["rejected"] = sum(result["rejected"] for result in results)
+        logger.info(summary)
+        return 0 if not summary["rejected"] else 1
+
+    checkpoint = Checkpoint(args.checkpoint or f".export-{table_name}.json", fresh=args.fresh)
+    if checkpoint.get("segments", args.segments) != args.segments:
+        parser.error(f"the checkpoint was written with {checkpoint.get('segments')} segments, "
+                     f"rerun with the same --segments or with --fresh.")
+    checkpoint.update("segments", args.segments)
+    export_table(table_name, args.out_dir, args.segments, checkpoint)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
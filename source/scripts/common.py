@@ -0,0 +1,118 @@
+"""
+filename: common.py
+author: Jack Gularte
+date: Oct. 19 2026
+
+Shared helpers for the operational scripts. Scripts are run from the source directory, e.g.
+`python -m scripts.migrate_reservations --env sandbox`, so that the chalicelib relative paths resolve.
+"""
+# standard imports
+import json
+import logging
+import os
+import threading
+import time
+from decimal import Decimal
+from typing import Any, Dict
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+def load_config(env: str) -> Dict:
+    """
+    Load the environment config the chalice app uses.
+
+    :param env: sandbox or prod
+    :return: config dict
+    """
+    with open(f"chalicelib/configs/{env}.json") as f:
+        return json.load(f)
+
+
+def to_json(obj: Any) -> str:
+    """
+    Dump an object holding DynamoDB Decimals to a json string.
+
+    :param obj: object to dump
+    :return: json string
+    """
+    return json.dumps(obj, default=_decimal_default)
+
+
+def from_json(line: str) -> Any:
+    """
+    Load a json string, floats are parsed as Decimals so boto3 accepts them.
+
+    :param line: json string
+    :return: loaded object
+    """
+    return json.loads(line, parse_float=Decimal)
+
+
+def _decimal_default(obj: Any) -> Any:
+    if isinstance(obj, Decimal):
+        return int(obj) if obj % 1 == 0 else float(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class Checkpoint:
+    """
+    Thread safe json checkpoint file. The state is written atomically after every update so a killed run can be
+    resumed from the last completed unit of work.
+    """
+
+    def __init__(self, path: str, fresh: bool = False):
+        self.path = path
+        self._lock = threading.Lock()
+        self.state = {}
+        if not fresh and os.path.exists(path):
+            with open(path) as f:
+                self.state = from_json(f.read())
+            logger.info({"checkpoint": path, "resumed": True})
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            return self.state.get(key, default)
+
+    def update(self, key: str, value: Any) -> None:
+        with self._lock:
+            self.state[key] = value
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                f.write(to_json(self.state))
+            os.replace(tmp_path, self.path)
+
+
+class Progress:
+    """
+    Thread safe item counter that logs throughput at most every `interval` seconds.
+    """
+
+    def __init__(self, label: str, interval: float = 5.0):
+        self.label = label
+        self.interval = interval
+        self.count = 0
+        self.started = time.monotonic()
+        self._last_report = self.started
+        self._lock = threading.Lock()
+
+    def add(self, amount: int) -> None:
+        with self._lock:
+            self.count += amount
+            now = time.monotonic()
+            if now - self._last_report >= self.interval:
+                self._last_report = now
+                logger.info(self.summary())
+
+    def items_per_second(self) -> float:
+        elapsed = time.monotonic() - self.started
+        return self.count / elapsed if elapsed > 0 else 0.0
+
+    def summary(self) -> Dict:
+        return {
+            "progress": self.label,
+            "items": self.count,
+            "seconds": round(time.monotonic() - self.started, 2),
+            "items_per_second": round(self.items_per_second(), 2)
+        }
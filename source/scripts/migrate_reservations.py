@@ -0,0 +1,338 @@
+"""
+filename: migrate_reservations.py
+author: Jack Gularte
+date: Oct. 19 2026
+
+Backfill tool that copies the reservations table into a table with a new key layout (see
+chalicelib/reservation_layouts.py). The source is read with a parallel segmented scan, every item is written with a
+conditional put that only creates missing keys, so an item the dual write mirrored while the backfill ran is never
+overwritten with the older scanned copy, and the LastEvaluatedKey of each segment is checkpointed after its page is
+written, so a killed run resumes where it stopped. When the target layout collapses several live items into one key
+(the guid layout), the item the API serves for the guid is copied, see reservation_layouts.pick_item.
+
+The verification pass compares every item of both tables and reports missing, extra and stale target items. A scan
+can race with the dual write (a reservation deleted after its page was scanned is copied anyway), so --repair fixes
+the reported drift from a fresh read of the source table: extra items are deleted, missing and stale ones rewritten.
+
+Cut-over without downtime:
+    1. create the target table and set "dual_write_table" / "dual_write_layout" in the env config and deploy. From
+       then on every create/update/delete is mirrored into the target table.
+    2. python -m scripts.migrate_reservations --env sandbox --repair
+    3. rerun with --verify-only (and --repair) until the verification matches.
+    4. point "reservations_table" at the target table and clear "dual_write_table".
+"""
+# standard imports
+import argparse
+import hashlib
+import logging
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Set, Tuple
+
+# internal imports
+from chalicelib.aws_clients import dynamodb_client as dc
+from chalicelib import reservation_layouts as layouts
+from scripts.common import Checkpoint, Progress, load_config, to_json
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+"""
+BACKFILL
+"""
+
+
+def backfill(
+        source_table: str,
+        target_table: str,
+        target_layout: str,
+        segments: int,
+        page_size: int,
+        checkpoint: Checkpoint) -> Dict:
+    """
+    Copy every item of the source table into the target table using one worker per scan segment.
+
+    :param source_table: table to copy from
+    :param target_table: table to copy into
+    :param target_layout: name of the layout of the target table
+    :param segments: amount of parallel scan segments
+    :param page_size: max items evaluated per scan page
+    :param checkpoint: checkpoint to resume from and record progress in
+    :return: dict of results
+    """
+    progress = Progress(f"backfill {source_table} -> {target_table}")
+    with ThreadPoolExecutor(max_workers=segments) as executor:
+        futures = [
+            executor.submit(
+                _backfill_segment, source_table, target_table, target_layout, segment, segments, page_size,
+                checkpoint, progress
+            )
+            for segment in range(segments)
+        ]
+        states = [future.result() for future in futures]
+
+    result = progress.summary()
+    result["copied_total"] = sum(state["copied"] for state in states)
+    # keys the dual write (or an earlier run) had already written
+    result["skipped_total"] = sum(state.get("skipped", 0) for state in states)
+    logger.info(result)
+    return result
+
+
+def _backfill_segment(
+        source_table: str,
+        target_table: str,
+        target_layout: str,
+        segment: int,
+        segments: int,
+        page_size: int,
+        checkpoint: Checkpoint,
+        progress: Progress) -> Dict:
+    state = checkpoint.get(str(segment), {"last_key": None, "done": False, "copied": 0, "skipped": 0})
+    while not state["done"]:
+        response = dc.scan_segment(
+            table_name=source_table,
+            segment=segment,
+            total_segments=segments,
+            start_key=state["last_key"],
+            limit=page_size
+        )
+        last_key = response.get("LastEvaluatedKey")
+        groups = list(_group_by_target_key(response.get("Items", []), target_layout).values())
+        copied = 0
+        for position, group in enumerate(groups):
+            # the items of a guid are contiguous within a segment, but a page boundary can split them; re-read the
+            # groups at the edges of the page whole so the pick sees every item of the guid
+            at_edge = (position == 0 and state["last_key"]) or (position == len(groups) - 1 and last_key)
+            if at_edge and layouts.collapses(target_layout):
+                group = _source_items(source_table, target_layout, layouts.layout_key(group[0], target_layout))
+                if not group:
+                    continue
+            copied += _put_if_absent(target_table, target_layout, layouts.pick_item(group))
+        progress.add(copied)
+
+        # only checkpoint once the page is durable in the target table
+        state = {
+            "last_key": last_key,
+            "done": last_key is None,
+            "copied": state["copied"] + copied,
+            "skipped": state.get("skipped", 0) + len(groups) - copied
+        }
+        checkpoint.update(str(segment), state)
+    return state
+
+
+def _put_if_absent(target_table: str, target_layout: str, item: Dict) -> int:
+    # a key that exists was written by the dual write, which is at least as new as the scanned item
+    try:
+        dc.write_conditional(
+            table_name=target_table,
+            item=layouts.to_layout_item(item, target_layout),
+            condition_expr=f"attribute_not_exists({layouts.LAYOUTS[target_layout]['hash_key']})"
+        )
+        return 1
+    except ValueError as ve:
+        if str(ve) != "ConditionalCheckFailed":
+            raise
+        return 0
+
+
+"""
+VERIFY
+"""
+
+
+def verify(source_table: str, target_table: str, target_layout: str, segments: int) -> Dict:
+    """
+    Compare every item of both tables. Source items are grouped by their target key; a target item matches when it
+    equals (a copy of) one of the source items of its key, so keys the layout collapses are accounted for.
+
+    :param source_table: table copied from
+    :param target_table: table copied into
+    :param target_layout: name of the layout of the target table
+    :param segments: amount of parallel scan segments
+    :return: dict of results, "match" is True when both tables hold the same reservations; "missing", "extra" and
+             "stale" hold every drifted target key for repair
+    """
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        source_future = executor.submit(_scan_digests, source_table, target_layout, segments)
+        target_future = executor.submit(_scan_digests, target_table, target_layout, segments)
+        source_count, source_digests = source_future.result()
+        target_count, target_digests = target_future.result()
+
+    missing = sorted(source_digests.keys() - target_digests.keys())
+    extra = sorted(target_digests.keys() - source_digests.keys())
+    stale = sorted(
+        key for key in source_digests.keys() & target_digests.keys()
+        if not target_digests[key] & source_digests[key]
+    )
+    result = {
+        "source_table": source_table,
+        "source_count": source_count,
+        "target_table": target_table,
+        "target_count": target_count,
+        # source keys the target layout merges into one item
+        "collapsed_count": sum(len(digests) - 1 for digests in source_digests.values()),
+        "missing": missing,
+        "extra": extra,
+        "stale": stale,
+        "match": not missing and not extra and not stale
+    }
+    logger.info(_summary(result))
+    return result
+
+
+def _summary(result: Dict) -> Dict:
+    summary = {key: value for key, value in result.items() if key not in ["missing", "extra", "stale"]}
+    for drift in ["missing", "extra", "stale"]:
+        summary[f"{drift}_count"] = len(result[drift])
+        summary[f"{drift}_in_target"] = ["/".join(str(value) for value in key) for key in result[drift][:25]]
+    return summary
+
+
+def _scan_digests(table_name: str, target_layout: str, segments: int) -> Tuple[int, Dict[tuple, Set[str]]]:
+    # parallel scan of full items, reduced to a digest per item and grouped by the target key
+    with ThreadPoolExecutor(max_workers=segments) as executor:
+        futures = [
+            executor.submit(_scan_segment_digests, table_name, target_layout, segment, segments)
+            for segment in range(segments)
+        ]
+        digests = {}
+        count = 0
+        for future in futures:
+            segment_count, segment_digests = future.result()
+            count += segment_count
+            for key, values in segment_digests.items():
+                digests.setdefault(key, set()).update(values)
+    return count, digests
+
+
+def _scan_segment_digests(
+        table_name: str,
+        target_layout: str,
+        segment: int,
+        segments: int) -> Tuple[int, Dict[tuple, Set[str]]]:
+    digests = {}
+    count = 0
+    start_key = None
+    while True:
+        response = dc.scan_segment(
+            table_name=table_name,
+            segment=segment,
+            total_segments=segments,
+            start_key=start_key
+        )
+        count += response.get("Count", 0)
+        for item in response.get("Items", []):
+            key = tuple(layouts.layout_key(item, target_layout).values())
+            digests.setdefault(key, set()).add(_digest(layouts.to_layout_item(item, target_layout)))
+        start_key = response.get("LastEvaluatedKey")
+        if start_key is None:
+            return count, digests
+
+
+def _digest(item: Dict) -> str:
+    return hashlib.sha1(to_json(dict(sorted(item.items()))).encode()).hexdigest()
+
+
+"""
+REPAIR
+"""
+
+
+def repair(source_table: str, target_table: str, target_layout: str, result: Dict) -> Dict:
+    """
+    Fix the drift a verification found. Every drifted key is re-read from the source table right before it is fixed:
+    keys the source no longer holds are deleted from the target, the others are rewritten from the source.
+
+    :param source_table: table copied from
+    :param target_table: table copied into
+    :param target_layout: name of the layout of the target table
+    :param result: the result of verify
+    :return: dict of results
+    """
+    key_names = [name for name in (layouts.LAYOUTS[target_layout]["hash_key"],
+                                   layouts.LAYOUTS[target_layout]["range_key"]) if name]
+    rewritten = 0
+    deleted = 0
+    for key in result["missing"] + result["stale"] + result["extra"]:
+        target_key = dict(zip(key_names, key))
+        items = _source_items(source_table, target_layout, target_key)
+        if items:
+            dc.write(table_name=target_table, item=layouts.to_layout_item(layouts.pick_item(items), target_layout))
+            rewritten += 1
+        else:
+            dc.delete_item(table_name=target_table, item=target_key)
+            deleted += 1
+
+    summary = {"repair": f"{source_table} -> {target_table}", "rewritten": rewritten, "deleted": deleted}
+    logger.info(summary)
+    return summary
+
+
+def _source_items(source_table: str, target_layout: str, target_key: Dict) -> List[Dict]:
+    # the source items that map to a target key; every layout hashes on the reservation guid
+    hash_key = layouts.LAYOUTS[layouts.CURRENT_LAYOUT]["hash_key"]
+    items = dc.match_primary(source_table, hash_key, target_key[hash_key]).get("Items", [])
+    return [item for item in items if layouts.layout_key(item, target_layout) == target_key]
+
+
+def _group_by_target_key(items: List[Dict], target_layout: str) -> Dict[tuple, List[Dict]]:
+    groups = {}
+    for item in items:
+        groups.setdefault(tuple(layouts.layout_key(item, target_layout).values()), []).append(item)
+    return groups
+
+
+"""
+CLI
+"""
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Copy the reservations table into a new key layout.")
+    parser.add_argument("--env", required=True, choices=["sandbox", "prod"])
+    parser.add_argument("--source-table", help="defaults to the env config reservations_table")
+    parser.add_argument("--target-table", help="defaults to the env config dual_write_table")
+    parser.add_argument("--target-layout", help="defaults to the env config dual_write_layout")
+    parser.add_argument("--segments", type=int, default=4, help="parallel scan segments / worker threads")
+    parser.add_argument("--page-size", type=int, default=100, help="max items evaluated per scan page")
+    parser.add_argument("--checkpoint", help="checkpoint file, defaults to .migrate-<source>-<target>.json")
+    parser.add_argument("--fresh", action="store_true", help="ignore an existing checkpoint and start over")
+    parser.add_argument("--verify-only", action="store_true", help="skip the backfill, only compare the tables")
+    parser.add_argument("--no-verify", action="store_true", help="skip the verification after the backfill")
+    parser.add_argument("--repair", action="store_true",
+                        help="fix the drift the verification finds from the source table, then verify again")
+    args = parser.parse_args(argv)
+
+    config = load_config(args.env)
+    source_table = args.source_table or config["reservations_table"]
+    target_table = args.target_table or config.get("dual_write_table")
+    target_layout = args.target_layout or config.get("dual_write_layout")
+    if not target_table or target_layout not in layouts.LAYOUTS:
+        parser.error("a target table and a known target layout are required (flags or env config).")
+
+    if not args.verify_only:
+        checkpoint = Checkpoint(
+            args.checkpoint or f".migrate-{source_table}-{target_table}.json",
+            fresh=args.fresh
+        )
+        if checkpoint.get("segments", args.segments) != args.segments:
+            parser.error(f"the checkpoint was written with {checkpoint.get('segments')} segments, "
+                         f"rerun with the same --segments or with --fresh.")
+        checkpoint.update("segments", args.segments)
+        backfill(source_table, target_table, target_layout, args.segments, args.page_size, checkpoint)
+
+    if args.verify_only or not args.no_verify:
+        result = verify(source_table, target_table, target_layout, args.segments)
+        if not result["match"] and args.repair:
+            repair(source_table, target_table, target_layout, result)
+            result = verify(source_table, target_table, target_layout, args.segments)
+        return 0 if result["match"] else 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,177 @@
+"""
+filename: rebuild_views.py
+author: Jack Gularte
+date: Oct. 19 2026
+
+Rebuild the derived reservation views (see chalicelib/reservation_views_service.py) from the reservations table. The
+stream handler only sees changes made after it was deployed, and at most the last 24 hours of them, so this is how the
+views of older reservations are created and how views are repaired after a failed stream batch.
+
+Both tables are read with a parallel segmented scan. The view members every reservation should have are compared with
+the members the views table holds; for every reservation whose members differ, the reservation is read again right
+before its members are fixed, so a change the stream handler applied while the scans ran is not undone. Finally the
+feed version is bumped so cached reads are recomputed. Running it again is harmless.
+
+Order of a first deployment:
+    1. set "reservations_stream_arn" in the env config and deploy, so every change from now on reaches the views.
+    2. python -m scripts.rebuild_views --env sandbox
+    3. only then set "read_views" in the env config and deploy, so the range reads and /availability use the views.
+"""
+# standard imports
+import argparse
+import logging
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Set, Tuple
+
+# internal imports
+from chalicelib import reservation_views_service as views
+from chalicelib import storage
+from chalicelib.aws_clients import dynamodb_client as dc
+from chalicelib.reservations_service import RESERVATION_PRIMARY
+from scripts.common import Progress, load_config
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+"""
+REBUILD
+"""
+
+
+def rebuild(reservations_table: str, views_table: str, segments: int, dry_run: bool = False) -> Dict:
+    """
+    Bring the views table in line with the reservations table.
+
+    :param reservations_table: the reservations table
+    :param views_table: the views table
+    :param segments: amount of parallel scan segments / worker threads
+    :param dry_run: only report the reservations whose views differ
+    :return: dict of results
+    """
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        expected_future = executor.submit(_scan, reservations_table, segments, _expected_members)
+        actual_future = executor.submit(_scan, views_table, segments, _actual_members)
+        expected = expected_future.result()
+        actual = actual_future.result()
+
+    drifted = {key[1] for key, attributes in expected.items() if actual.get(key) != attributes}
+    drifted |= {key[1] for key in actual.keys() - expected.keys()}
+    result = {
+        "reservations_table": reservations_table,
+        "views_table": views_table,
+        "expected_members": len(expected),
+        "actual_members": len(actual),
+        "drifted_reservations": len(drifted),
+        "sample": sorted(drifted)[:25]
+    }
+    if dry_run or not drifted:
+        logger.info(result)
+        return result
+
+    # every view member is keyed on its reservation guid, group the current members per reservation
+    members_of = {}
+    for key in actual:
+        if key[1] in drifted:
+            members_of.setdefault(key[1], set()).add(key)
+
+    progress = Progress(f"rebuild {views_table}")
+    with ThreadPoolExecutor(max_workers=segments) as executor:
+        futures = [
+            executor.submit(_repair, reservations_table, views_table, guid, members_of.get(guid, set()), progress)
+            for guid in drifted
+        ]
+        for future in futures:
+            future.result()
+
+    views.bump_feed_version(views_table, "rebuild")
+    result.update(progress.summary())
+    logger.info(result)
+    return result
+
+
+def _repair(reservations_table: str, views_table: str, guid: str, current: Set[Tuple], progress: Progress) -> None:
+    # derive the members from a fresh read of the reservation, not from the scanned image
+    items = dc.match_primary(reservations_table, RESERVATION_PRIMARY, guid).get("Items", [])
+    members = {}
+    for item in items:
+        members.update(views.view_members(item))
+
+    for view_key, member_key in current - members.keys():
+        dc.delete_item(table_name=views_table, item={views.VIEW_PRIMARY: view_key, views.VIEW_SORT: member_key})
+    for (view_key, member_key), attributes in members.items():
+        dc.write(
+            table_name=views_table,
+            item=dict(attributes, **{views.VIEW_PRIMARY: view_key, views.VIEW_SORT: member_key})
+        )
+    progress.add(1)
+
+
+"""
+SCAN
+"""
+
+
+def _scan(table_name: str, segments: int, members) -> Dict[Tuple, Dict]:
+    with ThreadPoolExecutor(max_workers=segments) as executor:
+        futures = [
+            executor.submit(_scan_segment, table_name, segment, segments, members)
+            for segment in range(segments)
+        ]
+        result = {}
+        for future in futures:
+            result.update(future.result())
+    return result
+
+
+def _scan_segment(table_name: str, segment: int, segments: int, members) -> Dict[Tuple, Dict]:
+    result = {}
+    start_key = None
+    while True:
+        response = dc.scan_segment(
+            table_name=table_name,
+            segment=segment,
+            total_segments=segments,
+            start_key=start_key
+        )
+        for item in response.get("Items", []):
+            result.update(members(item))
+        start_key = response.get("LastEvaluatedKey")
+        if start_key is None:
+            return result
+
+
+def _expected_members(reservation: Dict) -> Dict[Tuple, Dict]:
+    return views.view_members(reservation)
+
+
+def _actual_members(item: Dict) -> Dict[Tuple, Dict]:
+    if item[views.VIEW_PRIMARY] == views.FEED_VIEW:
+        return {}
+    key = (item.pop(views.VIEW_PRIMARY), item.pop(views.VIEW_SORT))
+    return {key: item}
+
+
+"""
+CLI
+"""
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Rebuild the derived reservation views from the reservations table.")
+    parser.add_argument("--env", required=True, choices=["sandbox", "prod"])
+    parser.add_argument("--segments", type=int, default=4, help="parallel scan segments / worker threads")
+    parser.add_argument("--dry-run", action="store_true", help="only report the reservations whose views differ")
+    args = parser.parse_args(argv)
+
+    config = load_config(args.env)
+    # the feed version is written through the storage backend, like the stream handler does
+    views.register_tables(backend=storage.configure("dynamodb"), table_name=config["views_table"])
+    rebuild(config["reservations_table"], config["views_table"], args.segments, dry_run=args.dry_run)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,156 @@
+"""
+filename: conftest.py
+author: Jack Gularte
+date: Oct. 19 2026
+
+Shared fixtures of the unit tests. Services run against the in-memory storage engine and Cognito tokens are signed
+with a test key, so no test needs AWS.
+"""
+# standard imports
+import base64
+import hashlib
+import json
+import os
+import random
+import time
+
+# app.py reads the env config on import, the local one runs on the in-memory engine
+os.environ.setdefault("RUN_ENV", "local")
+
+# external installed imports
+import pytest  # noqa: E402
+
+# internal imports
+from chalicelib import availability_service as availability  # noqa: E402
+from chalicelib import jwt_auth  # noqa: E402
+from chalicelib import reservations_service as rs  # noqa: E402
+from chalicelib import storage  # noqa: E402
+
+RESERVATIONS_TABLE = "reservations-test"
+REGION = "us-west-2"
+USER_POOL_ID = "us-west-2_test"
+APP_CLIENT_ID = "test-client"
+KID = "test-kid"
+
+
+@pytest.fixture
+def memory_backend():
+    """
+    A fresh in-memory backend, configured as the storage backend of the services, with the reservations table.
+    """
+    backend = storage.configure("memory")
+    rs.register_tables(backend, RESERVATIONS_TABLE)
+    availability._cache.clear()
+    return backend
+
+
+"""
+TOKENS
+"""
+
+
+def _probable_prime(bits: int, rng: random.Random) -> int:
+    while True:
+        candidate = rng.getrandbits(bits) | (1 << (bits - 1)) | 1
+        if _miller_rabin(candidate, rng):
+            return candidate
+
+
+def _miller_rabin(n: int, rng: random.Random, rounds: int = 32) -> bool:
+    if any(n % p == 0 for p in (3, 5, 7, 11, 13, 17, 19, 23, 29, 31)):
+        return False
+    d, r = n - 1, 0
+    while d % 2 == 0:
+        d, r = d // 2, r + 1
+    for _ in range(rounds):
+        x = pow(rng.randrange(2, n - 2), d, n)
+        if x in (1, n - 1):
+            continue
+        for _ in range(r - 1):
+            x = pow(x, 2, n)
+            if x == n - 1:
+                break
+        else:
+            return False
+    return True
+
+
+def make_rsa_key(seed: int) -> dict:
+    """
+    A deterministic 1024 bit RSA key, large enough for an RS256 signature and fast to generate.
+
+    :param seed: Seed of the key
+    :return: {"n", "e", "d"}
+    """
+    rng = random.Random(seed)
+    e = 65537
+    while True:
+        p, q = _probable_prime(512, rng), _probable_prime(512, rng)
+        phi = (p - 1) * (q - 1)
+        if p != q and phi % e:
+            return {"n": p * q, "e": e, "d": pow(e, -1, phi)}
+
+
+def _b64url(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def sign_token(key: dict, claims: dict, header: dict = None) -> str:
+    """
+    An RS256 JWT signed with a test key.
+
+    :param key: The RSA key
+    :param claims: The claims
+    :param header: Header fields overriding the defaults
+    :return: The raw JWT
+    """
+    header = dict({"alg": "RS256", "kid": KID}, **(header or {}))
+    signing_input = f"{_b64url(json.dumps(header).encode())}.{_b64url(json.dumps(claims).encode())}"
+    k = (key["n"].bit_length() + 7) // 8
+    digest_info = jwt_auth.SHA256_DIGEST_INFO + hashlib.sha256(signing_input.encode()).digest()
+    encoded = b"\x00\x01" + b"\xff" * (k - len(digest_info) - 3) + b"\x00" + digest_info
+    signature = pow(int.from_bytes(encoded, "big"), key["d"], key["n"]).to_bytes(k, "big")
+    return f"{signing_input}.{_b64url(signature)}"
+
+
+def id_token_claims(sub: str = "user-1", **overrides) -> dict:
+    claims = {
+        "sub": sub,
+        "iss": jwt_auth.ISSUER.format(region=REGION, user_pool_id=USER_POOL_ID),
+        "aud": APP_CLIENT_ID,
+        "token_use": "id",
+        "exp": int(time.time()) + 3600
+    }
+    claims.update(overrides)
+    return claims
+
+
+@pytest.fixture(scope="session")
+def signing_key() -> dict:
+    return make_rsa_key(seed=1)
+
+
+@pytest.fixture
+def jwks(signing_key, monkeypatch):
+    """
+    Empty jwt_auth caches and a user pool JWKS holding the test key; returns the list of fetches, which tests can make
+    fail by setting jwks.fail.
+    """
+    monkeypatch.setattr(jwt_auth, "_jwks_fetched_at", None)
+    jwt_auth._jwks.clear()
+    jwt_auth._claims_cache.clear()
+
+    class Fetches(list):
+        fail = False
+        keys = {KID: (signing_key["n"], signing_key["e"])}
+
+    fetches = Fetches()
+
+    def fetch_jwks(region, user_pool_id):
+        fetches.append((region, user_pool_id))
+        if fetches.fail:
+            raise jwt_auth.InvalidToken("The user pool signing keys could not be fetched.")
+        return dict(fetches.keys)
+
+    monkeypatch.setattr(jwt_auth, "fetch_jwks", fetch_jwks)
+    return fetches
@@ -0,0 +1,111 @@
+"""
+filename: test_app.py
+author: Jack Gularte
+date: Oct. 19 2026
+
+Route level tests of the cognito_jwt auth mode: the token's sub becomes the caller's user_guid and only the owner of a
+reservation may change it. Runs the local env config on the in-memory engine.
+"""
+# standard imports
+import json
+
+# external installed imports
+import pytest
+from chalice.app import AuthRequest
+from chalice.test import Client
+
+# internal imports
+import app
+from chalicelib import idempotency_service as idempotency
+from chalicelib import reservations_service as rs
+from chalicelib import reservation_views_service as views
+from chalicelib import storage
+from tests.conftest import APP_CLIENT_ID, REGION, USER_POOL_ID, id_token_claims, sign_token
+
+JUL_3 = 1719964800
+DAY = 86400
+
+
+@pytest.fixture
+def client(jwks, monkeypatch):
+    backend = storage.configure("memory")
+    rs.register_tables(backend, app.RES_TABLE)
+    idempotency.register_tables(backend=backend, table_name=app.IDEMPOTENCY_TABLE)
+    views.register_tables(backend=backend, table_name=app.VIEWS_TABLE)
+    monkeypatch.setattr(app, "AUTH_MODE", "cognito_jwt")
+    monkeypatch.setitem(app.CONFIG, "cognito_region", REGION)
+    monkeypatch.setitem(app.CONFIG, "cognito_user_pool_id", USER_POOL_ID)
+    monkeypatch.setitem(app.CONFIG, "cognito_app_client_id", APP_CLIENT_ID)
+    with Client(app.app) as test_client:
+        yield test_client
+
+
+def headers(signing_key: dict, sub: str, json_body: bool = True) -> dict:
+    result = {"Authorization": f"Bearer {sign_token(signing_key, id_token_claims(sub=sub))}"}
+    if json_body:
+        result["Content-Type"] = "application/json"
+    return result
+
+
+def create(client, signing_key, sub: str) -> dict:
+    body = {"user_guid": "ignored", "epoch_start": JUL_3, "epoch_end": JUL_3 + 2 * DAY, "reservation_type": "closed"}
+    response = client.http.post("/reservations", headers=headers(signing_key, sub), body=json.dumps(body))
+    assert response.status_code == 200
+    return response.json_body["data"]
+
+
+"""
+AUTHORIZER
+"""
+
+
+def test_sub_is_the_user_guid(client, signing_key):
+    reservation = create(client, signing_key, "owner")
+    assert reservation["user_guid"] == "owner"
+
+
+def test_invalid_token_is_denied(client, signing_key):
+    claims = id_token_claims(sub="owner", aud="another-client")
+    response = client.http.get("/reservations", headers={"Authorization": sign_token(signing_key, claims)})
+    assert response.status_code == 403
+
+
+def test_cognito_jwt_auth_passes_the_sub(signing_key, jwks, monkeypatch):
+    monkeypatch.setitem(app.CONFIG, "cognito_region", REGION)
+    monkeypatch.setitem(app.CONFIG, "cognito_user_pool_id", USER_POOL_ID)
+    monkeypatch.setitem(app.CONFIG, "cognito_app_client_id", APP_CLIENT_ID)
+    request = AuthRequest("TOKEN", f"Bearer {sign_token(signing_key, id_token_claims(sub='owner'))}", "arn")
+    response = app.cognito_jwt_auth(request)
+    assert response.principal_id == "owner"
+    assert response.context == {"user_guid": "owner"}
+    assert response.routes == ["/*"]
+
+
+"""
+OWNERSHIP
+"""
+
+
+def test_put_by_another_user_is_forbidden(client, signing_key):
+    reservation = create(client, signing_key, "owner")
+    changed = dict(reservation, epoch_end=JUL_3 + 3 * DAY)
+    response = client.http.put("/reservations", headers=headers(signing_key, "intruder"), body=json.dumps(changed))
+    assert response.status_code == 403
+    stored = rs.find_reservation(app.RES_TABLE, reservation["reservation_guid"])
+    assert (stored["user_guid"], int(stored["epoch_end"])) == ("owner", JUL_3 + 2 * DAY)
+
+    response = client.http.put("/reservations", headers=headers(signing_key, "owner"), body=json.dumps(changed))
+    assert response.status_code == 200
+
+
+def test_delete_by_another_user_is_forbidden(client, signing_key):
+    guid = create(client, signing_key, "owner")["reservation_guid"]
+    intruder_headers = headers(signing_key, "intruder", json_body=False)
+    response = client.http.delete(f"/reservations?guid={guid}", headers=intruder_headers)
+    assert response.status_code == 403
+    assert rs.find_reservation(app.RES_TABLE, guid) is not None
+
+    owner_headers = headers(signing_key, "owner", json_body=False)
+    response = client.http.delete(f"/reservations?guid={guid}", headers=owner_headers)
+    assert response.status_code == 200
+    assert rs.find_reservation(app.RES_TABLE, guid) is None
@@ -0,0 +1,108 @@
+"""
+filename: test_availability.py
+author: Jack Gularte
+date: Oct. 19 2026
+
+Unit tests of the occupancy vector and the free window search, on the in-memory storage engine.
+"""
+# standard imports
+import json
+
+# internal imports
+from chalicelib import availability_service as availability
+from chalicelib import reservations_service as rs
+from tests.conftest import RESERVATIONS_TABLE
+
+DAY = 86400
+JUL_1 = availability.parse_date("2024-07-01")
+JUL_3 = availability.parse_date("2024-07-03")
+
+
+def stay(epoch_start: int, epoch_end: int) -> dict:
+    return {"epoch_start": epoch_start, "epoch_end": epoch_end}
+
+
+def occupied_days(reservations: list) -> list:
+    occupancy = availability.occupancy_vector(reservations, JUL_1, JUL_1 + 10 * DAY)
+    return [availability.format_date(JUL_1 + night * DAY) for night, occupied in enumerate(occupancy) if occupied]
+
+
+def create(epoch_start: int, epoch_end: int) -> str:
+    response = rs.create_reservation(RESERVATIONS_TABLE, {
+        "user_guid": "user",
+        "epoch_start": epoch_start,
+        "epoch_end": epoch_end,
+        "reservation_type": "closed"
+    })
+    assert response.status_code == 200
+    return response.body["data"]["reservation_guid"]
+
+
+def first_window(nights: int = 1) -> dict:
+    response = availability.get_availability(RESERVATIONS_TABLE, None, "2024-07-01", "2024-07-31", nights=nights)
+    return json.loads(json.dumps(response.body))["data"]["windows"][0]
+
+
+"""
+OCCUPANCY
+"""
+
+
+def test_a_stay_ending_mid_day_leaves_the_check_out_day_free():
+    # jul 3 09:46 to jul 5 09:46
+    assert occupied_days([stay(1720000000, 1720172800)]) == ["2024-07-03", "2024-07-04"]
+
+
+def test_a_stay_ending_on_midnight():
+    assert occupied_days([stay(JUL_3, JUL_3 + 2 * DAY)]) == ["2024-07-03", "2024-07-04"]
+
+
+def test_back_to_back_stays_do_not_overlap():
+    first = stay(JUL_3 + 15 * 3600, JUL_3 + DAY + 10 * 3600)
+    second = stay(JUL_3 + DAY + 15 * 3600, JUL_3 + 2 * DAY + 10 * 3600)
+    assert occupied_days([first]) == ["2024-07-03"]
+    assert occupied_days([second]) == ["2024-07-04"]
+    assert occupied_days([first, second]) == ["2024-07-03", "2024-07-04"]
+
+
+def test_a_stay_without_a_night_occupies_nothing():
+    assert occupied_days([stay(JUL_3 + 9 * 3600, JUL_3 + 17 * 3600)]) == []
+
+
+def test_stays_are_clipped_to_the_range():
+    assert occupied_days([stay(JUL_1 - 5 * DAY, JUL_1 + DAY + 3600)]) == ["2024-07-01"]
+    assert occupied_days([stay(JUL_1 + 9 * DAY, JUL_1 + 20 * DAY)]) == ["2024-07-10"]
+
+
+def test_free_windows():
+    occupancy = bytearray(b"\x00\x01\x00\x00\x01\x00\x00\x00")
+    assert availability.free_windows(occupancy, JUL_1, 2, 10) == [
+        {"check_in": "2024-07-03", "check_out": "2024-07-05", "nights": 2},
+        {"check_in": "2024-07-06", "check_out": "2024-07-09", "nights": 3}
+    ]
+    assert availability.free_windows(occupancy, JUL_1, 1, 1) == [
+        {"check_in": "2024-07-01", "check_out": "2024-07-02", "nights": 1}
+    ]
+
+
+"""
+AVAILABILITY
+"""
+
+
+def test_the_check_out_day_of_a_stay_is_available(memory_backend):
+    create(JUL_1, 1720000000)
+    create(1720000000, 1720172800)
+    assert first_window() == {"check_in": "2024-07-05", "check_out": "2024-07-31", "nights": 26}
+
+
+def test_the_cache_sees_the_writes_of_this_container(memory_backend):
+    assert first_window()["check_in"] == "2024-07-01"
+    guid = create(JUL_1, JUL_1 + 2 * DAY)
+    assert first_window()["check_in"] == "2024-07-03"
+    assert rs.delete_reservation(RESERVATIONS_TABLE, guid).status_code == 200
+    assert first_window()["check_in"] == "2024-07-01"
+    # unchanged reservations are served from the cache
+    hits = availability.cache_stats["hits"]
+    first_window()
+    assert availability.cache_stats["hits"] == hits + 1
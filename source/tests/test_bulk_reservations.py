@@ -0,0 +1,43 @@
+"""
+filename: test_bulk_reservations.py
+author: Jack Gularte
+date: Oct. 19 2026
+
+Tests of resuming a bulk import from its checkpoint.
+"""
+# standard imports
+import json
+
+# external installed imports
+import pytest
+
+# internal imports
+from scripts import bulk_reservations
+
+
+@pytest.fixture
+def import_args(tmp_path, monkeypatch):
+    monkeypatch.setattr(bulk_reservations.dc, "configure_capacity", lambda table_name, capacity: None)
+    rows = tmp_path / "reservations.ndjson"
+    rows.write_text("")
+    checkpoint = tmp_path / "checkpoint.json"
+    return checkpoint, ["import", "--env", "sandbox", "--table", "reservations-test", "--file", str(rows),
+                        "--checkpoint", str(checkpoint)]
+
+
+def test_import_records_its_chunk_size(import_args):
+    checkpoint, args = import_args
+    assert bulk_reservations.main(args + ["--chunk-size", "100"]) == 0
+    assert json.loads(checkpoint.read_text())["chunk_size"] == 100
+    assert bulk_reservations.main(args + ["--chunk-size", "100"]) == 0
+
+
+def test_resume_with_another_chunk_size_is_rejected(import_args):
+    checkpoint, args = import_args
+    checkpoint.write_text(json.dumps({"chunk_size": 100, "reservations.ndjson": [0, 1]}))
+    with pytest.raises(SystemExit):
+        bulk_reservations.main(args + ["--chunk-size", "500"])
+    assert json.loads(checkpoint.read_text())["chunk_size"] == 100
+
+    assert bulk_reservations.main(args + ["--chunk-size", "500", "--fresh"]) == 0
+    assert json.loads(checkpoint.read_text())["chunk_size"] == 500
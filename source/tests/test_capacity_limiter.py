@@ -0,0 +1,279 @@
+"""
+filename: test_capacity_limiter.py
+author: Jack Gularte
+date: Oct. 19 2026
+
+Tests of the client side capacity limiter, the throttle retries of dynamodb_client._call and the mapping of an
+exhausted table to a 429 response. Time is a fake clock, nothing sleeps.
+"""
+# standard imports
+import json
+
+# external installed imports
+import pytest
+from botocore.exceptions import ClientError
+
+# internal imports
+from chalicelib import reservations_service as rs
+from chalicelib.aws_clients import capacity_limiter
+from chalicelib.aws_clients import dynamodb_client as dc
+from chalicelib.aws_clients.capacity_limiter import CapacityLimiter, ThroughputExceeded, TokenBucket
+from tests.conftest import RESERVATIONS_TABLE
+
+TABLE = "reservations-test"
+INDEX = "user-index"
+
+
+class FakeClock:
+    """
+    Stands in for the time module: sleeping advances the monotonic clock.
+    """
+
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = []
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(capacity_limiter, "time", fake)
+    monkeypatch.setattr(dc, "time", fake)
+    return fake
+
+
+@pytest.fixture
+def limiter(clock, monkeypatch):
+    result = CapacityLimiter()
+    result.configure(TABLE, {"read": 10, "write": 5, "indexes": {INDEX: {"read": 4, "write": 2}}})
+    monkeypatch.setattr(dc, "limiter", result)
+    return result
+
+
+def tokens(limiter, index_name, kind) -> float:
+    bucket = limiter.buckets[(TABLE, index_name, kind)]
+    bucket._refill()
+    return bucket.tokens
+
+
+def throttle_error(code: str = "ProvisionedThroughputExceededException") -> ClientError:
+    return ClientError({"Error": {"Code": code, "Message": "throttled"}}, "Query")
+
+
+def consumed(table_units: float, index_units: float = None) -> dict:
+    entry = {"TableName": TABLE, "CapacityUnits": table_units, "Table": {"CapacityUnits": table_units}}
+    if index_units is not None:
+        entry["GlobalSecondaryIndexes"] = {INDEX: {"CapacityUnits": index_units}}
+    return entry
+
+
+"""
+TOKEN BUCKET
+"""
+
+
+def test_bucket_starts_full_and_refills_at_its_rate(clock):
+    bucket = TokenBucket(rate=10, burst_seconds=5)
+    assert bucket.acquire(50) == 0.0
+    clock.now += 0.5
+    assert bucket.acquire(5) == 0.0
+    clock.now += 60
+    bucket._refill()
+    assert bucket.tokens == 50
+
+
+def test_bucket_waits_for_the_refill(clock):
+    bucket = TokenBucket(rate=10, burst_seconds=1)
+    bucket.acquire(10)
+    assert bucket.acquire(5, max_wait=1.0) == pytest.approx(0.5)
+    assert clock.slept == [pytest.approx(0.5)]
+
+
+def test_bucket_rejects_a_wait_over_max_wait_without_taking_tokens(clock):
+    bucket = TokenBucket(rate=10, burst_seconds=1)
+    bucket.acquire(10)
+    assert bucket.acquire(10, max_wait=0.5) == pytest.approx(-1.0)
+    assert bucket.tokens == 0
+    assert clock.slept == []
+
+
+def test_bucket_settle_and_drain(clock):
+    bucket = TokenBucket(rate=10, burst_seconds=1)
+    bucket.acquire(2)
+    bucket.settle(-2)
+    assert bucket.tokens == 10
+    bucket.settle(15)
+    assert bucket.tokens == -5
+    bucket.settle(-100)
+    assert bucket.tokens == 10
+    bucket.drain()
+    assert bucket.tokens == 0
+
+
+"""
+CAPACITY LIMITER
+"""
+
+
+def test_unconfigured_tables_are_not_limited(limiter):
+    for _ in range(100):
+        limiter.acquire("another-table", "write", units=1000, max_wait=0)
+    assert limiter.throttled("another-table", "read") == 1.0
+
+
+def test_write_takes_from_the_table_and_its_indexes(limiter):
+    limiter.acquire(TABLE, "write", units=2)
+    assert tokens(limiter, None, "write") == 23
+    assert tokens(limiter, INDEX, "write") == 8
+    assert tokens(limiter, None, "read") == 50
+
+
+def test_index_read_only_takes_from_the_index(limiter):
+    limiter.acquire(TABLE, "read", units=3, index_name=INDEX)
+    assert tokens(limiter, INDEX, "read") == 17
+    assert tokens(limiter, None, "read") == 50
+
+
+def test_rejected_acquire_hands_back_the_other_buckets(limiter):
+    limiter.buckets[(TABLE, INDEX, "write")].drain()
+    with pytest.raises(ThroughputExceeded) as raised:
+        limiter.acquire(TABLE, "write", units=2, max_wait=0.1)
+    assert (raised.value.table_name, raised.value.index_name) == (TABLE, INDEX)
+    assert raised.value.retry_after == pytest.approx(1.0)
+    assert tokens(limiter, None, "write") == 25
+
+
+def test_record_settles_the_consumed_capacity(limiter):
+    limiter.acquire(TABLE, "read", units=1)
+    limiter.record(TABLE, "read", 1, consumed(12.5))
+    assert tokens(limiter, None, "read") == 37.5
+
+    limiter.acquire(TABLE, "write", units=1)
+    limiter.record(TABLE, "write", 1, consumed(1, index_units=3))
+    assert tokens(limiter, None, "write") == 24
+    assert tokens(limiter, INDEX, "write") == 7
+
+
+def test_record_makes_the_estimate_of_the_next_call(limiter):
+    assert limiter.estimate(TABLE, "read") == 1.0
+    limiter.record(TABLE, "read", 1, consumed(12.5))
+    limiter.record(TABLE, "read", 1, consumed(0, index_units=6), index_name=INDEX)
+    assert limiter.estimate(TABLE, "read") == 12.5
+    assert limiter.estimate(TABLE, "read", index_name=INDEX) == 6
+    # batch writes consume units for many items and leave the estimate alone
+    limiter.record(TABLE, "write", 25, [consumed(25)])
+    assert limiter.estimate(TABLE, "write") == 1.0
+
+
+def test_throttled_drains_and_returns_the_retry_after(limiter):
+    assert limiter.throttled(TABLE, "write") == pytest.approx(1.0)
+    assert tokens(limiter, None, "write") == 0
+    assert tokens(limiter, INDEX, "write") == 0
+    limiter.configure("slow-table", {"read": 0.5})
+    assert limiter.throttled("slow-table", "read") == pytest.approx(2.0)
+
+
+"""
+THROTTLE RETRIES
+"""
+
+
+class Request:
+    """
+    A boto3 table call that is throttled a number of times before it answers.
+    """
+
+    def __init__(self, throttles: int, response: dict = None, error: str = "ProvisionedThroughputExceededException"):
+        self.throttles = throttles
+        self.response = response or {}
+        self.error = error
+        self.calls = []
+
+    def __call__(self, **kwargs) -> dict:
+        self.calls.append(kwargs)
+        if len(self.calls) <= self.throttles:
+            raise throttle_error(self.error)
+        return self.response
+
+
+def test_throttled_call_is_retried(limiter, clock):
+    request = Request(throttles=2, response={"Items": []})
+    assert dc._call(TABLE, "read", request, Limit=10) == {"Items": []}
+    assert len(request.calls) == 3
+    assert all(call == {"ReturnConsumedCapacity": "INDEXES", "Limit": 10} for call in request.calls)
+
+
+def test_every_attempt_takes_capacity(limiter, clock, monkeypatch):
+    monkeypatch.setattr(dc, "backoff_delay", lambda attempt: 0.0)
+    # the throttle drains the bucket, so the retry waits for the refill of its unit before it is sent
+    dc._call(TABLE, "read", Request(throttles=1))
+    assert clock.slept == [0.0, pytest.approx(0.1)]
+
+
+def test_retry_is_rejected_when_the_table_has_no_capacity(limiter, clock):
+    # the table is so slow the refill after a throttle takes longer than acquire waits
+    limiter.configure("slow-table", {"read": 0.5})
+    with pytest.raises(ThroughputExceeded):
+        dc._call("slow-table", "read", Request(throttles=1))
+
+
+def test_call_gives_up_after_the_max_retries(limiter, clock, monkeypatch):
+    monkeypatch.setattr(dc, "MAX_THROTTLE_RETRIES", 2)
+    request = Request(throttles=10, error="ThrottlingException")
+    with pytest.raises(ThroughputExceeded):
+        dc._call("another-table", "read", request)
+    assert len(request.calls) == 3
+
+
+def test_other_errors_are_not_retried(limiter, clock):
+    request = Request(throttles=10, error="ValidationException")
+    with pytest.raises(ClientError):
+        dc._call(TABLE, "read", request)
+    assert len(request.calls) == 1
+    assert tokens(limiter, None, "read") == 49
+
+
+def test_reads_are_estimated_from_the_last_page(limiter, clock):
+    dc._call(TABLE, "read", Request(throttles=0, response={"ConsumedCapacity": consumed(20)}))
+    assert tokens(limiter, None, "read") == 30
+    dc._call(TABLE, "read", Request(throttles=0, response={"ConsumedCapacity": consumed(20)}))
+    assert tokens(limiter, None, "read") == 10
+    # the next page is estimated at 20 units and waits for the refill before it is sent
+    dc._call(TABLE, "read", Request(throttles=0, response={"ConsumedCapacity": consumed(0.5)}))
+    assert clock.slept == [pytest.approx(1.0)]
+    assert tokens(limiter, None, "read") == pytest.approx(19.5)
+
+
+"""
+429 RESPONSES
+"""
+
+
+@pytest.mark.parametrize("retry_after, header", [(0.2, "1"), (1.0, "1"), (2.3, "3")])
+def test_throughput_exceeded_becomes_a_429(retry_after, header):
+    @rs.handle_throttling
+    def handler():
+        raise ThroughputExceeded(TABLE, retry_after=retry_after)
+
+    response = handler()
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == header
+
+
+def test_throttled_service_call_is_a_429(memory_backend, monkeypatch):
+    def put_item(**kwargs):
+        raise ThroughputExceeded(RESERVATIONS_TABLE, retry_after=1.5)
+
+    monkeypatch.setattr(memory_backend, "put_item", put_item)
+    reservation = {"user_guid": "user-1", "epoch_start": 1719964800, "epoch_end": 1720137600,
+                   "reservation_type": "closed"}
+    response = rs.create_reservation(RESERVATIONS_TABLE, json.loads(json.dumps(reservation)))
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "2"
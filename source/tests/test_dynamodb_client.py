@@ -0,0 +1,59 @@
+"""
+filename: test_dynamodb_client.py
+author: Jack Gularte
+date: Oct. 19 2026
+
+Tests of the error handling of the dynamodb_client write functions, against a fake boto3 table.
+"""
+# standard imports
+import logging
+
+# external installed imports
+import pytest
+from boto3.dynamodb import conditions
+from botocore.exceptions import ClientError
+
+# internal imports
+from chalicelib.aws_clients import dynamodb_client as dc
+from chalicelib.aws_clients.capacity_limiter import CapacityLimiter
+
+TABLE = "reservations-test"
+
+
+class FakeTable:
+    """
+    A boto3 table whose put_item fails with the given error code.
+    """
+
+    def __init__(self, error_code: str):
+        self.error_code = error_code
+
+    def put_item(self, **kwargs) -> dict:
+        raise ClientError({"Error": {"Code": self.error_code, "Message": self.error_code}}, "PutItem")
+
+
+@pytest.fixture
+def table(monkeypatch):
+    def make(error_code: str) -> FakeTable:
+        fake = FakeTable(error_code)
+        monkeypatch.setattr(dc, "_table", lambda table_name: fake)
+        return fake
+
+    monkeypatch.setattr(dc, "limiter", CapacityLimiter())
+    return make
+
+
+def test_failed_condition_is_not_logged_as_an_error(table, caplog):
+    table("ConditionalCheckFailedException")
+    with caplog.at_level(logging.DEBUG, logger=dc.logger.name):
+        with pytest.raises(ValueError, match="^ConditionalCheckFailed$"):
+            dc.write_conditional(TABLE, {"reservation_guid": "r-1"}, conditions.Attr("reservation_guid").not_exists())
+    assert [record.levelno for record in caplog.records] == [logging.DEBUG]
+
+
+def test_other_write_errors_are_logged_as_errors(table, caplog):
+    table("ValidationException")
+    with caplog.at_level(logging.DEBUG, logger=dc.logger.name):
+        with pytest.raises(ValueError):
+            dc.write_conditional(TABLE, {"reservation_guid": "r-1"}, conditions.Attr("reservation_guid").not_exists())
+    assert [record.levelno for record in caplog.records] == [logging.ERROR]
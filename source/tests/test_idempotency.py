@@ -0,0 +1,196 @@
+"""
+filename: test_idempotency.py
+author: Jack Gularte
+date: Oct. 19 2026
+
+Tests of the Idempotency-Key records: replays, concurrent retries, takeover of stale records and releasing the key when
+the request fails.
+"""
+# standard imports
+import time
+
+# external installed imports
+import pytest
+from chalice import Response
+
+# internal imports
+from chalicelib import idempotency_service as idempotency
+
+IDEMPOTENCY_TABLE = "idempotency-test"
+SCOPE = "POST /reservations user-1"
+KEY = "key-1"
+BODY = {"epoch_start": 1719964800}
+
+
+@pytest.fixture
+def backend(memory_backend):
+    idempotency.register_tables(backend=memory_backend, table_name=IDEMPOTENCY_TABLE)
+    return memory_backend
+
+
+class Handler:
+    """
+    A route handler that counts its calls.
+    """
+
+    def __init__(self, status_code: int = 200, body: dict = None, raises: Exception = None):
+        self.calls = 0
+        self.status_code = status_code
+        self.body = body if body is not None else {"data": {"reservation_guid": "r-1"}}
+        self.raises = raises
+
+    def __call__(self) -> Response:
+        self.calls += 1
+        if self.raises is not None:
+            raise self.raises
+        return Response(status_code=self.status_code, body=self.body)
+
+
+def run(handler, key: str = KEY, body: dict = None) -> Response:
+    return idempotency.run_idempotent(
+        table_name=IDEMPOTENCY_TABLE,
+        idempotency_key=key,
+        scope=SCOPE,
+        request_body=BODY if body is None else body,
+        handler=handler
+    )
+
+
+def record(backend) -> dict or None:
+    return backend.get_item(table_name=IDEMPOTENCY_TABLE, key={idempotency.IDEMPOTENCY_PRIMARY: f"{SCOPE}#{KEY}"})
+
+
+def stale_record(**overrides) -> dict:
+    now = int(time.time())
+    return dict(
+        {
+            idempotency.IDEMPOTENCY_PRIMARY: f"{SCOPE}#{KEY}",
+            "status": idempotency.STATUS_IN_PROGRESS,
+            "fingerprint": idempotency.fingerprint(BODY),
+            "locked_until": now - 1,
+            idempotency.IDEMPOTENCY_TTL: now + 3600
+        },
+        **overrides
+    )
+
+
+"""
+REPLAY
+"""
+
+
+def test_retry_replays_the_stored_response(backend):
+    handler = Handler(status_code=201)
+    first = run(handler)
+    replay = run(handler)
+    assert handler.calls == 1
+    assert (replay.status_code, replay.body) == (first.status_code, first.body)
+    assert replay.headers["Idempotent-Replayed"] == "true"
+    assert record(backend)["status"] == idempotency.STATUS_COMPLETED
+
+
+def test_retry_with_another_body_is_rejected(backend):
+    handler = Handler()
+    run(handler)
+    assert run(handler, body={"epoch_start": 0}).status_code == 422
+    assert handler.calls == 1
+
+
+def test_client_errors_are_replayed(backend):
+    handler = Handler(status_code=400, body={"error": "bad request"})
+    run(handler)
+    assert run(handler).status_code == 400
+    assert handler.calls == 1
+
+
+@pytest.mark.parametrize("key", ["", "x" * (idempotency.MAX_KEY_LENGTH + 1), "line\nbreak"])
+def test_invalid_key_is_rejected(backend, key):
+    handler = Handler()
+    assert run(handler, key=key).status_code == 400
+    assert handler.calls == 0
+
+
+"""
+CONCURRENT REQUESTS
+"""
+
+
+def test_retry_while_the_first_request_runs_gets_409(backend):
+    retries = []
+
+    def first_request() -> Response:
+        # the retry arrives while the first request still holds the key
+        retries.append(run(Handler()))
+        return Response(status_code=200, body={"data": "first"})
+
+    assert run(first_request).body == {"data": "first"}
+    assert retries[0].status_code == 409
+    assert retries[0].headers["Retry-After"] == "1"
+    assert run(Handler()).body == {"data": "first"}
+
+
+def test_stale_in_progress_record_is_taken_over(backend):
+    backend.put_item(table_name=IDEMPOTENCY_TABLE, item=stale_record())
+    handler = Handler()
+    assert run(handler).status_code == 200
+    assert handler.calls == 1
+    assert record(backend)["status"] == idempotency.STATUS_COMPLETED
+
+
+def test_expired_record_is_taken_over(backend):
+    now = int(time.time())
+    expired = stale_record(status=idempotency.STATUS_COMPLETED, response_status=200, response_body="{}",
+                           fingerprint="another body", **{idempotency.IDEMPOTENCY_TTL: now - 1})
+    backend.put_item(table_name=IDEMPOTENCY_TABLE, item=expired)
+    handler = Handler()
+    assert run(handler).status_code == 200
+    assert handler.calls == 1
+
+
+def test_only_one_retry_takes_over_a_stale_record(backend):
+    stale = stale_record()
+    backend.put_item(table_name=IDEMPOTENCY_TABLE, item=stale)
+    winner = dict(stale, locked_until=stale["locked_until"] + 120)
+    loser = dict(stale, locked_until=stale["locked_until"] + 121)
+    assert idempotency._take_over(backend, IDEMPOTENCY_TABLE, stale, winner)
+    assert not idempotency._take_over(backend, IDEMPOTENCY_TABLE, stale, loser)
+    assert record(backend)["locked_until"] == winner["locked_until"]
+
+
+"""
+FAILURES
+"""
+
+
+@pytest.mark.parametrize("status_code", [500, 503, 429])
+def test_server_errors_release_the_key(backend, status_code):
+    assert run(Handler(status_code=status_code)).status_code == status_code
+    assert record(backend) is None
+    handler = Handler()
+    assert run(handler).status_code == 200
+    assert handler.calls == 1
+
+
+def test_handler_exception_releases_the_key(backend):
+    with pytest.raises(RuntimeError):
+        run(Handler(raises=RuntimeError("handler failed")))
+    assert record(backend) is None
+
+
+def test_failed_release_keeps_the_handler_exception(backend, monkeypatch):
+    def delete_item(**kwargs):
+        raise ValueError("delete failed")
+
+    monkeypatch.setattr(backend, "delete_item", delete_item)
+    with pytest.raises(RuntimeError, match="handler failed"):
+        run(Handler(raises=RuntimeError("handler failed")))
+    assert record(backend)["status"] == idempotency.STATUS_IN_PROGRESS
+    assert run(Handler(status_code=500)).status_code == 409
+
+
+def test_failed_release_keeps_the_server_error(backend, monkeypatch):
+    def delete_item(**kwargs):
+        raise ValueError("delete failed")
+
+    monkeypatch.setattr(backend, "delete_item", delete_item)
+    assert run(Handler(status_code=503)).status_code == 503
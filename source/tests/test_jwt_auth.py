@@ -0,0 +1,153 @@
+"""
+filename: test_jwt_auth.py
+author: Jack Gularte
+date: Oct. 19 2026
+
+Unit tests of the Cognito token verifier, its JWKS cache and its claims cache.
+"""
+# standard imports
+import time
+
+# external installed imports
+import pytest
+
+# internal imports
+from chalicelib import jwt_auth
+from tests.conftest import APP_CLIENT_ID, KID, REGION, USER_POOL_ID, id_token_claims, make_rsa_key, sign_token
+
+
+def verify(token: str) -> dict:
+    return jwt_auth.verify_token(token, REGION, USER_POOL_ID, APP_CLIENT_ID)
+
+
+"""
+VERIFICATION
+"""
+
+
+def test_valid_id_token(signing_key, jwks):
+    assert verify(sign_token(signing_key, id_token_claims()))["sub"] == "user-1"
+
+
+def test_valid_access_token(signing_key, jwks):
+    claims = id_token_claims(token_use="access", client_id=APP_CLIENT_ID)
+    del claims["aud"]
+    assert verify(sign_token(signing_key, claims))["sub"] == "user-1"
+
+
+@pytest.mark.parametrize("overrides, error", [
+    ({"exp": int(time.time()) - jwt_auth.LEEWAY_SECONDS - 1}, "expired"),
+    ({"exp": "tomorrow"}, "expired"),
+    ({"aud": "another-client"}, "app client"),
+    ({"iss": "https://cognito-idp.us-west-2.amazonaws.com/another-pool"}, "user pool"),
+    ({"token_use": "refresh"}, "token_use"),
+    ({"sub": ""}, "subject")
+])
+def test_rejected_claims(signing_key, jwks, overrides, error):
+    with pytest.raises(jwt_auth.InvalidToken, match=error):
+        verify(sign_token(signing_key, id_token_claims(**overrides)))
+
+
+def test_tampered_claims(signing_key, jwks):
+    header, _, signature = sign_token(signing_key, id_token_claims()).split(".")
+    _, forged_claims, _ = sign_token(signing_key, id_token_claims(sub="admin")).split(".")
+    with pytest.raises(jwt_auth.InvalidToken, match="signature"):
+        verify(f"{header}.{forged_claims}.{signature}")
+
+
+def test_token_signed_with_another_key(jwks):
+    with pytest.raises(jwt_auth.InvalidToken, match="signature"):
+        verify(sign_token(make_rsa_key(seed=2), id_token_claims()))
+
+
+@pytest.mark.parametrize("token", ["", "a.b", "not.a.jwt", "e30.e30.e30"])
+def test_malformed_tokens(jwks, token):
+    with pytest.raises(jwt_auth.InvalidToken):
+        verify(token)
+
+
+def test_unsupported_algorithm(signing_key, jwks):
+    with pytest.raises(jwt_auth.InvalidToken, match="algorithm"):
+        verify(sign_token(signing_key, id_token_claims(), header={"alg": "none"}))
+    assert jwks == []
+
+
+"""
+JWKS CACHE
+"""
+
+
+def test_jwks_is_fetched_once(signing_key, jwks):
+    verify(sign_token(signing_key, id_token_claims(sub="a")))
+    verify(sign_token(signing_key, id_token_claims(sub="b")))
+    assert len(jwks) == 1
+
+
+def test_unknown_kid_refreshes_at_most_once_per_interval(signing_key, jwks):
+    verify(sign_token(signing_key, id_token_claims()))
+    for _ in range(3):
+        with pytest.raises(jwt_auth.InvalidToken, match="Unknown signing key"):
+            verify(sign_token(signing_key, id_token_claims(sub="forged"), header={"kid": "forged"}))
+    assert len(jwks) == 1
+
+
+def test_rotated_key_is_fetched_after_the_interval(signing_key, jwks, monkeypatch):
+    verify(sign_token(signing_key, id_token_claims()))
+    rotated = make_rsa_key(seed=3)
+    jwks.keys = {KID: (signing_key["n"], signing_key["e"]), "rotated": (rotated["n"], rotated["e"])}
+    monkeypatch.setattr(jwt_auth, "_jwks_fetched_at", time.monotonic() - jwt_auth.MIN_REFRESH_SECONDS)
+    assert verify(sign_token(rotated, id_token_claims(sub="rotated"), header={"kid": "rotated"}))["sub"] == "rotated"
+    assert len(jwks) == 2
+
+
+def test_failed_fetch_is_retried_by_the_next_token(signing_key, jwks):
+    token = sign_token(signing_key, id_token_claims())
+    jwks.fail = True
+    with pytest.raises(jwt_auth.InvalidToken, match="could not be fetched"):
+        verify(token)
+    jwks.fail = False
+    assert verify(token)["sub"] == "user-1"
+    assert len(jwks) == 2
+
+
+def test_failed_prime_is_retried_by_the_first_token(signing_key, jwks):
+    jwks.fail = True
+    with pytest.raises(jwt_auth.InvalidToken):
+        jwt_auth.prime_jwks(REGION, USER_POOL_ID)
+    jwks.fail = False
+    assert verify(sign_token(signing_key, id_token_claims()))["sub"] == "user-1"
+
+
+"""
+CLAIMS CACHE
+"""
+
+
+def test_claims_are_cached_per_token(signing_key, jwks, monkeypatch):
+    token = sign_token(signing_key, id_token_claims())
+    verify(token)
+    hits = jwt_auth.cache_stats["hits"]
+
+    def fail(*args):
+        raise AssertionError("a cached token was verified again")
+
+    monkeypatch.setattr(jwt_auth, "_verify", fail)
+    assert verify(token)["sub"] == "user-1"
+    assert jwt_auth.cache_stats["hits"] == hits + 1
+
+
+def test_cached_claims_are_not_served_after_expiry(signing_key, jwks, monkeypatch):
+    token = sign_token(signing_key, id_token_claims(exp=int(time.time()) + 60))
+    verify(token)
+    later = time.time() + 60 + jwt_auth.LEEWAY_SECONDS
+    monkeypatch.setattr(jwt_auth.time, "time", lambda: later)
+    with pytest.raises(jwt_auth.InvalidToken, match="expired"):
+        verify(token)
+
+
+def test_claims_cache_is_bounded(signing_key, jwks, monkeypatch):
+    monkeypatch.setattr(jwt_auth, "MAX_CACHED_TOKENS", 2)
+    tokens = [sign_token(signing_key, id_token_claims(sub=f"user-{index}")) for index in range(3)]
+    for token in tokens:
+        verify(token)
+    assert list(jwt_auth._claims_cache) == tokens[1:]
@@ -0,0 +1,364 @@
+"""
+filename: test_memory_backend.py
+author: Jack Gularte
+date: Oct. 19 2026
+
+Tests of the in-memory storage engine against the DynamoDB semantics the services rely on. Every test runs on the
+MemoryBackend and on the DynamoDBBackend over a fake dynamodb_client that answers in the DynamoDB response shapes
+(Item, Items pages with LastEvaluatedKey, Attributes, ConditionalCheckFailed), so both backends have to return the same.
+"""
+# standard imports
+import zlib
+
+# external installed imports
+import pytest
+
+# internal imports
+from chalicelib.storage import dynamodb_backend
+from chalicelib.storage.base import ConditionalCheckFailed
+from chalicelib.storage.dynamodb_backend import DynamoDBBackend
+from chalicelib.storage.memory_backend import MemoryBackend
+
+TABLE = "items-test"
+HASH_ONLY = "hash-only-test"
+USER_INDEX = "user-index"
+TYPE_INDEX = "type-index"
+PAGE_SIZE = 2
+
+
+class FakeDynamoDBClient:
+    """
+    Stands in for the dynamodb_client module. Stores the items in a MemoryBackend, evaluates the boto3 conditions the
+    DynamoDBBackend builds and pages every read PAGE_SIZE items at a time.
+    """
+
+    def __init__(self):
+        self.store = MemoryBackend()
+        self.query_calls = []
+
+    def write(self, table_name, item, return_values="NONE"):
+        self.store.put_item(table_name, item)
+        return {}
+
+    def write_conditional(self, table_name, item, condition_expr, return_values="NONE"):
+        expression = condition_expr.get_expression()
+        try:
+            if expression["operator"] == "attribute_not_exists":
+                self.store.put_item_if_absent(table_name, item)
+            else:
+                self.store.put_item_if_unchanged(table_name, item, expected=_equals(condition_expr))
+        except ConditionalCheckFailed:
+            raise ValueError("ConditionalCheckFailed")
+        return {}
+
+    def get_item(self, table_name, key):
+        item = self.store.get_item(table_name, key)
+        return {"Item": item} if item is not None else {}
+
+    def query(self, table_name, query_params):
+        self.query_calls.append(dict(query_params))
+        key_name, key_value, sort_low, sort_high = _key_condition(query_params["KeyConditionExpression"])
+        items = self.store.query(
+            table_name, key_name, key_value,
+            index_name=query_params.get("IndexName"),
+            sort_low=sort_low,
+            sort_high=sort_high
+        )
+        return _page(self.store, table_name, items, query_params.get("ExclusiveStartKey"), query_params.get("Limit"))
+
+    def scan_table(self, table_name):
+        return {"Items": self.store.scan(table_name)}
+
+    def scan_segment(self, table_name, segment, total_segments, start_key=None):
+        items = self.store.scan(table_name, segment=segment, total_segments=total_segments)
+        return _page(self.store, table_name, items, start_key)
+
+    def batch_write_items(self, table_name, list_of_items):
+        return {"written": self.store.batch_put(table_name, list_of_items)}
+
+    def delete_item(self, table_name, item, return_values="NONE"):
+        old = self.store.delete_item(table_name, item)
+        return {"Attributes": old} if old is not None and return_values == "ALL_OLD" else {}
+
+
+def _equals(condition) -> dict:
+    # attribute_exists(hash) AND attr = value AND ... -> {attr: value}
+    expression = condition.get_expression()
+    if expression["operator"] == "AND":
+        left, right = expression["values"]
+        return dict(_equals(left), **_equals(right))
+    if expression["operator"] == "=":
+        attribute, value = expression["values"]
+        return {attribute.name: value}
+    return {}
+
+
+def _key_condition(condition) -> tuple:
+    # hash = value [AND sort BETWEEN low AND high | sort >= low | sort <= high]
+    expression = condition.get_expression()
+    sort_low = sort_high = None
+    if expression["operator"] == "AND":
+        condition, sort_condition = expression["values"]
+        sort_expression = sort_condition.get_expression()
+        values = sort_expression["values"]
+        if sort_expression["operator"] == "BETWEEN":
+            sort_low, sort_high = values[1], values[2]
+        elif sort_expression["operator"] == ">=":
+            sort_low = values[1]
+        else:
+            sort_high = values[1]
+        expression = condition.get_expression()
+    key, value = expression["values"]
+    return key.name, value, sort_low, sort_high
+
+
+def _page(store, table_name, items, start_key, limit=None) -> dict:
+    keys = [store.key_of(table_name, item) for item in items]
+    start = keys.index(start_key) + 1 if start_key else 0
+    size = min(PAGE_SIZE, limit) if limit else PAGE_SIZE
+    response = {"Items": items[start:start + size]}
+    if start + size < len(items):
+        response["LastEvaluatedKey"] = keys[start + size - 1]
+    return response
+
+
+@pytest.fixture(params=["memory", "dynamodb"])
+def backend(request, monkeypatch):
+    if request.param == "memory":
+        result = MemoryBackend()
+        backends = [result]
+    else:
+        fake = FakeDynamoDBClient()
+        monkeypatch.setattr(dynamodb_backend, "dc", fake)
+        result = DynamoDBBackend()
+        backends = [result, fake.store]
+    for each in backends:
+        each.register_table(
+            TABLE, hash_key="pk", range_key="sk",
+            indexes={
+                USER_INDEX: {"hash_key": "user", "range_key": "start"},
+                TYPE_INDEX: {"hash_key": "kind", "range_key": None}
+            }
+        )
+        each.register_table(HASH_ONLY, hash_key="pk")
+    return result
+
+
+def item(pk: str, sk: int, **attributes) -> dict:
+    return dict(attributes, pk=pk, sk=sk)
+
+
+def sort_keys(items: list) -> list:
+    return [(each["pk"], each["sk"]) for each in items]
+
+
+"""
+PRIMARY KEY
+"""
+
+
+def test_put_replaces_the_whole_item(backend):
+    backend.put_item(TABLE, item("a", 1, color="red", size=3))
+    backend.put_item(TABLE, item("a", 1, color="blue"))
+    assert backend.get_item(TABLE, {"pk": "a", "sk": 1}) == item("a", 1, color="blue")
+
+
+def test_get_of_a_missing_item_is_none(backend):
+    backend.put_item(TABLE, item("a", 1))
+    assert backend.get_item(TABLE, {"pk": "a", "sk": 2}) is None
+    assert backend.get_item(TABLE, {"pk": "b", "sk": 1}) is None
+
+
+def test_hash_only_table(backend):
+    backend.put_item(HASH_ONLY, {"pk": "a", "value": 1})
+    backend.put_item(HASH_ONLY, {"pk": "a", "value": 2})
+    assert backend.get_item(HASH_ONLY, {"pk": "a"}) == {"pk": "a", "value": 2}
+    assert backend.query(HASH_ONLY, key_name="pk", key_value="a") == [{"pk": "a", "value": 2}]
+
+
+def test_delete_returns_the_old_item(backend):
+    backend.put_item(TABLE, item("a", 1, color="red"))
+    assert backend.delete_item(TABLE, {"pk": "a", "sk": 1}) == item("a", 1, color="red")
+    assert backend.get_item(TABLE, {"pk": "a", "sk": 1}) is None
+    assert backend.delete_item(TABLE, {"pk": "a", "sk": 1}) is None
+    assert backend.query(TABLE, key_name="pk", key_value="a") == []
+
+
+def test_batch_put_returns_the_amount_written(backend):
+    assert backend.batch_put(TABLE, [item("a", sk) for sk in range(5)]) == 5
+    assert len(backend.query(TABLE, key_name="pk", key_value="a")) == 5
+
+
+def test_unregistered_table_is_rejected():
+    with pytest.raises(ValueError):
+        MemoryBackend().put_item("unknown", {"pk": "a"})
+
+
+def test_items_are_copies():
+    backend = MemoryBackend()
+    backend.register_table(TABLE, hash_key="pk", range_key="sk")
+    stored = item("a", 1, tags=["x"])
+    backend.put_item(TABLE, stored)
+    stored["tags"].append("changed by the caller")
+    backend.get_item(TABLE, {"pk": "a", "sk": 1})["tags"].append("changed by a reader")
+    backend.query(TABLE, key_name="pk", key_value="a")[0]["tags"].append("changed by a query")
+    assert backend.get_item(TABLE, {"pk": "a", "sk": 1})["tags"] == ["x"]
+
+
+"""
+QUERIES
+"""
+
+
+def test_query_returns_the_partition_in_sort_key_order(backend):
+    for sk in [5, 1, 4, 2, 3]:
+        backend.put_item(TABLE, item("a", sk))
+    backend.put_item(TABLE, item("b", 0))
+    assert sort_keys(backend.query(TABLE, key_name="pk", key_value="a")) == [("a", sk) for sk in range(1, 6)]
+    assert backend.query(TABLE, key_name="pk", key_value="missing") == []
+
+
+@pytest.mark.parametrize("sort_low, sort_high, expected", [
+    (2, None, [2, 3, 4, 5]),
+    (None, 3, [1, 2, 3]),
+    (2, 4, [2, 3, 4]),
+    (3, 3, [3]),
+    (6, None, []),
+    (None, 0, []),
+])
+def test_query_sort_key_range_is_inclusive(backend, sort_low, sort_high, expected):
+    for sk in [5, 1, 4, 2, 3]:
+        backend.put_item(TABLE, item("a", sk))
+    result = backend.query(TABLE, key_name="pk", key_value="a", sort_low=sort_low, sort_high=sort_high)
+    assert [each["sk"] for each in result] == expected
+
+
+def test_query_limit_takes_the_first_items(backend):
+    for sk in range(1, 6):
+        backend.put_item(TABLE, item("a", sk))
+    assert [each["sk"] for each in backend.query(TABLE, key_name="pk", key_value="a", limit=3)] == [1, 2, 3]
+    result = backend.query(TABLE, key_name="pk", key_value="a", sort_low=2, limit=2)
+    assert [each["sk"] for each in result] == [2, 3]
+
+
+def test_query_on_a_wrong_key_name_is_rejected():
+    backend = MemoryBackend()
+    backend.register_table(TABLE, hash_key="pk", range_key="sk", indexes={USER_INDEX: {"hash_key": "user"}})
+    with pytest.raises(ValueError):
+        backend.query(TABLE, key_name="user", key_value="u1")
+    with pytest.raises(ValueError):
+        backend.query(TABLE, key_name="pk", key_value="u1", index_name=USER_INDEX)
+
+
+def test_range_on_a_table_without_sort_key_is_rejected(backend):
+    with pytest.raises(ValueError):
+        backend.query(HASH_ONLY, key_name="pk", key_value="a", sort_low=1)
+    with pytest.raises(ValueError):
+        backend.query(TABLE, key_name="kind", key_value="x", index_name=TYPE_INDEX, sort_high=1)
+
+
+"""
+SECONDARY INDEXES
+"""
+
+
+def test_index_query_orders_on_the_index_sort_key(backend):
+    backend.put_item(TABLE, item("a", 1, user="u1", start=30))
+    backend.put_item(TABLE, item("b", 1, user="u1", start=10))
+    backend.put_item(TABLE, item("c", 1, user="u1", start=20))
+    backend.put_item(TABLE, item("d", 1, user="u2", start=5))
+    result = backend.query(TABLE, key_name="user", key_value="u1", index_name=USER_INDEX)
+    assert sort_keys(result) == [("b", 1), ("c", 1), ("a", 1)]
+    result = backend.query(TABLE, key_name="user", key_value="u1", index_name=USER_INDEX, sort_low=15, sort_high=30)
+    assert sort_keys(result) == [("c", 1), ("a", 1)]
+
+
+def test_items_without_the_index_keys_are_left_out(backend):
+    backend.put_item(TABLE, item("a", 1, user="u1", start=10, kind="x"))
+    backend.put_item(TABLE, item("b", 1, user="u1", kind="x"))
+    backend.put_item(TABLE, item("c", 1, start=10))
+    assert sort_keys(backend.query(TABLE, key_name="user", key_value="u1", index_name=USER_INDEX)) == [("a", 1)]
+    result = backend.query(TABLE, key_name="kind", key_value="x", index_name=TYPE_INDEX)
+    assert sort_keys(result) == [("a", 1), ("b", 1)]
+
+
+def test_index_follows_replaces_and_deletes(backend):
+    backend.put_item(TABLE, item("a", 1, user="u1", start=10))
+    backend.put_item(TABLE, item("a", 1, user="u2", start=10))
+    assert backend.query(TABLE, key_name="user", key_value="u1", index_name=USER_INDEX) == []
+    assert sort_keys(backend.query(TABLE, key_name="user", key_value="u2", index_name=USER_INDEX)) == [("a", 1)]
+    backend.delete_item(TABLE, {"pk": "a", "sk": 1})
+    assert backend.query(TABLE, key_name="user", key_value="u2", index_name=USER_INDEX) == []
+
+
+"""
+CONDITIONAL WRITES
+"""
+
+
+def test_put_item_if_absent(backend):
+    backend.put_item_if_absent(TABLE, item("a", 1, version=1))
+    with pytest.raises(ConditionalCheckFailed):
+        backend.put_item_if_absent(TABLE, item("a", 1, version=2))
+    assert backend.get_item(TABLE, {"pk": "a", "sk": 1})["version"] == 1
+    # another sort key of the same partition is another item
+    backend.put_item_if_absent(TABLE, item("a", 2, version=1))
+
+
+def test_put_item_if_unchanged(backend):
+    with pytest.raises(ConditionalCheckFailed):
+        backend.put_item_if_unchanged(TABLE, item("a", 1, version=2), expected={"version": 1})
+
+    backend.put_item(TABLE, item("a", 1, version=1, state="open"))
+    with pytest.raises(ConditionalCheckFailed):
+        backend.put_item_if_unchanged(TABLE, item("a", 1, version=2), expected={"version": 1, "state": "closed"})
+    assert backend.get_item(TABLE, {"pk": "a", "sk": 1})["version"] == 1
+
+    backend.put_item_if_unchanged(TABLE, item("a", 1, version=2), expected={"version": 1, "state": "open"})
+    assert backend.get_item(TABLE, {"pk": "a", "sk": 1}) == item("a", 1, version=2)
+
+
+def test_conditional_check_failed_is_a_value_error(backend):
+    backend.put_item(TABLE, item("a", 1))
+    with pytest.raises(ValueError, match="ConditionalCheckFailed"):
+        backend.put_item_if_absent(TABLE, item("a", 1))
+
+
+"""
+SCANS
+"""
+
+
+def test_segments_split_the_table(backend):
+    items = [item(f"p{number}", sk) for number in range(20) for sk in range(2)]
+    backend.batch_put(TABLE, items)
+    segments = [backend.scan(TABLE, segment=segment, total_segments=4) for segment in range(4)]
+
+    scanned = [key for segment in segments for key in sort_keys(segment)]
+    assert len(scanned) == len(set(scanned))
+    assert sorted(scanned) == sorted(sort_keys(backend.scan(TABLE))) == sorted(sort_keys(items))
+    # a partition is never split over segments
+    for number, segment in enumerate(segments):
+        assert all(zlib.crc32(pk.encode()) % 4 == number for pk, _ in sort_keys(segment))
+
+
+"""
+DYNAMODB RESPONSE SHAPES
+"""
+
+
+def test_dynamodb_query_pages_through_the_results(monkeypatch):
+    fake = FakeDynamoDBClient()
+    monkeypatch.setattr(dynamodb_backend, "dc", fake)
+    backend = DynamoDBBackend()
+    for each in (backend, fake.store):
+        each.register_table(TABLE, hash_key="pk", range_key="sk")
+    backend.batch_put(TABLE, [item("a", sk) for sk in range(5)])
+
+    assert [each["sk"] for each in backend.query(TABLE, key_name="pk", key_value="a")] == list(range(5))
+    assert len(fake.query_calls) == 3
+    assert fake.query_calls[1]["ExclusiveStartKey"] == {"pk": "a", "sk": 1}
+
+    fake.query_calls.clear()
+    assert [each["sk"] for each in backend.query(TABLE, key_name="pk", key_value="a", limit=3)] == [0, 1, 2]
+    assert fake.query_calls[0]["Limit"] == 3
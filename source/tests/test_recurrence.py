@@ -0,0 +1,253 @@
+"""
+filename: test_recurrence.py
+author: Jack Gularte
+date: Oct. 19 2026
+
+Unit tests of the recurrence rule engine, run from the source directory with `python -m pytest tests`.
+"""
+# standard imports
+import time
+from datetime import datetime, timezone
+
+# external installed imports
+import pytest
+
+# internal imports
+from chalicelib import recurrence
+from chalicelib.request_validation import PLACEHOLDER_GUID, validate_reservation
+
+DAY = 86400
+
+
+def epoch(year: int, month: int, day: int, hour: int = 0) -> int:
+    return int(datetime(year, month, day, hour, tzinfo=timezone.utc).timestamp())
+
+
+def reservation(start: int, nights: int, rule: str = None) -> dict:
+    item = {
+        "reservation_guid": PLACEHOLDER_GUID,
+        "user_guid": "user",
+        "epoch_start": start,
+        "epoch_end": start + nights * DAY,
+        "reservation_type": "closed"
+    }
+    if rule is not None:
+        item["recurrence"] = rule
+    return item
+
+
+def starts(item: dict, window_start: int, window_end: int) -> list:
+    return [datetime.fromtimestamp(start, tz=timezone.utc).strftime("%Y-%m-%d")
+            for start, _ in recurrence.occurrences(item, window_start, window_end)]
+
+
+"""
+PARSE
+"""
+
+
+def test_parse_rule():
+    rule = recurrence.parse_rule("FREQ=MONTHLY;INTERVAL=2;BYDAY=1SA,-1SU;COUNT=10")
+    assert rule == {
+        "freq": "MONTHLY",
+        "interval": 2,
+        "count": 10,
+        "until": None,
+        "byday": [(1, "SA"), (-1, "SU")],
+        "bymonthday": []
+    }
+
+
+def test_parse_rule_until_date_includes_the_whole_day():
+    rule = recurrence.parse_rule("FREQ=DAILY;UNTIL=20260710")
+    assert rule["until"] == datetime(2026, 7, 10, 23, 59, 59, tzinfo=timezone.utc)
+
+
+@pytest.mark.parametrize("rule", [
+    "",
+    "FREQ=HOURLY",
+    "FREQ=DAILY;BYHOUR=1",
+    "FREQ=DAILY;COUNT=2;UNTIL=20260801",
+    "FREQ=DAILY;COUNT=0",
+    f"FREQ=DAILY;COUNT={recurrence.MAX_COUNT + 1}",
+    "FREQ=DAILY;UNTIL=2026-08-01",
+    "FREQ=WEEKLY;BYDAY=1SA",
+    "FREQ=WEEKLY;BYMONTHDAY=1",
+    "FREQ=DAILY;BYDAY=SA",
+    "FREQ=MONTHLY;BYMONTHDAY=0",
+    "FREQ=DAILY;FREQ=DAILY"
+])
+def test_parse_rule_rejects(rule):
+    with pytest.raises(ValueError):
+        recurrence.parse_rule(rule)
+
+
+"""
+EXPAND
+"""
+
+
+def test_first_occurrence_is_kept_when_it_does_not_match_the_rule():
+    # monday jul 6 2026, the first saturdays are aug 1, sep 5 and oct 3
+    item = reservation(epoch(2026, 7, 6, 15), 2, "FREQ=MONTHLY;BYDAY=1SA")
+    assert starts(item, epoch(2026, 7, 1), epoch(2026, 11, 1)) == [
+        "2026-07-06", "2026-08-01", "2026-09-05", "2026-10-03"
+    ]
+
+
+def test_first_occurrence_counts_towards_count():
+    item = reservation(epoch(2026, 7, 6, 15), 2, "FREQ=MONTHLY;BYDAY=1SA;COUNT=3")
+    assert starts(item, epoch(2026, 1, 1), epoch(2028, 1, 1)) == ["2026-07-06", "2026-08-01", "2026-09-05"]
+
+
+def test_weekly_byday_interval():
+    item = reservation(epoch(2026, 7, 4, 15), 1, "FREQ=WEEKLY;INTERVAL=2;BYDAY=SA,SU;COUNT=5")
+    assert starts(item, epoch(2026, 1, 1), epoch(2027, 1, 1)) == ["2026-07-04", "2026-07-05", "2026-07-18",
+                                                                  "2026-07-19", "2026-08-01"]
+
+
+def test_monthly_bymonthday_skips_short_months_and_counts_from_the_end():
+    item = reservation(epoch(2026, 1, 31, 15), 1, "FREQ=MONTHLY;BYMONTHDAY=31")
+    assert starts(item, epoch(2026, 1, 1), epoch(2026, 8, 1)) == ["2026-01-31", "2026-03-31", "2026-05-31",
+                                                                  "2026-07-31"]
+    item = reservation(epoch(2026, 1, 31, 15), 1, "FREQ=MONTHLY;BYMONTHDAY=-1")
+    assert starts(item, epoch(2026, 1, 1), epoch(2026, 4, 1)) == ["2026-01-31", "2026-02-28", "2026-03-31"]
+
+
+def test_until_is_inclusive():
+    item = reservation(epoch(2026, 7, 1, 15), 1, "FREQ=DAILY;INTERVAL=3;UNTIL=20260710")
+    assert starts(item, epoch(2026, 1, 1), epoch(2027, 1, 1)) == ["2026-07-01", "2026-07-04", "2026-07-07",
+                                                                  "2026-07-10"]
+
+
+def test_window_only_returns_overlapping_occurrences():
+    item = reservation(epoch(2026, 7, 4, 15), 2, "FREQ=WEEKLY")
+    # the jul 11 stay runs into jul 13, the jul 18 stay starts at the end of the window
+    assert starts(item, epoch(2026, 7, 12), epoch(2026, 7, 18, 15)) == ["2026-07-11"]
+
+
+@pytest.mark.parametrize("rule", [
+    "FREQ=DAILY;INTERVAL=5",
+    "FREQ=WEEKLY;INTERVAL=3;BYDAY=MO,FR",
+    "FREQ=MONTHLY;BYDAY=-1SU,2WE",
+    "FREQ=MONTHLY;INTERVAL=2;BYMONTHDAY=1,15,-1",
+    "FREQ=YEARLY"
+])
+def test_lazy_window_matches_the_full_expansion(rule):
+    item = reservation(epoch(2026, 7, 8, 15), 1, rule)
+    window_start, window_end = epoch(2029, 2, 10), epoch(2029, 9, 3)
+    full = [occurrence for occurrence in recurrence.occurrences(item, item["epoch_start"], window_end)
+            if occurrence[1] > window_start]
+    assert list(recurrence.occurrences(item, window_start, window_end)) == full
+
+
+def test_expand_returns_reservations_per_occurrence():
+    item = reservation(epoch(2026, 7, 4, 15), 2, "FREQ=WEEKLY;COUNT=2")
+    expanded = recurrence.expand(item, epoch(2026, 1, 1), epoch(2027, 1, 1))
+    assert [(entry["epoch_start"], entry["epoch_end"]) for entry in expanded] == [
+        (epoch(2026, 7, 4, 15), epoch(2026, 7, 6, 15)),
+        (epoch(2026, 7, 11, 15), epoch(2026, 7, 13, 15))
+    ]
+    assert all(entry["recurrence"] == item["recurrence"] for entry in expanded)
+
+
+def test_a_reservation_without_a_rule_has_one_occurrence():
+    item = reservation(epoch(2026, 7, 4, 15), 2)
+    assert starts(item, epoch(2026, 7, 5), epoch(2026, 7, 6)) == ["2026-07-04"]
+    assert starts(item, epoch(2026, 7, 7), epoch(2026, 7, 8)) == []
+
+
+"""
+FINAL END
+"""
+
+
+def test_final_end_without_a_rule_or_without_an_end():
+    item = reservation(epoch(2026, 7, 4, 15), 2)
+    assert recurrence.final_end(item) == item["epoch_end"]
+    assert recurrence.final_end(reservation(epoch(2026, 7, 4, 15), 2, "FREQ=WEEKLY")) is None
+
+
+def test_final_end_of_count():
+    item = reservation(epoch(2026, 7, 6, 15), 2, "FREQ=MONTHLY;BYDAY=1SA;COUNT=3")
+    assert recurrence.final_end(item) == epoch(2026, 9, 7, 15)
+
+
+@pytest.mark.parametrize("rule, last_start", [
+    ("FREQ=DAILY;INTERVAL=3;UNTIL=20260710", epoch(2026, 7, 9, 15)),
+    # UNTIL on a day without an occurrence, steps back to the last one before it
+    ("FREQ=WEEKLY;BYDAY=SA;UNTIL=20260723", epoch(2026, 7, 18, 15)),
+    # april has no 31st, the last occurrence is in march
+    ("FREQ=MONTHLY;BYMONTHDAY=31;UNTIL=20270430", epoch(2027, 3, 31, 15)),
+    # UNTIL before the first match, only the first occurrence
+    ("FREQ=MONTHLY;BYDAY=1SA;UNTIL=20260731", epoch(2026, 7, 6, 15))
+])
+def test_final_end_of_until(rule, last_start):
+    item = reservation(epoch(2026, 7, 6, 15), 1, rule)
+    assert recurrence.final_end(item) == last_start + DAY
+    expanded = list(recurrence.occurrences(item, item["epoch_start"], epoch(2028, 1, 1)))
+    assert recurrence.final_end(item) == expanded[-1][1]
+
+
+def test_final_end_jumps_to_until():
+    item = reservation(epoch(2026, 7, 6, 15), 1, "FREQ=DAILY;UNTIL=20360601")
+    started = time.perf_counter()
+    assert recurrence.final_end(item) == epoch(2036, 6, 2, 15)
+    assert time.perf_counter() - started < 0.05
+
+
+@pytest.mark.parametrize("rule, last_start", [
+    ("FREQ=YEARLY;UNTIL=99991231", epoch(9999, 7, 6, 15)),
+    ("FREQ=DAILY;UNTIL=99991231", epoch(9999, 12, 31, 15))
+])
+def test_final_end_of_a_rule_stored_before_the_horizon_check(rule, last_start):
+    item = reservation(epoch(2026, 7, 6, 15), 1, rule)
+    started = time.perf_counter()
+    assert recurrence.final_end(item) == last_start + DAY
+    assert time.perf_counter() - started < 0.05
+
+
+"""
+VALIDATION
+"""
+
+
+@pytest.mark.parametrize("rule", [
+    "FREQ=YEARLY;UNTIL=99991231",
+    "FREQ=DAILY;UNTIL=99991231",
+    "FREQ=DAILY;UNTIL=20400101",
+    # 1000 years of yearly occurrences
+    "FREQ=YEARLY;COUNT=1000",
+    "FREQ=MONTHLY;INTERVAL=12;BYMONTHDAY=31;COUNT=100"
+])
+def test_validate_rule_rejects_rules_beyond_the_horizon(rule):
+    item = reservation(epoch(2026, 7, 6, 15), 2, rule)
+    started = time.perf_counter()
+    assert recurrence.validate_rule(item) is not None
+    assert validate_reservation(item) is not None
+    assert time.perf_counter() - started < 0.5
+
+
+@pytest.mark.parametrize("rule", [
+    "FREQ=DAILY",
+    "FREQ=WEEKLY;BYDAY=SA,SU",
+    "FREQ=MONTHLY;BYMONTHDAY=1,2",
+    # the first occurrence on jul 6 overlaps the saturday jul 7
+    "FREQ=WEEKLY;BYDAY=TU"
+])
+def test_validate_rule_rejects_overlapping_occurrences(rule):
+    assert recurrence.validate_rule(reservation(epoch(2026, 7, 6, 15), 2, rule)) is not None
+
+
+@pytest.mark.parametrize("rule", [
+    "FREQ=MONTHLY;BYDAY=1SA",
+    "FREQ=WEEKLY;BYDAY=SA;UNTIL=20300101",
+    "FREQ=DAILY;INTERVAL=2;COUNT=1000",
+    "FREQ=YEARLY;COUNT=10"
+])
+def test_validate_rule_accepts(rule):
+    assert recurrence.validate_rule(reservation(epoch(2026, 7, 6, 15), 2, rule)) is None
+
+
+def test_validate_rule_without_a_rule():
+    assert recurrence.validate_rule(reservation(epoch(2026, 7, 6, 15), 2)) is None
@@ -0,0 +1,113 @@
+"""
+filename: test_reservation_views.py
+author: Jack Gularte
+date: Oct. 19 2026
+
+Unit tests of the night counting shared by the month views and /availability, and of the derived view members.
+"""
+# internal imports
+from chalicelib import availability_service as availability
+from chalicelib import reservation_views_service as views
+
+DAY = 86400
+JUL_3 = availability.parse_date("2024-07-03")
+JUL_31 = availability.parse_date("2024-07-31")
+VIEWS_TABLE = "views-test"
+
+
+def reservation(epoch_start: int, epoch_end: int) -> dict:
+    return {
+        "reservation_guid": "guid",
+        "user_guid": "user",
+        "epoch_start": epoch_start,
+        "epoch_end": epoch_end,
+        "reservation_type": "closed"
+    }
+
+
+"""
+NIGHTS
+"""
+
+
+def test_night_span_of_a_stay_ending_mid_day():
+    # jul 3 09:46 to jul 5 09:46
+    assert views.night_span(1720000000, 1720172800) == (JUL_3, JUL_3 + 2 * DAY)
+
+
+def test_night_span_of_a_stay_ending_on_midnight():
+    assert views.night_span(JUL_3, JUL_3 + 2 * DAY) == (JUL_3, JUL_3 + 2 * DAY)
+    assert views.night_span(JUL_3 + 15 * 3600, JUL_3 + 2 * DAY) == (JUL_3, JUL_3 + 2 * DAY)
+
+
+def test_night_span_of_a_stay_without_a_night():
+    assert views.night_span(JUL_3 + 9 * 3600, JUL_3 + 17 * 3600) == (JUL_3, JUL_3)
+
+
+def test_month_nights_leave_the_check_out_day_out():
+    assert views.month_nights(1720000000, 1720172800) == {"2024-07": 2}
+    assert views.month_nights(JUL_3 + 9 * 3600, JUL_3 + 17 * 3600) == {}
+
+
+def test_month_nights_across_months():
+    assert views.month_nights(JUL_31 - DAY + 15 * 3600, JUL_31 + 2 * DAY + 10 * 3600) == {"2024-07": 2, "2024-08": 1}
+
+
+def test_month_nights_match_the_occupancy_vector():
+    stays = [(1720000000, 1720172800), (JUL_3, JUL_3 + 2 * DAY), (JUL_31 - 3600, JUL_31 + DAY + 3600)]
+    range_start = availability.parse_date("2024-07-01")
+    for epoch_start, epoch_end in stays:
+        reservations = [reservation(epoch_start, epoch_end)]
+        occupancy = availability.occupancy_vector(reservations, range_start, range_start + 62 * DAY)
+        assert sum(occupancy) == sum(views.month_nights(epoch_start, epoch_end).values())
+
+
+"""
+VIEW MEMBERS
+"""
+
+
+def test_view_members_of_a_stay_checking_out_in_the_next_month():
+    members = views.view_members(reservation(JUL_31 + 15 * 3600, JUL_31 + DAY + 10 * 3600))
+    assert members[("month#2024-07", "guid")]["nights"] == 1
+    # found by range reads of august, without a night in it
+    assert members[("month#2024-08", "guid")]["nights"] == 0
+    assert ("user#user", "guid") in members
+
+
+def test_months_of_a_stay_starting_mid_day():
+    assert views.months(JUL_31 + 15 * 3600, JUL_31 + DAY + 10 * 3600) == ["2024-07", "2024-08"]
+    assert views.months(JUL_31 + 15 * 3600, JUL_31 + DAY) == ["2024-07"]
+
+
+def test_view_members_of_a_recurring_reservation():
+    item = dict(reservation(JUL_3, JUL_3 + DAY), recurrence="FREQ=WEEKLY")
+    assert set(views.view_members(item)) == {("user#user", "guid"), (views.RECURRING_VIEW, "guid")}
+
+
+"""
+STREAM PROCESSING
+"""
+
+
+def test_a_failing_record_is_reported_as_the_partial_batch_failure(memory_backend):
+    views.register_tables(memory_backend, VIEWS_TABLE)
+    first = dict(reservation(JUL_3, JUL_3 + DAY), reservation_guid="first")
+    broken = {"reservation_guid": "broken"}
+    last = dict(reservation(JUL_3, JUL_3 + DAY), reservation_guid="last")
+    event = {"Records": [
+        views.make_stream_record("INSERT", "1", new_image=first),
+        views.make_stream_record("INSERT", "2", new_image=broken),
+        views.make_stream_record("INSERT", "3", new_image=last)
+    ]}
+    assert views.process_stream_event(event, VIEWS_TABLE) == {"batchItemFailures": [{"itemIdentifier": "2"}]}
+    # applied up to the failing record, the retry starts at it
+    assert [member["reservation_guid"] for member in views.month_occupancy(VIEWS_TABLE, "2024-07")["reservations"]] \
+        == ["first"]
+    assert views.feed_version(VIEWS_TABLE).startswith("1:")
+
+
+def test_a_batch_without_failures(memory_backend):
+    views.register_tables(memory_backend, VIEWS_TABLE)
+    event = {"Records": [views.make_stream_record("INSERT", "1", new_image=reservation(JUL_3, JUL_3 + DAY))]}
+    assert views.process_stream_event(event, VIEWS_TABLE) == {"batchItemFailures": []}
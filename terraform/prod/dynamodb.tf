@@ -18,11 +18,16 @@ locals {
   user_guid_index_write = 3
   user_guid_index_read = 3
 
+  // past stays expire into the archive table, see source/chalicelib/archive_service.py
   ttl_attribute = "TimeToExist"
-  ttl_enabled   = false
+  ttl_enabled   = true
 
   billing_mode = "PROVISIONED"
   pitr_enabled = false
+
+  // the stream feeds the derived views, see source/chalicelib/reservation_views_service.py
+  stream_enabled   = true
+  stream_view_type = "NEW_AND_OLD_IMAGES"
 }
 
 resource "aws_dynamodb_table" "reservations_table" {
@@ -33,6 +38,9 @@ resource "aws_dynamodb_table" "reservations_table" {
   read_capacity  = local.read_capacity
   write_capacity = local.write_capacity
 
+  stream_enabled   = local.stream_enabled
+  stream_view_type = local.stream_view_type
+
   attribute {
     name = local.hash_key
     type = local.hash_key_type
@@ -65,12 +73,6 @@ resource "aws_dynamodb_table" "reservations_table" {
     enabled        = local.ttl_enabled
   }
 
-  lifecycle {
-    ignore_changes = [
-      ttl
-    ]
-  }
-
   tags = {
     project_name = var.project
     environment  = var.environment
@@ -79,4 +81,9 @@ resource "aws_dynamodb_table" "reservations_table" {
 
 output "arn" {
   value = aws_dynamodb_table.reservations_table.arn
+}
+
+// set as reservations_stream_arn in the env config to deploy the stream handler
+output "stream_arn" {
+  value = aws_dynamodb_table.reservations_table.stream_arn
 }
\ No newline at end of file
@@ -0,0 +1,50 @@
+// DYNAMODB TABLE THE RESERVATIONS ARE MIGRATED INTO
+// hash key only layout ("guid" in chalicelib/reservation_layouts.py) so a guid lookup is a get_item point read.
+// filled by source/scripts/migrate_reservations.py and kept in sync by the dual_write_table config.
+locals {
+  v2_table_name    = "reservations-table-v2"
+  v2_hash_key      = "reservation_guid"
+  v2_hash_key_type = "S"
+
+  v2_read_capacity  = 5
+  v2_write_capacity = 5
+}
+
+resource "aws_dynamodb_table" "reservations_table_v2" {
+  name           = local.v2_table_name
+  hash_key       = local.v2_hash_key
+  billing_mode   = local.billing_mode
+  read_capacity  = local.v2_read_capacity
+  write_capacity = local.v2_write_capacity
+
+  attribute {
+    name = local.v2_hash_key
+    type = local.v2_hash_key_type
+  }
+
+  attribute {
+    name = local.user_guid_index_hash
+    type = local.user_guid_index_type
+  }
+
+  global_secondary_index {
+    hash_key        = local.user_guid_index_hash
+    name            = local.user_guid_index_name
+    projection_type = local.user_guid_index_proj
+    write_capacity  = local.user_guid_index_write
+    read_capacity   = local.user_guid_index_read
+  }
+
+  point_in_time_recovery {
+    enabled = local.pitr_enabled
+  }
+
+  tags = {
+    project_name = var.project
+    environment  = var.environment
+  }
+}
+
+output "v2_arn" {
+  value = aws_dynamodb_table.reservations_table_v2.arn
+}
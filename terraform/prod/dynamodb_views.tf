@@ -0,0 +1,40 @@
+// DYNAMODB TABLE USED FOR THE DERIVED RESERVATION VIEWS
+// maintained from the reservations table stream, see source/chalicelib/reservation_views_service.py
+locals {
+  views_table_name     = "reservation-views-table"
+  views_hash_key       = "view_key"
+  views_hash_key_type  = "S"
+  views_range_key      = "member_key"
+  views_range_key_type = "S"
+
+  views_read_capacity  = 5
+  views_write_capacity = 5
+}
+
+resource "aws_dynamodb_table" "views_table" {
+  name           = local.views_table_name
+  hash_key       = local.views_hash_key
+  range_key      = local.views_range_key
+  billing_mode   = local.billing_mode
+  read_capacity  = local.views_read_capacity
+  write_capacity = local.views_write_capacity
+
+  attribute {
+    name = local.views_hash_key
+    type = local.views_hash_key_type
+  }
+
+  attribute {
+    name = local.views_range_key
+    type = local.views_range_key_type
+  }
+
+  tags = {
+    project_name = var.project
+    environment  = var.environment
+  }
+}
+
+output "views_arn" {
+  value = aws_dynamodb_table.views_table.arn
+}
@@ -125,4 +125,20 @@ resource "aws_cognito_user_pool" "user-pool" {
     project_name = var.project
     environment  = var.environment
   }
-}
\ No newline at end of file
+}
+
+// app client the api's cognito_jwt authorizer mode accepts tokens of (cognito_app_client_id in the env config)
+resource "aws_cognito_user_pool_client" "app-client" {
+  name                = "${local.name}_app_client"
+  user_pool_id        = aws_cognito_user_pool.user-pool.id
+  generate_secret     = false
+  explicit_auth_flows = ["ALLOW_USER_SRP_AUTH", "ALLOW_REFRESH_TOKEN_AUTH"]
+}
+
+output "user_pool_id" {
+  value = aws_cognito_user_pool.user-pool.id
+}
+
+output "app_client_id" {
+  value = aws_cognito_user_pool_client.app-client.id
+}
@@ -0,0 +1,36 @@
+// DYNAMODB TABLE USED FOR ARCHIVED RESERVATIONS
+// filled from the ttl deletes on the reservations table stream, see source/chalicelib/archive_service.py
+// rarely read, so it is billed on demand instead of holding provisioned capacity
+locals {
+  archive_table_name     = "reservations-archive-table_sandbox"
+  archive_hash_key       = "archive_key"
+  archive_hash_key_type  = "S"
+  archive_range_key      = "reservation_guid"
+  archive_range_key_type = "S"
+}
+
+resource "aws_dynamodb_table" "archive_table" {
+  name         = local.archive_table_name
+  hash_key     = local.archive_hash_key
+  range_key    = local.archive_range_key
+  billing_mode = "PAY_PER_REQUEST"
+
+  attribute {
+    name = local.archive_hash_key
+    type = local.archive_hash_key_type
+  }
+
+  attribute {
+    name = local.archive_range_key
+    type = local.archive_range_key_type
+  }
+
+  tags = {
+    project_name = var.project
+    environment  = var.environment
+  }
+}
+
+output "archive_arn" {
+  value = aws_dynamodb_table.archive_table.arn
+}
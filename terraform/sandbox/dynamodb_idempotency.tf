@@ -0,0 +1,40 @@
+// DYNAMODB TABLE USED FOR IDEMPOTENCY-KEY RECORDS OF THE POST/PUT ROUTES
+// records expire through the ttl attribute, see source/chalicelib/idempotency_service.py
+locals {
+  idempotency_table_name    = "idempotency-table_sandbox"
+  idempotency_hash_key      = "idempotency_key"
+  idempotency_hash_key_type = "S"
+
+  idempotency_read_capacity  = 3
+  idempotency_write_capacity = 3
+
+  idempotency_ttl_attribute = "expires_at"
+  idempotency_ttl_enabled   = true
+}
+
+resource "aws_dynamodb_table" "idempotency_table" {
+  name           = local.idempotency_table_name
+  hash_key       = local.idempotency_hash_key
+  billing_mode   = local.billing_mode
+  read_capacity  = local.idempotency_read_capacity
+  write_capacity = local.idempotency_write_capacity
+
+  attribute {
+    name = local.idempotency_hash_key
+    type = local.idempotency_hash_key_type
+  }
+
+  ttl {
+    attribute_name = local.idempotency_ttl_attribute
+    enabled        = local.idempotency_ttl_enabled
+  }
+
+  tags = {
+    project_name = var.project
+    environment  = var.environment
+  }
+}
+
+output "idempotency_arn" {
+  value = aws_dynamodb_table.idempotency_table.arn
+}
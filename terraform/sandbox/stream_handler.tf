@@ -0,0 +1,26 @@
+// EVENT SOURCE MAPPING OF THE RESERVATIONS TABLE STREAM
+// invokes the chalice reservations_stream lambda, see source/chalicelib/reservation_views_service.py; managed here as
+// chalice's on_dynamodb_record can not set the partial batch failure response, the retry limit or bisecting
+// enabled once reservations_stream_arn is set in the env config, which the app reads to know the handler runs
+locals {
+  app_config             = jsondecode(file("${path.module}/../../source/chalicelib/configs/sandbox.json"))
+  stream_handler_enabled = local.app_config.reservations_stream_arn != ""
+
+  stream_batch_size        = 100
+  stream_starting_position = "TRIM_HORIZON"
+  // a record that keeps failing is skipped after this many retries instead of blocking its shard until it expires
+  // (24 hours); bisecting isolates it first. rebuild the views it missed with source/scripts/rebuild_views.py
+  stream_max_retries = 5
+}
+
+resource "aws_lambda_event_source_mapping" "reservations_stream" {
+  count             = local.stream_handler_enabled ? 1 : 0
+  event_source_arn  = local.app_config.reservations_stream_arn
+  function_name     = aws_lambda_function.reservations_stream.arn
+  batch_size        = local.stream_batch_size
+  starting_position = local.stream_starting_position
+
+  function_response_types        = ["ReportBatchItemFailures"]
+  maximum_retry_attempts         = local.stream_max_retries
+  bisect_batch_on_function_error = true
+}
@@ -0,0 +1,31 @@
+// WARM-UP PINGS FOR THE API HANDLER LAMBDA
+// invokes the chalice api handler with the event source recognized by source/chalicelib/warm_up.py
+// keeps the connections of idle containers open; containers started by a scale-out prime themselves during their init
+locals {
+  warm_up_rule_name = "gularte_cabin_shared_calendar-sandbox-warm-up"
+  warm_up_schedule  = "rate(5 minutes)"
+  warm_up_input     = "{\"source\": \"gcsc.warm-up\"}"
+}
+
+resource "aws_cloudwatch_event_rule" "warm_up" {
+  name                = local.warm_up_rule_name
+  schedule_expression = local.warm_up_schedule
+
+  tags = {
+    project_name = var.project
+    environment  = var.environment
+  }
+}
+
+resource "aws_cloudwatch_event_target" "warm_up" {
+  rule  = aws_cloudwatch_event_rule.warm_up.name
+  arn   = aws_lambda_function.api_handler.arn
+  input = local.warm_up_input
+}
+
+resource "aws_lambda_permission" "warm_up_invoke" {
+  function_name = aws_lambda_function.api_handler.function_name
+  action        = "lambda:InvokeFunction"
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.warm_up.arn
+}